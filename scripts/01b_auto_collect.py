@@ -11,6 +11,8 @@ import time
 from datetime import datetime
 from typing import List, Dict
 
+from html_cleaner import nettoyer_description
+
 class GoogleJobsCollector:
     """Collecteur automatisé via Google Jobs API."""
     
@@ -148,36 +150,7 @@ class GoogleJobsCollector:
     
     def _nettoyer_description(self, description: str) -> str:
         """Nettoie la description (enlève HTML, garde uniquement les missions)."""
-        import re
-        from bs4 import BeautifulSoup
-        
-        # Enlever HTML
-        soup = BeautifulSoup(description, 'html.parser')
-        text = soup.get_text(separator='\n')
-        
-        # Enlever lignes vides multiples
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        # Extraire la section "Missions" / "Responsibilities"
-        keywords = [
-            'missions', 'responsabilités', 'responsabilities', 
-            'your role', 'you will', 'aufgaben', '業務内容',
-            'what you\'ll do', 'your responsibilities', 'vos missions'
-        ]
-        
-        lines = text.split('\n')
-        mission_start = -1
-        
-        for i, line in enumerate(lines):
-            if any(kw in line.lower() for kw in keywords):
-                mission_start = i
-                break
-        
-        if mission_start > -1:
-            # Prendre à partir de cette section (max 40 lignes pour avoir plus de contenu)
-            text = '\n'.join(lines[mission_start:mission_start+40])
-        
-        return text.strip()
+        return nettoyer_description(description)
     
     def collecter_tout(self, num_par_pays_role: int = 10):
         """Collecte automatique pour tous les pays et rôles."""
@@ -305,6 +278,6 @@ if __name__ == "__main__":
     print("2. Collecter manuellement:")
     print("   - 2 textes Scrum Guide (PO + SM)")
     print("   - 12 référentiels (4 pays × 3 rôles)")
-    print("3. Fusionner tout dans data/corpus.csv")
+    print("3. Fusionner tout dans data/corpus.csv: python scripts/01d_consolidate.py")
     print("4. Exécuter scripts/02_embed.py pour les embeddings")
     print("="*70)
\ No newline at end of file
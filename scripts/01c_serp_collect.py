@@ -5,32 +5,55 @@ scripts/01c_serp_collect.py
 Collecte d'offres depuis Google Jobs via SerpApi et sauvegarde en CSV.
 
 Modes:
-- normal: collecte complète et merge dans data/raw/offres_google_jobs.csv
+- normal: collecte complète, ajout des nouvelles offres au store partitionné
+  data/raw/google_jobs_store/ (Parquet, append-only, index d'ids persistant);
+  --format csv conserve l'ancien merge dans data/raw/offres_google_jobs.csv
 - dry-run: collecte limitée (sample) et écrit data/raw/offres_google_jobs_sample.csv
   utile pour tester sans consommer beaucoup de quota.
+- replay: ne sert que des réponses déjà en cache (aucun appel réseau, pas de clé API)
+  pour rejouer normalisation/dédoublonnage à vitesse locale.
+
+Les réponses SerpApi sont mises en cache sur disque (data/cache/serp_cache.sqlite),
+clé = hash canonique des paramètres hors api_key, avec TTL et éviction par taille.
+
+Le JSON complet de chaque offre va dans un store compressé adressé par id
+(data/raw/google_jobs_raw/, voir blob_store.py); la table ne garde que raw_ref:
+    python scripts/blob_store.py get <raw_ref>
 
 Usage:
     export SERPAPI_KEY=xxxx
     python scripts/01c_serp_collect.py [--dry-run] [--sample-size N] [--max-per-query N] [--output PATH]
+                                       [--concurrency N] [--rps R] [--pages-in-flight N]
+                                       [--replay] [--no-cache] [--cache-path PATH] [--cache-ttl-hours H]
+                                       [--format store|csv] [--store-dir DIR] [--blob-dir DIR]
+                                       [--known-pages-stop N] [--seen-index PATH]
 
 Dépendances (à ajouter si nécessaire dans requirements.txt):
     requests
     pandas
     tqdm
+    pyarrow (store partitionné)
     python-dotenv (optionnel)
+    zstandard (optionnel, compression du cache et des payloads bruts; zlib sinon)
 """
 from __future__ import annotations
 import os
 import time
-import json
 import hashlib
 from datetime import datetime
 from typing import Dict, List, Optional
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
 import pandas as pd
 from tqdm import tqdm
 
+from rate_limiter import LimiteurDebit
+from blob_store import DEFAULT_BLOB_DIR, BlobStore
+from corpus_store import DEFAULT_STORE_DIR, PartitionedStore
+from id_index import IdIndex
+from serp_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -75,9 +98,12 @@ LOCATION_HINTS = {
 # Behaviour defaults (can be overridden by CLI)
 DEFAULT_MAX_PER_QUERY = 100  # normal mode
 DEFAULT_PAGE_SIZE = 10
-REQUEST_SLEEP = 1.0
 MAX_RETRIES = 3
 TIMEOUT = 30
+DEFAULT_CONCURRENCY = 4  # requêtes HTTP simultanées (toutes requêtes confondues)
+DEFAULT_RPS = 1.0  # débit global max vers SerpApi (requêtes/s)
+DEFAULT_PAGES_IN_FLIGHT = 2  # pages d'une même requête chargées en parallèle
+DEFAULT_KNOWN_PAGES_STOP = 2  # pages consécutives déjà connues avant arrêt (0 = désactivé)
 
 # Output paths
 DEFAULT_OUTPUT_CSV = "data/raw/offres_google_jobs.csv"
@@ -87,14 +113,28 @@ def make_id(item: Dict) -> str:
     key = item.get("apply_link") or item.get("link") or (item.get("title", "") + item.get("company_name", ""))
     return hashlib.sha1(str(key).encode("utf-8")).hexdigest()
 
-def call_serpapi(params: Dict) -> Optional[Dict]:
+def call_serpapi(params: Dict, limiter: Optional[LimiteurDebit] = None,
+                 cache: Optional[ResponseCache] = None, replay: bool = False) -> Optional[Dict]:
+    if cache is not None:
+        # Replay serves whatever is on disk, however old
+        cached = cache.get(params, ignore_ttl=replay)
+        if cached is not None:
+            return cached
+    if replay:
+        # Replay mode: cache only, never hit the network
+        return None
     params = params.copy()
     params["api_key"] = SERPAPI_KEY
     for attempt in range(1, MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.acquerir()
         try:
             resp = requests.get(API_URL, params=params, timeout=TIMEOUT, headers={"User-Agent": "preprint-empirical-bot/1.0"})
             if resp.status_code == 200:
-                return resp.json()
+                data = resp.json()
+                if cache is not None and "error" not in data:
+                    cache.put(params, data)
+                return data
             else:
                 print(f"⚠️ SerpApi returned {resp.status_code}: {resp.text[:200]}")
         except Exception as e:
@@ -117,7 +157,8 @@ def normalize_job(job: Dict, role: str, country: str, language: str) -> Dict:
         "date_posted": job.get("date"),
         "source": job.get("source"),
         "apply_link": job.get("apply_link") or job.get("link"),
-        "raw": json.dumps(job, ensure_ascii=False),
+        # Full payload in the blob store (blob_store.py), fetched by id
+        "raw_ref": make_id(job),
         "role_query": role,
         "country": country,
         "language": language,
@@ -125,41 +166,122 @@ def normalize_job(job: Dict, role: str, country: str, language: str) -> Dict:
     }
     return normalized
 
-def collect_for_query(query: str, location_hint: Dict, max_results: int = 20, page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict]:
-    collected = []
-    start = 0
-    pbar = tqdm(total=max_results, desc=f"Query: {query} [{location_hint.get('location')}]")
-    while len(collected) < max_results:
-        params = {
-            "engine": "google_jobs",
-            "q": query,
-            "start": start,
-            "num": page_size,
-            "location": location_hint.get("location"),
-            "hl": location_hint.get("hl", "en"),
-            "gl": location_hint.get("gl", ""),
-        }
-        resp = call_serpapi(params)
-        if not resp:
-            break
-        jobs = extract_jobs_from_response(resp)
-        if not jobs:
-            break
-        for job in jobs:
-            collected.append(job)
-            pbar.update(1)
-            if len(collected) >= max_results:
-                break
-        start += page_size
-        time.sleep(REQUEST_SLEEP)
+def build_params(query: str, location_hint: Dict, start: int, page_size: int) -> Dict:
+    return {
+        "engine": "google_jobs",
+        "q": query,
+        "start": start,
+        "num": page_size,
+        "location": location_hint.get("location"),
+        "hl": location_hint.get("hl", "en"),
+        "gl": location_hint.get("gl", ""),
+    }
+
+def page_is_known(jobs: List[Dict], seen_index: Optional[IdIndex]) -> bool:
+    """True if every job of the page was already collected in an earlier run."""
+    if seen_index is None or not jobs:
+        return False
+    ids = [make_id(job) for job in jobs]
+    return len(seen_index.known(ids)) == len(set(ids))
+
+def collect_concurrent(tasks: List[Dict], max_results: int, page_size: int = DEFAULT_PAGE_SIZE,
+                       concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_RPS,
+                       pages_in_flight: int = DEFAULT_PAGES_IN_FLIGHT,
+                       cache: Optional[ResponseCache] = None, replay: bool = False,
+                       seen_index: Optional[IdIndex] = None,
+                       known_pages_stop: int = DEFAULT_KNOWN_PAGES_STOP) -> List[List[Dict]]:
+    """Collect several queries concurrently under one global rate limiter.
+
+    Each task is {"query": str, "location_hint": dict}. Up to `pages_in_flight`
+    pages of each query are fetched in parallel, at most `concurrency` HTTP
+    calls run at once, and all calls share a token bucket of `rps` req/s.
+    Cached responses are served without touching the limiter; in replay mode
+    cache misses count as empty pages. A query stops at its first empty (or
+    failed) page, or after `known_pages_stop` consecutive pages whose ids are
+    all in `seen_index` (pages are checked in order, whatever order they
+    arrive in). Returns the jobs of each task, in task order, pages in order,
+    truncated to max_results.
+    """
+    limiter = LimiteurDebit(rps)
+    n_pages = max(1, -(-max_results // page_size))
+    states = [{"next_page": 0, "in_flight": 0, "stop_page": n_pages, "pages": {}, "checked": 0, "known_streak": 0}
+              for _ in tasks]
+    pending = {}
+    pbar = tqdm(total=len(tasks) * max_results, desc="SerpApi (concurrent)")
+
+    def fetch(task, page):
+        params = build_params(task["query"], task["location_hint"], page * page_size, page_size)
+        resp = call_serpapi(params, limiter=limiter, cache=cache, replay=replay)
+        return extract_jobs_from_response(resp) if resp else []
+
+    def submit_ready(executor):
+        # Round-robin over queries so every pipeline progresses
+        progressed = True
+        while progressed and len(pending) < concurrency:
+            progressed = False
+            for i, task in enumerate(tasks):
+                st = states[i]
+                if len(pending) >= concurrency:
+                    break
+                if st["in_flight"] < pages_in_flight and st["next_page"] < st["stop_page"]:
+                    fut = executor.submit(fetch, task, st["next_page"])
+                    pending[fut] = (i, st["next_page"])
+                    st["next_page"] += 1
+                    st["in_flight"] += 1
+                    progressed = True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        submit_ready(executor)
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, page = pending.pop(fut)
+                st = states[i]
+                st["in_flight"] -= 1
+                try:
+                    jobs = fut.result()
+                except Exception as e:
+                    print(f"⚠️ Erreur page {page} de '{tasks[i]['query']}': {e}")
+                    jobs = []
+                if not jobs:
+                    # No results: no need to fetch later pages of this query
+                    st["stop_page"] = min(st["stop_page"], page)
+                elif page < st["stop_page"]:
+                    st["pages"][page] = jobs
+                    pbar.update(min(len(jobs), page_size))
+                # Early stop: walk the contiguous prefix of received pages in order
+                while st["checked"] in st["pages"] and st["checked"] < st["stop_page"]:
+                    known = page_is_known(st["pages"][st["checked"]], seen_index)
+                    st["known_streak"] = st["known_streak"] + 1 if known else 0
+                    st["checked"] += 1
+                    if known_pages_stop and st["known_streak"] >= known_pages_stop:
+                        st["stop_page"] = st["checked"]
+            submit_ready(executor)
     pbar.close()
-    return collected[:max_results]
 
-def merge_and_save(records: List[Dict], output_path: str):
+    results = []
+    for st in states:
+        jobs = [job for page in range(st["stop_page"]) if page in st["pages"] for job in st["pages"][page]]
+        results.append(jobs[:max_results])
+    return results
+
+def default_seen_index_path(output_path: str) -> str:
+    """Id index kept next to a merged CSV: offres.csv -> offres_ids.sqlite."""
+    return os.path.splitext(output_path)[0] + "_ids.sqlite"
+
+def merge_and_save(records: List[Dict], output_path: str, blob_dir: str = DEFAULT_BLOB_DIR):
     df_new = pd.DataFrame(records)
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     if os.path.exists(output_path):
         df_old = pd.read_csv(output_path)
+        if "raw" in df_old.columns:
+            # Older CSVs embedded the full payload: move it to the blob store
+            has_raw = df_old["raw"].notna()
+            blobs = BlobStore(blob_dir)
+            blobs.put_many(zip(df_old.loc[has_raw, "id"], df_old.loc[has_raw, "raw"]))
+            blobs.close()
+            df_old["raw_ref"] = df_old["id"].where(has_raw)
+            df_old = df_old.drop(columns="raw")
         df_combined = pd.concat([df_old, df_new], ignore_index=True)
         df_combined = df_combined.drop_duplicates(subset=["id"]).reset_index(drop=True)
     else:
@@ -167,44 +289,94 @@ def merge_and_save(records: List[Dict], output_path: str):
     df_combined.to_csv(output_path, index=False)
     print(f"✅ Sauvegardé: {output_path} ({len(df_combined)} lignes au total)")
 
-def run_collection(max_per_query: int, dry_run: bool, sample_size: int, output: Optional[str]):
-    if not SERPAPI_KEY:
+def run_collection(max_per_query: int, dry_run: bool, sample_size: int, output: Optional[str],
+                   concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_RPS,
+                   pages_in_flight: int = DEFAULT_PAGES_IN_FLIGHT, replay: bool = False,
+                   cache_path: Optional[str] = DEFAULT_CACHE_PATH, cache_ttl: float = DEFAULT_TTL,
+                   cache_max_bytes: int = DEFAULT_MAX_BYTES, output_format: str = "store",
+                   store_dir: str = DEFAULT_STORE_DIR, known_pages_stop: int = DEFAULT_KNOWN_PAGES_STOP,
+                   seen_index_path: Optional[str] = None, blob_dir: str = DEFAULT_BLOB_DIR):
+    if not SERPAPI_KEY and not replay:
         print("❌ SERPAPI_KEY non configuré. Exportez SERPAPI_KEY dans votre environnement.")
         return
+    if replay and not cache_path:
+        print("❌ Le mode replay nécessite le cache (retirez --no-cache).")
+        return
+
+    cache = ResponseCache(cache_path, default_ttl=cache_ttl, max_bytes=cache_max_bytes) if cache_path else None
+    if replay:
+        print("🔁 Mode replay: réponses servies uniquement depuis le cache")
+        # No network: the rate limiter must not slow the replay down
+        rps = max(rps, 1e6)
+
+    # Ids from earlier runs: an explicit index file, the store's own index,
+    # or an index next to the merged CSV
+    store = PartitionedStore(store_dir) if output_format == "store" and not dry_run else None
+    if seen_index_path:
+        seen_index = IdIndex(seen_index_path)
+    elif store is not None:
+        seen_index = store.index
+    elif output_format == "csv" and not dry_run:
+        seen_index = IdIndex(default_seen_index_path(output or DEFAULT_OUTPUT_CSV))
+    else:
+        seen_index = None
+    if seen_index is not None and known_pages_stop:
+        print(f"⏭️ Arrêt d'une requête après {known_pages_stop} pages consécutives déjà connues ({len(seen_index)} ids)")
 
     # In dry-run we limit aggressively; the CLI sample_size overrides per-query cap.
     effective_max = max_per_query if not dry_run else max(1, sample_size)
 
-    all_normalized = []
+    tasks = []
     for country, role_map in QUERIES.items():
         location_hint = LOCATION_HINTS.get(country, {"location": country, "hl": "en", "gl": ""})
-        language = location_hint.get("hl", "en")
         for role, query_text in role_map.items():
-            try:
-                jobs = collect_for_query(query_text, location_hint, max_results=effective_max)
-                for job in jobs:
-                    norm = normalize_job(job, role=role, country=country, language=language)
-                    all_normalized.append(norm)
-                # Small pause between role queries
-                time.sleep(1.0)
-            except Exception as e:
-                print(f"⚠️ Erreur lors de la collecte {country} / {role} : {e}")
+            tasks.append({"query": query_text, "location_hint": location_hint, "country": country, "role": role})
+
+    print(f"🚀 {len(tasks)} requêtes, concurrence {concurrency}, {rps} req/s max")
+    results = collect_concurrent(tasks, max_results=effective_max, concurrency=concurrency,
+                                 rps=rps, pages_in_flight=pages_in_flight, cache=cache, replay=replay,
+                                 seen_index=seen_index, known_pages_stop=known_pages_stop)
+    if cache is not None:
+        st = cache.stats()
+        print(f"🗄️ Cache: {st['hits']} hits, {st['misses']} misses, {st['entries']} entrées ({st['bytes'] / 1e6:.1f} Mo)")
+
+    all_normalized = []
+    raw_payloads = []
+    for task, jobs in zip(tasks, results):
+        language = task["location_hint"].get("hl", "en")
+        for job in jobs:
+            norm = normalize_job(job, role=task["role"], country=task["country"], language=language)
+            all_normalized.append(norm)
+            raw_payloads.append((norm["raw_ref"], job))
 
     if not all_normalized:
         print("⚠️ Aucun enregistrement collecté.")
         return
 
+    blobs = BlobStore(blob_dir)
+    written = blobs.put_many(raw_payloads)
+    print(f"🗃️ Payloads bruts: {written} nouveaux dans {blob_dir} ({len(blobs)} au total)")
+    blobs.close()
+
     # If dry-run requested and sample_size smaller than collected, downsample deterministically
     df = pd.DataFrame(all_normalized)
     if dry_run:
         sample_path = output or DEFAULT_SAMPLE_CSV
         # deterministic sample: sort by id and take first N
         df_sampled = df.sort_values(by="id").head(sample_size)
-        merge_and_save(df_sampled.to_dict(orient="records"), sample_path)
+        merge_and_save(df_sampled.to_dict(orient="records"), sample_path, blob_dir)
         print(f"🔎 Mode dry-run: écrit un échantillon de {len(df_sampled)} enregistrements dans {sample_path}")
-    else:
+    elif output_format == "csv":
         out_path = output or DEFAULT_OUTPUT_CSV
-        merge_and_save(df.to_dict(orient="records"), out_path)
+        merge_and_save(df.to_dict(orient="records"), out_path, blob_dir)
+    else:
+        written = store.append(df)
+        print(f"✅ Store {store_dir}: {written} nouvelles offres ({len(store)} au total)")
+
+    # Ids recorded once the output is written (the store indexes its own on append).
+    # A dry-run sample is not the corpus: its ids are not marked as seen.
+    if seen_index is not None and not dry_run and (store is None or seen_index is not store.index):
+        seen_index.add(df["id"])
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Collecte offres Google Jobs via SerpApi (avec mode dry-run).")
@@ -212,13 +384,32 @@ def parse_args():
     parser.add_argument("--sample-size", type=int, default=20, help="Nombre d'enregistrements à écrire en dry-run (défaut: 20).")
     parser.add_argument("--max-per-query", type=int, default=DEFAULT_MAX_PER_QUERY, help="Nombre max d'offres à récupérer par rôle/pays en mode normal.")
     parser.add_argument("--output", type=str, default=None, help="Chemin de sortie CSV (optionnel).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Nombre max de requêtes HTTP simultanées.")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS, help="Débit global max vers SerpApi (requêtes/seconde).")
+    parser.add_argument("--pages-in-flight", type=int, default=DEFAULT_PAGES_IN_FLIGHT, help="Pages d'une même requête chargées en parallèle.")
+    parser.add_argument("--format", dest="output_format", choices=["store", "csv"], default="store", help="Sortie: store partitionné Parquet (défaut) ou CSV fusionné.")
+    parser.add_argument("--store-dir", type=str, default=DEFAULT_STORE_DIR, help="Dossier du store partitionné.")
+    parser.add_argument("--blob-dir", type=str, default=DEFAULT_BLOB_DIR, help="Dossier du store des payloads JSON bruts (colonne raw_ref).")
+    parser.add_argument("--known-pages-stop", type=int, default=DEFAULT_KNOWN_PAGES_STOP, help="Arrêter une requête après N pages consécutives d'offres déjà collectées (0 = désactivé).")
+    parser.add_argument("--seen-index", type=str, default=None, help="Index SQLite des ids déjà vus (défaut: index du store, ou <sortie>_ids.sqlite avec --format csv).")
+    parser.add_argument("--replay", action="store_true", help="Servir uniquement depuis le cache (aucun appel réseau).")
+    parser.add_argument("--no-cache", action="store_true", help="Désactiver le cache des réponses SerpApi.")
+    parser.add_argument("--cache-path", type=str, default=DEFAULT_CACHE_PATH, help="Fichier SQLite du cache de réponses.")
+    parser.add_argument("--cache-ttl-hours", type=float, default=DEFAULT_TTL / 3600, help="Durée de validité des réponses en cache (heures).")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024**2, help="Taille max du cache (Mo, éviction LRU).")
     return parser.parse_args()
 
 def main():
     args = parse_args()
     if args.dry_run:
         print("⚠️ Mode dry-run activé — collecte limitée et sortie sample CSV.")
-    run_collection(max_per_query=args.max_per_query, dry_run=args.dry_run, sample_size=args.sample_size, output=args.output)
+    run_collection(max_per_query=args.max_per_query, dry_run=args.dry_run, sample_size=args.sample_size, output=args.output,
+                   concurrency=args.concurrency, rps=args.rps, pages_in_flight=args.pages_in_flight,
+                   replay=args.replay, cache_path=None if args.no_cache else args.cache_path,
+                   cache_ttl=args.cache_ttl_hours * 3600, cache_max_bytes=int(args.cache_max_mb * 1024**2),
+                   output_format=args.output_format, store_dir=args.store_dir,
+                   known_pages_stop=args.known_pages_stop, seen_index_path=args.seen_index,
+                   blob_dir=args.blob_dir)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+scripts/01d_consolidate.py
+
+Consolidation des sorties brutes des collecteurs en data/corpus.csv.
+
+Trois schémas coexistent sous data/raw/:
+- 01c_serp_collect.py: id (sha1), company, description, country, role_query,
+  language, retrieved_at... (CSV, ou store Parquet partitionné)
+- 01b_auto_collect.py et OffreCollector (01_collect.py): schéma du corpus
+  (pays, role, entreprise, texte_brut, langue, type...)
+- fichiers JSONL/Parquet isolés dans l'un ou l'autre schéma
+
+Chaque fichier est lu par chunks (CSV, JSONL, Parquet, store via
+pyarrow.dataset), converti au schéma du corpus par des opérations pandas
+vectorisées, dédoublonné, puis ajouté au corpus écrit lui aussi par chunks
+(fichier temporaire renommé à la fin). Les ids déjà écrits sont tenus dans
+un index SQLite temporaire (id_index.py), pas en mémoire: la mémoire ne
+dépend que de la taille des chunks.
+
+Les offres reçoivent des ids stables FR_PO_001, US_SM_042... : une clé
+(identifiant d'origine de l'offre) est associée une fois pour toutes à un
+id dans data/corpus_ids.sqlite; les nouvelles clés prennent le numéro
+suivant de leur préfixe. Les référentiels (Scrum Guide, ROME...) gardent
+leur id.
+
+Usage:
+    python scripts/01d_consolidate.py [--raw-dir DIR] [--output PATH] [--chunk-size N]
+"""
+from __future__ import annotations
+import argparse
+import fnmatch
+import hashlib
+import os
+import sqlite3
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from corpus_store import INDEX_FILE, PartitionedStore
+from html_cleaner import nettoyer_lot
+from id_index import IdIndex
+
+CORPUS_COLUMNS = ["id", "pays", "role", "source", "entreprise", "url", "date_collecte", "texte_brut", "langue", "type"]
+ROLE_CODES = {"Product Owner": "PO", "Scrum Master": "SM", "Product Manager": "PM"}
+
+DEFAULT_RAW_DIR = "data/raw"
+DEFAULT_REFERENCES = ["data/scrum_guide_reference.csv"]
+DEFAULT_OUTPUT = "data/corpus.csv"
+DEFAULT_ID_MAP = "data/corpus_ids.sqlite"
+DEFAULT_CHUNK_SIZE = 50_000
+# Échantillons de dry-run et fichiers internes (cache SerpApi...) ignorés
+DEFAULT_EXCLUDE = ("*_sample.*", "*.sqlite", ".*")
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+
+class IdRegistry:
+    """Correspondance persistante clé d'offre → id stable (préfixe + numéro)."""
+
+    def __init__(self, path: str = DEFAULT_ID_MAP):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ids (key TEXT PRIMARY KEY, id TEXT UNIQUE, prefix TEXT, number INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_prefix ON ids(prefix, number)")
+        self._conn.commit()
+
+    def assign(self, keys: pd.Series, prefixes: pd.Series) -> pd.Series:
+        """Ids des clés (créés pour les clés inconnues, dans l'ordre d'apparition)."""
+        unique = pd.DataFrame({"key": keys.values, "prefix": prefixes.values}).drop_duplicates("key")
+        known = {}
+        keys_list = unique["key"].tolist()
+        for k in range(0, len(keys_list), _CHUNK):
+            chunk = keys_list[k:k + _CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(self._conn.execute(f"SELECT key, id FROM ids WHERE key IN ({placeholders})", chunk))
+
+        new = unique[~unique["key"].isin(known)].copy()
+        if not new.empty:
+            starts = {p: self._next_number(p) for p in new["prefix"].unique()}
+            new["number"] = new.groupby("prefix", sort=False).cumcount() + new["prefix"].map(starts)
+            new["id"] = new["prefix"] + "_" + new["number"].map("{:03d}".format)
+            self._conn.executemany("INSERT INTO ids VALUES (?, ?, ?, ?)",
+                                   new[["key", "id", "prefix", "number"]].itertuples(index=False, name=None))
+            self._conn.commit()
+            known.update(zip(new["key"], new["id"]))
+        return keys.map(known)
+
+    def _next_number(self, prefix: str) -> int:
+        row = self._conn.execute("SELECT MAX(number) FROM ids WHERE prefix = ?", (prefix,)).fetchone()
+        return (row[0] or 0) + 1
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+# ============================================================================
+# LECTURE EN FLUX
+# ============================================================================
+
+def list_sources(raw_dir: str, exclude: Sequence[str] = DEFAULT_EXCLUDE) -> List[tuple]:
+    """(chemin, format) des fichiers bruts; un store partitionné compte pour une source."""
+    sources = []
+    for root, dirs, files in os.walk(raw_dir):
+        if INDEX_FILE in files:
+            sources.append((root, "store"))
+            dirs[:] = []
+            continue
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+                continue
+            ext = os.path.splitext(name)[1].lower()
+            kind = {".csv": "csv", ".jsonl": "jsonl", ".parquet": "parquet"}.get(ext)
+            if kind:
+                sources.append((os.path.join(root, name), kind))
+    return sources
+
+
+def iter_chunks(path: str, kind: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Chunks d'un fichier brut, toutes colonnes en chaînes (valeurs manquantes = '')."""
+    if kind == "csv":
+        chunks = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    elif kind == "jsonl":
+        chunks = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+        chunks = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    elif kind == "store":
+        chunks = (b.to_pandas() for b in PartitionedStore(path).scan(batch_size=chunk_size))
+    else:
+        raise ValueError(f"Format inconnu: {kind}")
+    for chunk in chunks:
+        yield chunk.astype(object).where(chunk.notna(), "").astype(str)
+
+
+def read_references(path: str) -> pd.DataFrame:
+    """Référentiels; tolère un en-tête plus court que les lignes (colonnes du corpus)."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if not isinstance(df.index, pd.RangeIndex):
+        # Lignes plus longues que l'en-tête: pandas a pris les premières colonnes comme index
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, header=None, skiprows=1, names=CORPUS_COLUMNS)
+    return df
+
+
+# ============================================================================
+# CORRESPONDANCE DES SCHÉMAS (vectorisée)
+# ============================================================================
+
+def _column(df: pd.DataFrame, name: str, default: str = "") -> pd.Series:
+    return df[name] if name in df.columns else pd.Series(default, index=df.index, dtype=object)
+
+
+def _key(*parts: pd.Series) -> pd.Series:
+    """sha1 des champs concaténés (clé d'offre quand l'id d'origine n'est pas stable)."""
+    joined = parts[0].str.cat(list(parts[1:]), sep="\x1f") if len(parts) > 1 else parts[0]
+    return joined.map(lambda s: hashlib.sha1(s.encode("utf-8")).hexdigest())
+
+
+def to_corpus_schema(chunk: pd.DataFrame, clean: bool = True) -> pd.DataFrame:
+    """Convertit un chunk (schéma 01c ou schéma corpus) au schéma du corpus.
+
+    Une colonne `key` identifie l'offre d'origine (pour les ids stables).
+    """
+    if "description" in chunk.columns and "country" in chunk.columns:
+        # Schéma 01c (SerpApi): descriptions brutes, nettoyées comme dans 01b
+        texts = chunk["description"].tolist()
+        out = pd.DataFrame({
+            "pays": chunk["country"],
+            "role": _column(chunk, "role_query"),
+            "source": "Google Jobs",
+            "entreprise": _column(chunk, "company"),
+            "url": _column(chunk, "apply_link"),
+            "date_collecte": _column(chunk, "retrieved_at").str[:10],
+            "texte_brut": nettoyer_lot(texts) if clean else texts,
+            "langue": _column(chunk, "language"),
+            "type": "offre",
+        }, index=chunk.index)
+        if "collected" in chunk.columns:
+            out["date_collecte"] = out["date_collecte"].where(out["date_collecte"] != "", chunk["collected"])
+        # Même clé que make_id: l'id 01c identifie déjà l'offre
+        out["key"] = _column(chunk, "id").where(_column(chunk, "id") != "", _key(out["url"], out["entreprise"], out["texte_brut"]))
+        return out
+
+    if "texte_brut" in chunk.columns:
+        # Schéma corpus (01b, OffreCollector): les ids d'offres sont locaux à
+        # une exécution (FR_PO_001 réutilisé), la clé vient de l'URL ou du contenu
+        out = pd.DataFrame({c: _column(chunk, c) for c in CORPUS_COLUMNS if c != "id"}, index=chunk.index)
+        out["type"] = out["type"].where(out["type"] != "", "offre")
+        url = out["url"].where(~out["url"].str.endswith("..."), "")
+        out["key"] = _key(url, out["entreprise"], out["texte_brut"].where(url == "", ""))
+        out["id"] = _column(chunk, "id")
+        return out
+
+    raise ValueError(f"Schéma non reconnu (colonnes: {', '.join(chunk.columns[:10])})")
+
+
+def assign_ids(df: pd.DataFrame, registry: IdRegistry) -> pd.DataFrame:
+    """Ids stables pour les offres; les autres types gardent leur id."""
+    offers = df["type"] == "offre"
+    codes = df["role"].map(ROLE_CODES)
+    valid = ~offers | (codes.notna() & (df["pays"] != ""))
+    df = df[valid].copy()
+    offers, codes = offers[valid], codes[valid]
+    prefixes = df.loc[offers, "pays"].str[:2].str.upper() + "_" + codes[offers]
+    if "id" not in df.columns:
+        df["id"] = ""
+    if offers.any():
+        df.loc[offers, "id"] = registry.assign(df.loc[offers, "key"], prefixes).values
+    return df
+
+
+# ============================================================================
+# CONSOLIDATION
+# ============================================================================
+
+def _remove_sqlite(path: str):
+    """Supprime une base SQLite et ses fichiers WAL."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def consolidate(raw_dir: str = DEFAULT_RAW_DIR,
+                references: Sequence[str] = DEFAULT_REFERENCES,
+                output: str = DEFAULT_OUTPUT,
+                id_map: str = DEFAULT_ID_MAP,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                clean: bool = True) -> int:
+    """Écrit le corpus consolidé; renvoie le nombre de textes écrits."""
+    registry = IdRegistry(id_map)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp = output + ".tmp"
+    seen_path = output + ".ids.tmp"
+    _remove_sqlite(seen_path)
+    seen = IdIndex(seen_path)
+    stats = {"lus": 0, "doublons": 0, "vides": 0, "ecrits": 0}
+    header = True
+
+    def write(df: pd.DataFrame):
+        nonlocal header
+        dup = df.duplicated("id") | df["id"].isin(seen.known(df["id"]))
+        stats["doublons"] += int(dup.sum())
+        df = df[~dup]
+        seen.add(df["id"])
+        df[CORPUS_COLUMNS].to_csv(tmp, mode="w" if header else "a", header=header, index=False, encoding="utf-8")
+        header = False
+        stats["ecrits"] += len(df)
+
+    for path in references:
+        if os.path.exists(path):
+            refs = read_references(path)
+            stats["lus"] += len(refs)
+            write(refs.reindex(columns=CORPUS_COLUMNS, fill_value=""))
+            print(f"📚 {path}: {len(refs)} référentiels")
+
+    for path, kind in list_sources(raw_dir):
+        n = 0
+        try:
+            for chunk in iter_chunks(path, kind, chunk_size):
+                n += len(chunk)
+                df = to_corpus_schema(chunk, clean=clean)
+                empty = (df["type"] == "offre") & (df["texte_brut"].str.strip() == "")
+                stats["vides"] += int(empty.sum())
+                write(assign_ids(df[~empty], registry))
+        except ValueError as e:
+            print(f"⚠️ {path} ignoré: {e}")
+            continue
+        stats["lus"] += n
+        print(f"📄 {path} ({kind}): {n} lignes")
+
+    if header:
+        # Aucune source: corpus vide avec en-tête
+        pd.DataFrame(columns=CORPUS_COLUMNS).to_csv(tmp, index=False)
+    os.replace(tmp, output)
+    seen.close()
+    _remove_sqlite(seen_path)
+    print(f"✅ {output}: {stats['ecrits']} textes ({stats['lus']} lus, {stats['doublons']} doublons, "
+          f"{stats['vides']} offres sans texte, {len(registry)} ids attribués au total)")
+    registry.close()
+    return stats["ecrits"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Consolide les sorties brutes des collecteurs dans data/corpus.csv.")
+    parser.add_argument("--raw-dir", type=str, default=DEFAULT_RAW_DIR, help=f"Répertoire des sorties brutes (défaut: {DEFAULT_RAW_DIR}).")
+    parser.add_argument("--references", type=str, nargs="*", default=DEFAULT_REFERENCES, help="Fichiers de référentiels (ids conservés).")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help=f"Corpus de sortie (défaut: {DEFAULT_OUTPUT}).")
+    parser.add_argument("--id-map", type=str, default=DEFAULT_ID_MAP, help=f"Correspondance clé → id stable (défaut: {DEFAULT_ID_MAP}).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Lignes lues par chunk.")
+    parser.add_argument("--no-clean", action="store_true", help="Ne pas nettoyer les descriptions SerpApi (HTML, section missions).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    consolidate(raw_dir=args.raw_dir, references=args.references, output=args.output,
+                id_map=args.id_map, chunk_size=args.chunk_size, clean=not args.no_clean)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,719 @@
-"""Script 02 - Calcul des embeddings\n\nCe script calcule les embeddings BGE-M3 pour le corpus collecté.\nSupporte le calcul local, via Hugging Face Inference, ou Google Colab.\n"""\n\nimport numpy as np\nimport pandas as pd\nfrom pathlib import Path\nimport time\nfrom typing import List, Optional\nimport warnings\nwarnings.filterwarnings('ignore')\n\n\nclass EmbeddingCalculator:\n    """Calculateur d'embeddings BGE-M3 avec plusieurs backends."""\n    \n    def __init__(self, model_name: str = 'BAAI/bge-m3'):\n        self.model_name = model_name\n        self.model = None\n        self.embeddings = None\n        self.metadata = None\n        \n    def charger_corpus(self, filepath: str = 'data/corpus.csv') -> pd.DataFrame:\n        """Charge le corpus consolidé."""\n        df = pd.read_csv(filepath)\n        print(f"✅ Corpus chargé: {len(df)} textes")\n        print(f"\nRépartition par pays:")\n        print(df['pays'].value_counts())\n        print(f"\nRépartition par type:")\n        print(df['type'].value_counts())\n        return df\n    \n    def calculer_embeddings_local(self, \n                                   texts: List[str], \n                                   batch_size: int = 16,\n                                   normalize: bool = True) -> np.ndarray:\n        """Calcule les embeddings en local avec sentence-transformers.\n        \n        Args:\n            texts: Liste des textes à encoder\n            batch_size: Taille des batchs\n            normalize: Normaliser les vecteurs (recommandé pour cosine similarity)\n            \n        Returns:\n            Array numpy de shape (n_texts, 1024)\n        """\n        try:\n            from sentence_transformers import SentenceTransformer\n        except ImportError:\n            raise ImportError(\n                "sentence-transformers non installé. "+\n                "Exécutez: pip install sentence-transformers"\n            )\n        \n        print(f"🔄 Chargement du modèle {self.model_name}...")\n        print("   (Premier téléchargement: ~2 Go, peut prendre quelques minutes)")\n        \n        self.model = SentenceTransformer(self.model_name)\n        \n        print(f"\n🧮 Calcul des embeddings pour {len(texts)} textes...")\n        print(f"   Batch size: {batch_size}")\n        print(f"   Normalize: {normalize}")\n        \n        start_time = time.time()\n        \n        embeddings = self.model.encode(\n            texts,\n            batch_size=batch_size,\n            show_progress_bar=True,\n            normalize_embeddings=normalize,\n            convert_to_numpy=True\n        )\n        \n        elapsed = time.time() - start_time\n        print(f"\n✅ Embeddings calculés en {elapsed:.1f}s")\n        print(f"   Shape: {embeddings.shape}")\n        print(f"   Dimension: {embeddings.shape[1]}")\n        \n        return embeddings\n    \n    def calculer_embeddings_hf_inference(self,\n                                         texts: List[str],\n                                         endpoint_url: str,\n                                         hf_token: str,\n                                         batch_size: int = 16) -> np.ndarray:\n        """Calcule les embeddings via Hugging Face Inference Endpoint.\n        \n        Args:\n            texts: Liste des textes à encoder\n            endpoint_url: URL de l'endpoint HF\n            hf_token: Token Hugging Face\n            batch_size: Taille des batchs\n            \n        Returns:\n            Array numpy de shape (n_texts, 1024)\n        """\n        import requests\n        from tqdm import tqdm\n        \n        def get_embeddings_batch(batch):\n            response = requests.post(\n                endpoint_url,\n                json={"inputs": batch},\n                headers={\n                    "Authorization": f"Bearer {hf_token}",\n                    "Content-Type": "application/json"\n                }\n            )\n            if response.status_code == 200:\n                return np.array(response.json()['embeddings'])\n            else:\n                raise ValueError(f"Erreur {response.status_code}: {response.text}")\n        \n        print(f"🔄 Calcul via Hugging Face Inference Endpoint...")\n        print(f"   Batch size: {batch_size}")\n        \n        all_embeddings = []\n        for i in tqdm(range(0, len(texts), batch_size)):\n            batch = texts[i:i+batch_size]\n            emb = get_embeddings_batch(batch)\n            all_embeddings.append(emb)\n            time.sleep(0.1)  # Rate limiting\n        \n        embeddings = np.vstack(all_embeddings)\n        print(f"✅ Embeddings calculés: {embeddings.shape}")\n        \n        return embeddings\n    \n    def sauvegarder_embeddings(self,\n                               embeddings: np.ndarray,\n                               metadata: pd.DataFrame,\n                               emb_path: str = 'embeddings/embeddings_bge_m3.npy',\n                               meta_path: str = 'embeddings/metadata.csv'):\n        """Sauvegarde les embeddings et métadonnées."""\n        # Créer le dossier si nécessaire\n        Path(emb_path).parent.mkdir(parents=True, exist_ok=True)\n        \n        # Sauvegarder embeddings\n        np.save(emb_path, embeddings)\n        print(f"✅ Embeddings sauvegardés: {emb_path}")\n        print(f"   Shape: {embeddings.shape}")\n        \n        # Sauvegarder métadonnées\n        metadata.to_csv(meta_path, index=False)\n        print(f"✅ Métadonnées sauvegardées: {meta_path}")\n        print(f"   Colonnes: {list(metadata.columns)}")\n    \n    def charger_embeddings(self,\n                          emb_path: str = 'embeddings/embeddings_bge_m3.npy',\n                          meta_path: str = 'embeddings/metadata.csv'):\n        """Charge les embeddings existants."""\n        self.embeddings = np.load(emb_path)\n        self.metadata = pd.read_csv(meta_path)\n        \n        print(f"✅ Embeddings chargés: {self.embeddings.shape}")\n        print(f"✅ Métadonnées chargées: {len(self.metadata)} entrées")\n        \n        return self.embeddings, self.metadata\n    \n    def verifier_embeddings(self,\n                           embeddings: np.ndarray,\n                           metadata: pd.DataFrame):\n        """Vérifie l'intégrité des embeddings."""\n        print("\n=== Vérification des embeddings ===")\n        \n        # Vérifier les dimensions\n        assert embeddings.shape[0] == len(metadata), \
-            f"Mismatch: {embeddings.shape[0]} embeddings vs {len(metadata)} métadonnées"\n        print(f"✅ Nombre d'embeddings = nombre de métadonnées ({embeddings.shape[0]})")\n        \n        # Vérifier la dimension\n        assert embeddings.shape[1] == 1024, \
-            f"Dimension attendue: 1024, reçue: {embeddings.shape[1]}"\n        print(f"✅ Dimension correcte: {embeddings.shape[1]}")\n        \n        # Vérifier les NaN\n        assert not np.isnan(embeddings).any(), "NaN détectés dans les embeddings"\n        print(f"✅ Pas de NaN détectés")\n        \n        # Vérifier la normalisation (si attendue)\n        norms = np.linalg.norm(embeddings, axis=1)\n        if np.allclose(norms, 1.0, atol=1e-3):\n            print(f"✅ Vecteurs normalisés (L2 norm ≈ 1.0)")\n        else:\n            print(f"⚠️  Vecteurs non normalisés (L2 norm moyenne: {norms.mean():.3f})")\n        \n        print("\n✅ Tous les tests passés!")\n\n\n# ============================================================================\n# SCRIPT PRINCIPAL\n# ============================================================================\n\nif __name__ == "__main__":\n    \n    # Configuration\n    MODE = "local"  # Options: "local", "hf_inference", "colab"\n    \n    # Initialiser le calculateur\n    calc = EmbeddingCalculator(model_name='BAAI/bge-m3')\n    \n    # Charger le corpus\n    df = calc.charger_corpus('data/corpus.csv')\n    \n    # Extraire les textes et métadonnées\n    texts = df['texte_brut'].tolist()\n    metadata = df[['id', 'pays', 'role', 'source', 'langue', 'type']].copy()\n    \n    # ========================================================================\n    # MODE 1: Calcul local (recommandé)\n    # ========================================================================\n    if MODE == "local":\n        embeddings = calc.calculer_embeddings_local(\n            texts=texts,\n            batch_size=16,\n            normalize=True\n        )\n    \n    # ========================================================================\n    # MODE 2: Hugging Face Inference (si pas de GPU local)\n    # ========================================================================\n    elif MODE == "hf_inference":\n        HF_ENDPOINT = "https://YOUR-ENDPOINT.hf.space/embed"\n        HF_TOKEN = "hf_YOUR_TOKEN_HERE"\n        \n        embeddings = calc.calculer_embeddings_hf_inference(\n            texts=texts,\n            endpoint_url=HF_ENDPOINT,\n            hf_token=HF_TOKEN,\n            batch_size=16\n        )\n    \n    # ========================================================================\n    # MODE 3: Google Colab (utiliser MODE="local" dans Colab)\n    # ========================================================================\n    elif MODE == "colab":\n        print("💡 Pour Google Colab, utilisez MODE='local'")\n        print("   Colab fournit un GPU T4 gratuit qui accélère le calcul")\n        embeddings = calc.calculer_embeddings_local(texts, batch_size=32)\n    \n    # ========================================================================\n    # Vérification et sauvegarde\n    # ========================================================================\n    calc.verifier_embeddings(embeddings, metadata)\n    \n    calc.sauvegarder_embeddings(\n        embeddings=embeddings,\n        metadata=metadata,\n        emb_path='embeddings/embeddings_bge_m3.npy',\n        meta_path='embeddings/metadata.csv'\n    )\n    \n    print("\n" + "="*70)\n    print("🎉 PHASE 2 TERMINÉE!")\n    print("="*70)\n    print("✅ Embeddings calculés et sauvegardés")\n    print("\n📝 PROCHAINES ÉTAPES:")\n    print("1. Vérifier les fichiers dans embeddings/")\n    print("2. Exécuter scripts/03_analyze.py pour l'analyse")\n    print("="*70)\n
\ No newline at end of file
+"""Script 02 - Calcul des embeddings
+
+Ce script calcule les embeddings BGE-M3 pour le corpus collecté.
+Supporte le calcul local, via Hugging Face Inference, ou Google Colab.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import time
+from typing import List, Optional
+import warnings
+warnings.filterwarnings('ignore')
+
+from batch_encoding import (POOLINGS, dimensionner_pool, encoder_multiprocess,
+                            encoder_par_budget, encoder_par_fenetres)
+from boilerplate import filtrer_boilerplate
+from compact_embeddings import sauvegarder_compact
+from embed_daemon import DEFAULT_DAEMON_URL, ClientDaemon
+from embedding_cache import CacheEmbeddings, resoudre_revision
+from near_duplicates import dedoublonner
+from onnx_backend import BACKENDS, charger_modele_onnx, preparer_export
+
+
+class EmbeddingCalculator:
+    """Calculateur d'embeddings BGE-M3 avec plusieurs backends."""
+    
+    def __init__(self,
+                 model_name: str = 'BAAI/bge-m3',
+                 model_revision: Optional[str] = None,
+                 max_seq_length: Optional[int] = None,
+                 cache_dir: Optional[str] = 'embeddings/cache',
+                 cache_max_entrees: Optional[int] = 500_000,
+                 pooling_fenetres: Optional[str] = None,
+                 chevauchement_fenetres: int = 64,
+                 backend: str = 'torch',
+                 daemon_url: Optional[str] = None):
+        """
+        Args:
+            model_name: Nom du modèle sentence-transformers
+            model_revision: Révision du modèle (branche, tag ou commit HF)
+            max_seq_length: Longueur max de séquence (None = valeur du modèle)
+            cache_dir: Dossier du cache d'embeddings (None = pas de cache)
+            cache_max_entrees: Nombre max de vecteurs en cache (éviction LRU)
+            pooling_fenetres: None = textes tronqués à max_seq_length;
+                'moyenne' ou 'ponderee' = textes longs découpés en fenêtres de
+                max_seq_length tokens puis vecteurs moyennés (simple ou
+                pondérée par le nombre de tokens de chaque fenêtre)
+            chevauchement_fenetres: Tokens partagés par deux fenêtres successives
+            backend: 'torch' (PyTorch), 'onnx' (ONNX Runtime) ou 'onnx-int8'
+                (ONNX Runtime, poids quantifiés int8; CPU uniquement)
+            daemon_url: Daemon d'embeddings (scripts/embed_daemon.py) utilisé à
+                la place du modèle local s'il tourne avec la même configuration,
+                par ex. DEFAULT_DAEMON_URL (None = toujours charger le modèle
+                dans le processus; aucun port local n'est interrogé)
+        """
+        if pooling_fenetres is not None and pooling_fenetres not in POOLINGS:
+            raise ValueError(f"pooling_fenetres inconnu: {pooling_fenetres} "
+                             f"(attendu: None, {', '.join(POOLINGS)})")
+        if backend not in BACKENDS:
+            raise ValueError(f"backend inconnu: {backend} (attendu: {', '.join(BACKENDS)})")
+        self.model_name = model_name
+        self.model_revision = model_revision
+        self.max_seq_length = max_seq_length
+        self.pooling_fenetres = pooling_fenetres
+        self.chevauchement_fenetres = chevauchement_fenetres
+        self.backend = backend
+        self.daemon = ClientDaemon(daemon_url) if daemon_url else None
+        self._daemon_actif = None
+        self.model = None
+        self.embeddings = None
+        self.metadata = None
+        self.cache = (CacheEmbeddings(cache_dir, max_entrees=cache_max_entrees)
+                      if cache_dir else None)
+        
+    def charger_corpus(self, filepath: str = 'data/corpus.csv') -> pd.DataFrame:
+        """Charge le corpus consolidé."""
+        df = pd.read_csv(filepath)
+        print(f"✅ Corpus chargé: {len(df)} textes")
+        print(f"\nRépartition par pays:")
+        print(df['pays'].value_counts())
+        print(f"\nRépartition par type:")
+        print(df['type'].value_counts())
+        return df
+    
+    def calculer_embeddings_local(self, 
+                                   texts: List[str], 
+                                   batch_size: int = 16,
+                                   normalize: bool = True,
+                                   budget_tokens: Optional[int] = None) -> np.ndarray:
+        """Calcule les embeddings en local avec sentence-transformers.
+        
+        Args:
+            texts: Liste des textes à encoder
+            batch_size: Taille des batchs
+            normalize: Normaliser les vecteurs (recommandé pour cosine similarity)
+            budget_tokens: Si défini, batchs formés par longueur tokenisée sous ce
+                budget (textes × longueur max) au lieu de batch_size textes
+            
+        Returns:
+            Array numpy de shape (n_texts, 1024)
+        """
+        print(f"\n🧮 Calcul des embeddings pour {len(texts)} textes...")
+        if budget_tokens:
+            print(f"   Budget tokens par batch: {budget_tokens}")
+        else:
+            print(f"   Batch size: {batch_size}")
+        print(f"   Normalize: {normalize}")
+        if self.pooling_fenetres:
+            print(f"   Fenêtres: {self.max_seq_length or 'défaut'} tokens, "
+                  f"chevauchement {self.chevauchement_fenetres}, pooling {self.pooling_fenetres}")
+        
+        start_time = time.time()
+        
+        encoder = self._encodeur_local(batch_size, normalize, budget_tokens)
+        embeddings = self._encoder_avec_cache(texts, normalize, encoder)
+        
+        elapsed = time.time() - start_time
+        print(f"\n✅ Embeddings calculés en {elapsed:.1f}s")
+        print(f"   Shape: {embeddings.shape}")
+        print(f"   Dimension: {embeddings.shape[1]}")
+        
+        return embeddings
+    
+    def calculer_embeddings_multiprocess(self,
+                                         texts: List[str],
+                                         n_workers: Optional[int] = None,
+                                         memoire_par_worker_go: float = 3.0,
+                                         threads_par_worker: Optional[int] = None,
+                                         batch_size: int = 16,
+                                         normalize: bool = True,
+                                         budget_tokens: Optional[int] = None,
+                                         verifier_echantillon: int = 0) -> np.ndarray:
+        """Calcule les embeddings sur CPU avec un pool de processus.
+        
+        Chaque worker charge sa propre copie du modèle (~2-3 Go de RAM) et
+        utilise threads_par_worker threads PyTorch.
+        
+        Args:
+            texts: Liste des textes à encoder
+            n_workers: Nombre de workers (None = selon cœurs et RAM libre)
+            memoire_par_worker_go: RAM réservée par worker, plafonne n_workers
+            threads_par_worker: Threads PyTorch par worker (None = cœurs / workers)
+            batch_size: Taille des batchs
+            normalize: Normaliser les vecteurs
+            budget_tokens: Budget de tokens par batch (voir calculer_embeddings_local)
+            verifier_echantillon: Si > 0, ré-encode ce nombre de textes en
+                mono-processus et vérifie l'égalité des vecteurs
+            
+        Returns:
+            Array numpy de shape (n_texts, 1024)
+        """
+        n_workers, threads_par_worker = dimensionner_pool(
+            n_workers, memoire_par_worker_go, threads_par_worker
+        )
+        
+        print(f"\n🧮 Calcul multi-processus pour {len(texts)} textes...")
+        print(f"   Workers: {n_workers} × {threads_par_worker} threads ({self.backend})")
+        print(f"   Normalize: {normalize}")
+        
+        start_time = time.time()
+        
+        def encoder(textes_manquants):
+            if self.backend != 'torch':
+                # Export fait une fois ici, pas en parallèle dans chaque worker
+                preparer_export(self.model_name, self.model_revision,
+                                quantifier=self.backend == 'onnx-int8')
+            return encoder_multiprocess(
+                textes_manquants,
+                model_name=self.model_name,
+                revision=self.model_revision,
+                backend=self.backend,
+                max_seq_length=self.max_seq_length,
+                n_workers=n_workers,
+                threads_par_worker=threads_par_worker,
+                normalize=normalize,
+                batch_size=batch_size,
+                budget_tokens=budget_tokens,
+                pooling=self.pooling_fenetres,
+                chevauchement=self.chevauchement_fenetres
+            )
+        
+        embeddings = self._encoder_avec_cache(texts, normalize, encoder)
+        
+        elapsed = time.time() - start_time
+        print(f"\n✅ Embeddings calculés en {elapsed:.1f}s")
+        print(f"   Shape: {embeddings.shape}")
+        
+        if verifier_echantillon > 0:
+            echantillon = texts[:verifier_echantillon]
+            reference = self._encodeur_local(batch_size, normalize,
+                                             show_progress_bar=False)(echantillon)
+            ecart = np.abs(embeddings[:len(echantillon)] - reference).max()
+            print(f"   Écart max vs mono-processus: {ecart:.2e}")
+            assert ecart < 1e-4, f"Écart trop important vs mono-processus: {ecart:.2e}"
+        
+        return embeddings
+    
+    def calculer_embeddings_streaming(self,
+                                      texts: List[str],
+                                      emb_path: str = 'embeddings/embeddings_bge_m3.npy',
+                                      taille_bloc: int = 1024,
+                                      batch_size: int = 16,
+                                      normalize: bool = True,
+                                      budget_tokens: Optional[int] = None,
+                                      sauvegarde_cache_blocs: int = 8) -> np.ndarray:
+        """Calcule les embeddings en local en écrivant chaque bloc sur disque.
+        
+        Les vecteurs sont écrits au fil de l'eau dans un .npy préalloué ouvert
+        en memory-mapping; un journal (<emb_path>.progress.json) enregistre le
+        nombre de blocs terminés. Une exécution relancée sur le même corpus
+        reprend au premier bloc non terminé. La RAM utilisée ne dépend que de
+        taille_bloc, pas de la taille du corpus.
+        
+        Args:
+            texts: Liste des textes à encoder
+            emb_path: Chemin du fichier .npy de sortie
+            taille_bloc: Nombre de textes par bloc journalisé
+            batch_size: Taille des batchs
+            normalize: Normaliser les vecteurs
+            budget_tokens: Budget de tokens par batch (voir calculer_embeddings_local)
+            sauvegarde_cache_blocs: L'index du cache est réécrit tous les N
+                blocs (et en fin d'exécution) plutôt qu'à chaque bloc
+            
+        Returns:
+            np.memmap de shape (n_texts, 1024) adossé à emb_path
+            (array vide (0, dim) si texts est vide)
+        """
+        if not texts:
+            # Aucun bloc à écrire: array vide à la dimension du modèle
+            return np.empty((0, self._dimension_modele()), dtype=np.float32)
+        
+        Path(emb_path).parent.mkdir(parents=True, exist_ok=True)
+        journal_path = Path(emb_path).with_suffix('.progress.json')
+        empreinte = self._empreinte_corpus(texts, normalize)
+        n_blocs = (len(texts) + taille_bloc - 1) // taille_bloc
+        
+        print(f"\n🧮 Calcul des embeddings (streaming) pour {len(texts)} textes...")
+        print(f"   Blocs: {n_blocs} × {taille_bloc} textes → {emb_path}")
+        
+        encoder = self._encodeur_local(batch_size, normalize, budget_tokens,
+                                       show_progress_bar=False)
+        start_time = time.time()
+        
+        # Reprise si le journal correspond au même corpus et au même découpage
+        embeddings = None
+        bloc_depart = 0
+        if journal_path.exists() and Path(emb_path).exists():
+            journal = json.loads(journal_path.read_text(encoding='utf-8'))
+            if journal.get('empreinte') == empreinte and journal.get('taille_bloc') == taille_bloc:
+                embeddings = np.lib.format.open_memmap(emb_path, mode='r+')
+                bloc_depart = journal['blocs_termines']
+                print(f"🔁 Reprise au bloc {bloc_depart + 1}/{n_blocs}")
+        
+        try:
+            for b in range(bloc_depart, n_blocs):
+                debut, fin = b * taille_bloc, min((b + 1) * taille_bloc, len(texts))
+                emb = self._encoder_avec_cache(texts[debut:fin], normalize, encoder,
+                                               sauvegarder_cache=False)
+                
+                if embeddings is None:
+                    # Premier bloc: la dimension est connue, on préalloue le fichier
+                    embeddings = np.lib.format.open_memmap(
+                        emb_path, mode='w+', dtype=np.float32,
+                        shape=(len(texts), emb.shape[1])
+                    )
+                
+                embeddings[debut:fin] = emb
+                embeddings.flush()
+                self._ecrire_journal(journal_path, {
+                    'empreinte': empreinte,
+                    'taille_bloc': taille_bloc,
+                    'n_textes': len(texts),
+                    'blocs_termines': b + 1,
+                })
+                print(f"   [{b + 1}/{n_blocs}] textes {debut}-{fin - 1} écrits")
+                if self.cache is not None and (b + 1) % sauvegarde_cache_blocs == 0:
+                    self.cache.sauvegarder()
+        finally:
+            # Vecteurs des blocs terminés gardés dans le cache même après une erreur
+            if self.cache is not None:
+                self.cache.sauvegarder()
+        
+        journal_path.unlink(missing_ok=True)
+        
+        elapsed = time.time() - start_time
+        print(f"\n✅ Embeddings calculés en {elapsed:.1f}s")
+        print(f"   Shape: {embeddings.shape}")
+        
+        return embeddings
+    
+    def _encodeur_local(self,
+                        batch_size: int,
+                        normalize: bool,
+                        budget_tokens: Optional[int] = None,
+                        show_progress_bar: bool = True):
+        """Fonction d'encodage in-process (liste de textes -> array)."""
+        def encoder(textes_manquants):
+            if self._utiliser_daemon():
+                try:
+                    return self.daemon.encoder(textes_manquants, normalize,
+                                               batch_size, budget_tokens)
+                except OSError as e:
+                    print(f"⚠️  Daemon injoignable ({e}), chargement du modèle en local")
+                    self._daemon_actif = False
+            self._charger_modele()
+            if self.pooling_fenetres:
+                embeddings, stats = encoder_par_fenetres(
+                    self.model, textes_manquants, self.pooling_fenetres,
+                    self.chevauchement_fenetres, normalize=normalize,
+                    batch_size=batch_size, budget_tokens=budget_tokens,
+                    show_progress_bar=show_progress_bar
+                )
+                print(f"   Fenêtres: {stats['n_fenetres']} pour {len(textes_manquants)} textes "
+                      f"({stats['n_documents_decoupes']} découpés, "
+                      f"max {stats['fenetres_max_par_document']} par texte)")
+                return embeddings
+            if budget_tokens:
+                embeddings, stats = encoder_par_budget(
+                    self.model, textes_manquants, budget_tokens,
+                    normalize=normalize, batch_size_reference=batch_size,
+                    show_progress_bar=show_progress_bar
+                )
+                print(f"   Batchs: {stats['n_batches']}")
+                print(f"   Efficacité padding: {stats['efficacite_padding']:.1%} "
+                      f"(batchs fixes de {batch_size}: "
+                      f"{stats['efficacite_padding_reference']:.1%})")
+                return embeddings
+            return self.model.encode(
+                textes_manquants,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                normalize_embeddings=normalize,
+                convert_to_numpy=True
+            )
+        return encoder
+    
+    def _empreinte_corpus(self, texts: List[str], normalize: bool) -> str:
+        """Empreinte du corpus et des paramètres qui changent les vecteurs."""
+        h = hashlib.blake2b(digest_size=16)
+        revision = resoudre_revision(self.model_name, self.model_revision)
+        h.update(f"{self.model_name}|{revision}|{normalize}|"
+                 f"{self.max_seq_length}|{self._variante()}|{len(texts)}".encode('utf-8'))
+        for t in texts:
+            h.update(b'\x1e' + str(t).encode('utf-8'))
+        return h.hexdigest()
+    
+    def _utiliser_daemon(self) -> bool:
+        """Vrai si un daemon compatible tourne (vérifié une fois, modèle local non chargé)."""
+        if self.daemon is None or self.model is not None:
+            return False
+        if self._daemon_actif is None:
+            self._daemon_actif = self.daemon.compatible({
+                'model_name': self.model_name,
+                'model_revision': self.model_revision,
+                'max_seq_length': self.max_seq_length,
+                'variante': self._variante(),
+            })
+            if self._daemon_actif:
+                print(f"🔌 Daemon d'embeddings utilisé: {self.daemon.url}")
+        return self._daemon_actif
+    
+    def _variante(self) -> str:
+        """Part de la clé de cache propre au mode d'encodage (vide = PyTorch, troncature)."""
+        parties = []
+        if self.backend != 'torch':
+            parties.append(self.backend)
+        if self.pooling_fenetres:
+            parties.append(f"fenetres:{self.pooling_fenetres}:{self.chevauchement_fenetres}")
+        return '|'.join(parties)
+    
+    @staticmethod
+    def _ecrire_journal(journal_path: Path, contenu: dict):
+        """Écrit le journal de progression de façon atomique."""
+        tmp = journal_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(contenu), encoding='utf-8')
+        os.replace(tmp, journal_path)
+    
+    def _charger_modele(self):
+        """Charge le modèle sentence-transformers (une seule fois)."""
+        if self.model is not None:
+            return self.model
+        
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "sentence-transformers non installé. "+
+                "Exécutez: pip install sentence-transformers"
+            )
+        
+        print(f"🔄 Chargement du modèle {self.model_name}...")
+        print("   (Premier téléchargement: ~2 Go, peut prendre quelques minutes)")
+        
+        if self.backend == 'torch':
+            self.model = SentenceTransformer(self.model_name, revision=self.model_revision)
+        else:
+            self.model = charger_modele_onnx(self.model_name, self.model_revision,
+                                             quantifier=self.backend == 'onnx-int8')
+        if self.max_seq_length is not None:
+            self.model.max_seq_length = self.max_seq_length
+        return self.model
+    
+    def _dimension_modele(self) -> int:
+        """Dimension des vecteurs du modèle (chargé si besoin)."""
+        return self._charger_modele().get_sentence_embedding_dimension()
+    
+    def _charger_tokenizer(self):
+        """Tokenizer du modèle, sans charger les poids si le modèle n'est pas déjà chargé."""
+        if self.model is not None:
+            return self.model.tokenizer
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(self.model_name, revision=self.model_revision)
+    
+    def _encoder_avec_cache(self,
+                            texts: List[str],
+                            normalize: Optional[bool],
+                            encoder,
+                            sauvegarder_cache: bool = True) -> np.ndarray:
+        """Encode uniquement les textes absents du cache, dans l'ordre d'origine.
+        
+        Args:
+            texts: Liste des textes à encoder
+            normalize: Drapeau de normalisation (fait partie de la clé)
+            encoder: Fonction liste de textes -> array (n, dim)
+            sauvegarder_cache: Réécrire l'index du cache à la fin de l'appel
+                (False: l'appelant le sauvegarde après plusieurs appels)
+        
+        Returns:
+            Array (len(texts), dim); (0, dim) si texts est vide
+        """
+        if not texts:
+            return np.empty((0, self._dimension_modele()), dtype=np.float32)
+        if self.cache is None:
+            return np.asarray(encoder(texts), dtype=np.float32)
+        
+        cles = self.cache.cles(texts, self.model_name, self.model_revision,
+                               normalize, self.max_seq_length, self._variante())
+        trouves, embeddings = self.cache.chercher(cles)
+        manquants = np.flatnonzero(~trouves)
+        print(f"   Cache: {int(trouves.sum())}/{len(texts)} textes déjà encodés")
+        
+        if len(manquants) > 0:
+            nouveaux = np.asarray(encoder([texts[i] for i in manquants]),
+                                  dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), nouveaux.shape[1]), dtype=np.float32)
+            embeddings[manquants] = nouveaux
+            self.cache.ajouter(cles[manquants], nouveaux, sauvegarder=False)
+        
+        # Index réécrit seulement si des vecteurs ont été ajoutés (dates d'accès: en différé)
+        if sauvegarder_cache:
+            self.cache.sauvegarder()
+        return embeddings
+    
+    def calculer_embeddings_hf_inference(self,
+                                         texts: List[str],
+                                         endpoint_url: str,
+                                         hf_token: str,
+                                         batch_size: int = 16,
+                                         concurrence: int = 8,
+                                         requetes_par_seconde: float = 10.0,
+                                         max_retries: int = 5) -> np.ndarray:
+        """Calcule les embeddings via Hugging Face Inference Endpoint.
+        
+        Les batchs partent en parallèle (client asynchrone, connexions
+        persistantes) sous un débit max, avec retries respectant Retry-After.
+        
+        Args:
+            texts: Liste des textes à encoder
+            endpoint_url: URL de l'endpoint HF
+            hf_token: Token Hugging Face
+            batch_size: Taille des batchs
+            concurrence: Nombre max de requêtes en vol
+            requetes_par_seconde: Débit max vers l'endpoint
+            max_retries: Nombre max de nouvelles tentatives par batch
+            
+        Returns:
+            Array numpy de shape (n_texts, 1024)
+        """
+        from hf_client import ClientEmbeddingsHF
+        
+        print(f"🔄 Calcul via Hugging Face Inference Endpoint...")
+        print(f"   Batch size: {batch_size}")
+        print(f"   Concurrence: {concurrence} requêtes, {requetes_par_seconde} req/s max")
+        
+        client = ClientEmbeddingsHF(
+            endpoint_url,
+            hf_token,
+            concurrence=concurrence,
+            requetes_par_seconde=requetes_par_seconde,
+            max_retries=max_retries
+        )
+        
+        def encoder(textes_manquants):
+            return client.encoder(textes_manquants, batch_size=batch_size)
+        
+        # normalize=None: vecteurs tels que renvoyés par l'endpoint
+        embeddings = self._encoder_avec_cache(texts, None, encoder)
+        print(f"✅ Embeddings calculés: {embeddings.shape}")
+        
+        return embeddings
+    
+    def sauvegarder_embeddings(self,
+                               embeddings: np.ndarray,
+                               metadata: pd.DataFrame,
+                               emb_path: str = 'embeddings/embeddings_bge_m3.npy',
+                               meta_path: str = 'embeddings/metadata.csv',
+                               precisions_compactes=()):
+        """Sauvegarde les embeddings et métadonnées.
+        
+        Args:
+            precisions_compactes: Copies compactes écrites en plus du float32
+                ('float16', 'int8', 'binaire'; voir compact_embeddings.py)
+        """
+        # Créer le dossier si nécessaire
+        Path(emb_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # Sauvegarder embeddings (déjà sur disque si calculés en streaming)
+        if (isinstance(embeddings, np.memmap) and embeddings.filename
+                and Path(embeddings.filename).resolve() == Path(emb_path).resolve()):
+            embeddings.flush()
+        else:
+            np.save(emb_path, embeddings)
+        print(f"✅ Embeddings sauvegardés: {emb_path}")
+        print(f"   Shape: {embeddings.shape}")
+        
+        for precision in precisions_compactes:
+            chemin = sauvegarder_compact(embeddings, emb_path, precision)
+            print(f"✅ Copie {precision}: {chemin} ({chemin.stat().st_size / 1e6:.1f} Mo)")
+        
+        # Sauvegarder métadonnées
+        metadata.to_csv(meta_path, index=False)
+        print(f"✅ Métadonnées sauvegardées: {meta_path}")
+        print(f"   Colonnes: {list(metadata.columns)}")
+    
+    def charger_embeddings(self,
+                          emb_path: str = 'embeddings/embeddings_bge_m3.npy',
+                          meta_path: str = 'embeddings/metadata.csv'):
+        """Charge les embeddings existants."""
+        self.embeddings = np.load(emb_path)
+        self.metadata = pd.read_csv(meta_path)
+        
+        print(f"✅ Embeddings chargés: {self.embeddings.shape}")
+        print(f"✅ Métadonnées chargées: {len(self.metadata)} entrées")
+        
+        return self.embeddings, self.metadata
+    
+    def verifier_embeddings(self,
+                           embeddings: np.ndarray,
+                           metadata: pd.DataFrame):
+        """Vérifie l'intégrité des embeddings."""
+        print("\n=== Vérification des embeddings ===")
+        
+        # Vérifier les dimensions
+        assert embeddings.shape[0] == len(metadata), \
+            f"Mismatch: {embeddings.shape[0]} embeddings vs {len(metadata)} métadonnées"
+        print(f"✅ Nombre d'embeddings = nombre de métadonnées ({embeddings.shape[0]})")
+        
+        # Vérifier la dimension
+        assert embeddings.shape[1] == 1024, \
+            f"Dimension attendue: 1024, reçue: {embeddings.shape[1]}"
+        print(f"✅ Dimension correcte: {embeddings.shape[1]}")
+        
+        # Vérifier les NaN
+        assert not np.isnan(embeddings).any(), "NaN détectés dans les embeddings"
+        print(f"✅ Pas de NaN détectés")
+        
+        # Vérifier la normalisation (si attendue)
+        norms = np.linalg.norm(embeddings, axis=1)
+        if np.allclose(norms, 1.0, atol=1e-3):
+            print(f"✅ Vecteurs normalisés (L2 norm ≈ 1.0)")
+        else:
+            print(f"⚠️  Vecteurs non normalisés (L2 norm moyenne: {norms.mean():.3f})")
+        
+        print("\n✅ Tous les tests passés!")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    
+    # Configuration
+    MODE = "local"  # Options: "local", "multiprocess", "hf_inference", "colab"
+    BUDGET_TOKENS = 8192  # Tokens (paddés) par batch en local; None = batch_size fixe
+    STREAMING = True      # Mode local: écriture bloc par bloc, reprise après crash
+    SEUIL_QUASI_DOUBLONS = 0.85  # Jaccard MinHash entre offres; None = pas de dédoublonnage
+    BOILERPLATE = True    # Retirer les lignes répétées entre offres (global / par entreprise)
+    MAX_SEQ_LENGTH = None  # Tokens par séquence; None = 8192 (BGE-M3), ex. 512 avec POOLING_FENETRES
+    POOLING_FENETRES = None  # None = troncature; "moyenne"/"ponderee" = textes longs en fenêtres
+    BACKEND = "torch"     # "torch", "onnx" ou "onnx-int8" (CPU; voir scripts/onnx_backend.py pour la précision)
+    PRECISIONS_COMPACTES = ["int8"]  # Copies compactes pour 03 (float16, int8, binaire); [] = float32 seul
+    DAEMON_URL = None     # Ex. DEFAULT_DAEMON_URL si scripts/embed_daemon.py tourne; None = modèle en local
+    
+    # Initialiser le calculateur
+    calc = EmbeddingCalculator(model_name='BAAI/bge-m3',
+                               max_seq_length=MAX_SEQ_LENGTH,
+                               pooling_fenetres=POOLING_FENETRES,
+                               backend=BACKEND,
+                               daemon_url=DAEMON_URL)
+    
+    # Charger le corpus
+    df = calc.charger_corpus('data/corpus.csv')
+    
+    # Lignes passe-partout (présentation entreprise, avantages, égalité des
+    # chances): retirées des offres avant l'encodage. Le tokenizer du modèle
+    # (seul, sans les poids) donne le nombre exact de tokens économisés.
+    if BOILERPLATE:
+        tokenizer = calc._charger_tokenizer() if MODE in ("local", "colab") else None
+        df, lignes_retirees = filtrer_boilerplate(df, colonne='texte_brut',
+                                                  masque=df['type'] == 'offre',
+                                                  tokenizer=tokenizer,
+                                                  max_length=((MAX_SEQ_LENGTH or tokenizer.model_max_length)
+                                                              if tokenizer and not POOLING_FENETRES else None))
+        Path('embeddings').mkdir(exist_ok=True)
+        lignes_retirees.to_csv('embeddings/boilerplate.csv', index=False)
+    
+    # Quasi-doublons (même offre via plusieurs agrégateurs): un représentant
+    # par cluster, seulement parmi les offres (référentiels toujours gardés).
+    # Après le boilerplate, pour comparer le contenu propre à chaque offre;
+    # clusters par pays, pour ne pas fusionner les offres de deux marchés.
+    if SEUIL_QUASI_DOUBLONS is not None:
+        ids = df['id']
+        df, clusters = dedoublonner(df, colonne='texte_brut',
+                                    seuil=SEUIL_QUASI_DOUBLONS,
+                                    masque=df['type'] == 'offre',
+                                    par='pays')
+        Path('embeddings').mkdir(exist_ok=True)
+        clusters.insert(0, 'id', ids.values)
+        clusters.to_csv('embeddings/quasi_doublons.csv', index=False)
+    
+    # Extraire les textes et métadonnées
+    texts = df['texte_brut'].tolist()
+    metadata = df[['id', 'pays', 'role', 'source', 'langue', 'type']].copy()
+    
+    # ========================================================================
+    # MODE 1: Calcul local (recommandé)
+    # ========================================================================
+    if MODE == "local" and STREAMING:
+        embeddings = calc.calculer_embeddings_streaming(
+            texts=texts,
+            emb_path='embeddings/embeddings_bge_m3.npy',
+            taille_bloc=1024,
+            batch_size=16,
+            normalize=True,
+            budget_tokens=BUDGET_TOKENS
+        )
+    
+    elif MODE == "local":
+        embeddings = calc.calculer_embeddings_local(
+            texts=texts,
+            batch_size=16,
+            normalize=True,
+            budget_tokens=BUDGET_TOKENS
+        )
+    
+    # ========================================================================
+    # MODE 1b: Pool multi-processus (machines CPU multi-cœurs)
+    # ========================================================================
+    elif MODE == "multiprocess":
+        embeddings = calc.calculer_embeddings_multiprocess(
+            texts=texts,
+            n_workers=None,              # None = selon cœurs et RAM libre
+            memoire_par_worker_go=3.0,
+            batch_size=16,
+            normalize=True,
+            budget_tokens=BUDGET_TOKENS
+        )
+    
+    # ========================================================================
+    # MODE 2: Hugging Face Inference (si pas de GPU local)
+    # ========================================================================
+    elif MODE == "hf_inference":
+        HF_ENDPOINT = "https://YOUR-ENDPOINT.hf.space/embed"
+        HF_TOKEN = "hf_YOUR_TOKEN_HERE"
+        
+        embeddings = calc.calculer_embeddings_hf_inference(
+            texts=texts,
+            endpoint_url=HF_ENDPOINT,
+            hf_token=HF_TOKEN,
+            batch_size=16
+        )
+    
+    # ========================================================================
+    # MODE 3: Google Colab (utiliser MODE="local" dans Colab)
+    # ========================================================================
+    elif MODE == "colab":
+        print("💡 Pour Google Colab, utilisez MODE='local'")
+        print("   Colab fournit un GPU T4 gratuit qui accélère le calcul")
+        embeddings = calc.calculer_embeddings_local(texts, batch_size=32)
+    
+    # ========================================================================
+    # Vérification et sauvegarde
+    # ========================================================================
+    calc.verifier_embeddings(embeddings, metadata)
+    
+    calc.sauvegarder_embeddings(
+        embeddings=embeddings,
+        metadata=metadata,
+        emb_path='embeddings/embeddings_bge_m3.npy',
+        meta_path='embeddings/metadata.csv',
+        precisions_compactes=PRECISIONS_COMPACTES
+    )
+    if calc.cache is not None:
+        calc.cache.sauvegarder(forcer=True)  # dates d'accès (LRU) de cette exécution
+    
+    print("\n" + "="*70)
+    print("🎉 PHASE 2 TERMINÉE!")
+    print("="*70)
+    print("✅ Embeddings calculés et sauvegardés")
+    print("\n📝 PROCHAINES ÉTAPES:")
+    print("1. Vérifier les fichiers dans embeddings/")
+    print("2. Exécuter scripts/03_analyze.py pour l'analyse")
+    print("="*70)
@@ -4,9 +4,11 @@ Ce script effectue l'analyse statistique et génère les visualisations
 pour valider les hypothèses du cadre Todd-Hofstede.
 """
 
+import hashlib
 import numpy as np
 import pandas as pd
 from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
 from scipy.stats import kruskal, mannwhitneyu
 from itertools import combinations
 import matplotlib.pyplot as plt
@@ -15,6 +17,11 @@ import seaborn as sns
 import umap
 from pathlib import Path
 import warnings
+
+from compact_embeddings import (EmbeddingsCompacts, charger_embeddings, cosinus_vecteur,
+                                empreinte_embeddings, normes_carrees, produit_creux)
+from facet_index import IndexFacettes
+from resampling import intervalles_bootstrap, tester_permutations
 warnings.filterwarnings('ignore')
 
 # Configuration plot
@@ -29,6 +36,10 @@ class AnalyseurSemantique:
     def __init__(self):
         self.embeddings = None
         self.metadata = None
+        self.index_facettes = None
+        self._empreinte_facettes = None
+        # Résultats mémorisés: {(nom, empreinte des données): valeur}
+        self._resultats = {}
         self.pays_list = ['France', 'USA', 'Allemagne', 'Japon']
         self.color_map = {
             'France': '#0055A4',
@@ -40,26 +51,151 @@ class AnalyseurSemantique:
     
     def charger_donnees(self,
                        emb_path: str = 'embeddings/embeddings_bge_m3.npy',
-                       meta_path: str = 'embeddings/metadata.csv'):
-        """Charge les embeddings et métadonnées."""
-        self.embeddings = np.load(emb_path)
+                       meta_path: str = 'embeddings/metadata.csv',
+                       rescorer: bool = False):
+        """Charge les embeddings et métadonnées.
+        
+        Args:
+            emb_path: Embeddings float32 ou compacts (<base>.float16/int8/binaire.npy)
+            meta_path: Métadonnées
+            rescorer: Embeddings compacts: vecteurs par texte relus en float32
+                (agrégats par groupe toujours calculés sur la forme compacte)
+        """
+        self.embeddings = charger_embeddings(emb_path, rescorer=rescorer)
         self.metadata = pd.read_csv(meta_path)
+        self._facettes()
         
         print(f"✅ Données chargées:")
         print(f"   Embeddings: {self.embeddings.shape}")
+        if isinstance(self.embeddings, EmbeddingsCompacts):
+            print(f"   Précision: {self.embeddings.precision} "
+                  f"({self.embeddings.nbytes / 1e6:.1f} Mo{', rescoring float32' if rescorer else ''})")
         print(f"   Métadonnées: {len(self.metadata)} entrées")
         print(f"\nRépartition par pays:")
         print(self.metadata['pays'].value_counts())
     
-    def calculer_matrice_similarite(self) -> pd.DataFrame:
-        """Calcule la matrice de similarité cosinus inter/intra-pays."""
+    def _facettes(self) -> IndexFacettes:
+        """Index des facettes des métadonnées courantes (reconstruit si elles ont changé)."""
+        empreinte = self._empreinte_metadata()
+        if (self.index_facettes is None or self.index_facettes.metadata is not self.metadata
+                or self._empreinte_facettes != empreinte):
+            self.index_facettes = IndexFacettes(self.metadata)
+            self._empreinte_facettes = empreinte
+        return self.index_facettes
+    
+    def _empreinte_metadata(self) -> str:
+        valeurs = pd.util.hash_pandas_object(self.metadata, index=True).values
+        return hashlib.blake2b(valeurs.tobytes(), digest_size=16).hexdigest()
+    
+    def empreinte_donnees(self) -> str:
+        """Empreinte du contenu des embeddings et des métadonnées.
+        
+        Recalculée à chaque appel (un passage linéaire, négligeable devant
+        les analyses): remplacer self.embeddings ou self.metadata, ou les
+        modifier en place, invalide les résultats mémorisés.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(empreinte_embeddings(self.embeddings).encode('ascii'))
+        h.update(self._empreinte_metadata().encode('ascii'))
+        return h.hexdigest()
+    
+    def _memoiser(self, nom: str, calcul):
+        """Valeur de `calcul()` mémorisée pour les données courantes."""
+        cle = (nom, self.empreinte_donnees())
+        if cle not in self._resultats:
+            self._resultats[cle] = calcul()
+        return self._resultats[cle]
+    
+    def _resultat(self, nom: str, csv_path: str, **read_csv_kwargs) -> pd.DataFrame:
+        """Résultat mémorisé pour les données courantes, sinon relu depuis son CSV."""
+        cle = (nom, self.empreinte_donnees()) if self.embeddings is not None else None
+        if cle in self._resultats:
+            return self._resultats[cle]
+        return pd.read_csv(csv_path, **read_csv_kwargs)
+    
+    def similarites_scrum_guide(self):
+        """Similarité cosinus de chaque texte au Scrum Guide (mémorisée).
+        
+        La référence est la moyenne des vecteurs du Scrum Guide; un seul
+        produit matrice-vecteur sur tous les textes. None si le Scrum Guide
+        est absent des métadonnées.
+        """
+        def calcul():
+            sg_idx = self._positions_scrum_guide()
+            if len(sg_idx) == 0:
+                return None
+            sg_embedding = self.embeddings[sg_idx].mean(axis=0)
+            return cosinus_vecteur(self.embeddings, sg_embedding)
+        return self._memoiser('similarites_scrum_guide', calcul)
+    
+    def _positions_pays(self) -> dict:
+        """Positions des textes de chaque pays étudié."""
+        facettes = self._facettes()
+        return {p: facettes.positions('pays', p) for p in self.pays_list}
+    
+    def _positions_scrum_guide(self) -> np.ndarray:
+        return self._facettes().contient('source', 'Scrum Guide')
+    
+    def calculer_matrice_similarite(self,
+                                    methode: str = 'auto',
+                                    n_bootstrap: int = 0,
+                                    niveau_confiance: float = 0.95) -> pd.DataFrame:
+        """Calcule la matrice de similarité cosinus inter/intra-pays.
+        
+        Args:
+            methode: 'sommes' (agrégats par groupe, O(N·d), exact même sans
+                normalisation), 'paires' (matrice cosinus complète, O(N²·d),
+                gardée comme référence) ou 'auto' (= toujours 'sommes')
+            n_bootstrap: Tirages bootstrap pour les IC (0 = estimations
+                ponctuelles seules)
+            niveau_confiance: Niveau des IC
+        
+        Returns:
+            Matrice carrée; IC dans .attrs['ic_bas'] / .attrs['ic_haut'] et
+            en colonnes <pays>_ic_bas / <pays>_ic_haut du CSV
+        """
         print("\n=== Calcul de la matrice de similarité ===")
         
-        # Indices par pays
-        indices = {p: self.metadata[self.metadata['pays'] == p].index.tolist() 
-                   for p in self.pays_list}
+        # Positions par pays
+        indices = self._positions_pays()
+        
+        if methode == 'auto':
+            methode = 'sommes'
+        print(f"   Méthode: {methode}")
+        
+        if methode == 'sommes':
+            sim_matrix = self._matrice_par_sommes()
+        elif methode == 'paires':
+            sim_matrix = self._matrice_par_paires(indices)
+        else:
+            raise ValueError(f"Méthode inconnue: {methode}")
+        
+        print("\n📊 Matrice de similarité cosinus:")
+        print(sim_matrix.round(3))
+        
+        tableau = sim_matrix
+        if n_bootstrap:
+            groupes = self._facettes().groupes('pays', self.pays_list)
+            ic = intervalles_bootstrap(groupes, len(self.pays_list), embeddings=self.embeddings,
+                                       n_bootstrap=n_bootstrap, niveau=niveau_confiance)
+            for borne in ('bas', 'haut'):
+                sim_matrix.attrs[f'ic_{borne}'] = pd.DataFrame(ic[f'matrice_{borne}'], index=self.pays_list,
+                                                               columns=self.pays_list)
+            print(f"\n📏 IC bootstrap à {niveau_confiance:.0%} ({n_bootstrap} tirages), largeur:")
+            print((sim_matrix.attrs['ic_haut'] - sim_matrix.attrs['ic_bas']).round(4))
+            tableau = pd.concat([sim_matrix] + [sim_matrix.attrs[f'ic_{borne}'].add_suffix(f'_ic_{borne}')
+                                                for borne in ('bas', 'haut')], axis=1)
+        self._resultats[('matrice_similarite', self.empreinte_donnees())] = tableau
         
-        # Matrice de similarité
+        # Sauvegarder
+        Path('results').mkdir(exist_ok=True)
+        tableau.to_csv('results/matrice_similarite.csv')
+        print("\n✅ Matrice sauvegardée: results/matrice_similarite.csv")
+        
+        return sim_matrix
+    
+    def _matrice_par_paires(self, indices: dict) -> pd.DataFrame:
+        """Moyennes des similarités à partir des matrices cosinus complètes."""
         sim_matrix = pd.DataFrame(index=self.pays_list, 
                                  columns=self.pays_list, 
                                  dtype=float)
@@ -78,38 +214,121 @@ class AnalyseurSemantique:
                     # Inter-pays: moyenne de toutes les similarités
                     sim_matrix.loc[p1, p2] = sim.mean()
         
-        print("\n📊 Matrice de similarité cosinus:")
-        print(sim_matrix.round(3))
-        
-        # Sauvegarder
-        Path('results').mkdir(exist_ok=True)
-        sim_matrix.to_csv('results/matrice_similarite.csv')
-        print("\n✅ Matrice sauvegardée: results/matrice_similarite.csv")
-        
         return sim_matrix
     
-    def analyser_distance_scrum_guide(self) -> pd.DataFrame:
-        """Calcule la distance de chaque pays au Scrum Guide."""
+    def _matrice_par_sommes(self) -> pd.DataFrame:
+        """Moyennes des similarités à partir des sommes de vecteurs par groupe."""
+        groupes = self._facettes().groupes('pays', self.pays_list)
+        moyennes, _ = self._similarites_groupes(groupes, len(self.pays_list))
+        return pd.DataFrame(moyennes, index=self.pays_list,
+                            columns=self.pays_list, dtype=float)
+    
+    def _similarites_groupes(self, groupes: np.ndarray, n_groupes: int):
+        """Similarité cosinus moyenne entre tous les couples de groupes, en un passage.
+        
+        Avec u = x/||x||, la somme des cosinus entre deux groupes A et B vaut
+        S_A·S_B (S = somme des u du groupe); l'intra-groupe hors diagonale
+        vaut (S_A·S_A - m_A) / (n_A(n_A-1)), m_A = nombre de vecteurs non nuls
+        (un vecteur nul a un cosinus 0 avec tout texte, comme dans
+        cosine_similarity). La normalisation est portée par les poids de la
+        matrice d'appartenance: le résultat est exact que les embeddings
+        soient normalisés ou non, c'est pourquoi methode='auto' choisit
+        toujours cette voie. Un seul passage sur les embeddings,
+        O(N·d + G²·d) au lieu de O(N²·d), quel que soit G.
+        
+        Args:
+            groupes: Groupe de chaque ligne (0..n_groupes-1, -1 = ignorée)
+        
+        Returns:
+            (moyennes G × G, NaN si aucune paire; effectifs par groupe)
+        """
+        lignes = np.flatnonzero(groupes >= 0)
+        normes = np.sqrt(normes_carrees(self.embeddings))[lignes]
+        poids = np.divide(1.0, normes, out=np.zeros_like(normes), where=normes > 0)
+        
+        # Matrice d'appartenance creuse (G × N) → sommes (G × d) en un produit
+        appartenance = sparse.csr_matrix(
+            (poids, (groupes[lignes], lignes)),
+            shape=(n_groupes, len(self.embeddings))
+        )
+        sommes = produit_creux(appartenance, self.embeddings)
+        effectifs = np.bincount(groupes[lignes], minlength=n_groupes)
+        unitaires = np.bincount(groupes[lignes], weights=(normes > 0).astype(np.float64),
+                                minlength=n_groupes)
+        
+        produits = sommes @ sommes.T
+        paires = np.outer(effectifs, effectifs).astype(np.float64)
+        np.fill_diagonal(paires, effectifs * (effectifs - 1.0))
+        np.fill_diagonal(produits, np.diag(produits) - unitaires)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyennes = np.where(paires > 0, produits / paires, np.nan)
+        return moyennes, effectifs
+    
+    def calculer_cube_similarite(self,
+                                 colonnes=('pays', 'role', 'type'),
+                                 valeurs: dict = None,
+                                 output_path: str = 'results/cube_similarite.csv') -> pd.DataFrame:
+        """Similarité cosinus moyenne entre toutes les cellules d'un croisement de facettes.
+        
+        Généralise la matrice pays × pays à n'importe quelles colonnes
+        (ex. pays × rôle × type): une cellule par combinaison de valeurs
+        présente dans le corpus, même coût qu'une matrice par pays.
+        
+        Args:
+            colonnes: Colonnes des métadonnées à croiser
+            valeurs: {colonne: valeurs retenues} (défaut: toutes, et
+                self.pays_list pour 'pays')
+            output_path: CSV de sortie (matrice carrée, cellules en MultiIndex)
+        
+        Returns:
+            DataFrame carré cellule × cellule (diagonale = intra-cellule hors
+            paires identiques); effectifs dans .attrs['effectifs']
+        """
+        colonnes = list(colonnes)
+        print(f"\n=== Cube de similarité: {' × '.join(colonnes)} ===")
+        
+        valeurs = dict(valeurs or {})
+        if 'pays' in colonnes:
+            valeurs.setdefault('pays', self.pays_list)
+        groupes, libelles = self._facettes().cellules(colonnes, valeurs)
+        moyennes, effectifs = self._similarites_groupes(groupes, len(libelles))
+        
+        index = pd.MultiIndex.from_tuples(libelles, names=colonnes)
+        cube = pd.DataFrame(moyennes, index=index, columns=index, dtype=float)
+        cube.attrs['effectifs'] = pd.Series(effectifs, index=index, name='n_textes')
+        print(f"   {len(libelles)} cellules, {int(effectifs.sum())} textes")
+        
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        cube.to_csv(output_path)
+        print(f"✅ Cube sauvegardé: {output_path}")
+        return cube
+    
+    def analyser_distance_scrum_guide(self,
+                                      n_bootstrap: int = 0,
+                                      niveau_confiance: float = 0.95) -> pd.DataFrame:
+        """Calcule la distance de chaque pays au Scrum Guide.
+        
+        Args:
+            n_bootstrap: Tirages bootstrap pour les IC de la moyenne et de
+                l'écart-type (0 = sans IC); référence Scrum Guide fixe
+            niveau_confiance: Niveau des IC
+        """
         print("\n=== Analyse distance au Scrum Guide ===")
         
-        # Embedding du Scrum Guide (référence neutre)
-        sg_idx = self.metadata[self.metadata['source'].str.contains('Scrum Guide', na=False)].index.tolist()
+        # Similarités de chaque texte au Scrum Guide (référence neutre)
+        similarites_sg = self.similarites_scrum_guide()
         
-        if len(sg_idx) == 0:
+        if similarites_sg is None:
             print("⚠️  Scrum Guide non trouvé dans les métadonnées")
             return None
         
-        sg_embedding = self.embeddings[sg_idx].mean(axis=0, keepdims=True)
-        
         # Calculer les distances par pays
         resultats = []
+        indices = self._positions_pays()
         
         for pays in self.pays_list:
-            idx_pays = self.metadata[self.metadata['pays'] == pays].index.tolist()
-            emb_pays = self.embeddings[idx_pays]
-            
-            # Similarités cosinus avec le Scrum Guide
-            similarities = cosine_similarity(emb_pays, sg_embedding).flatten()
+            similarities = similarites_sg[indices[pays]]
             
             resultats.append({
                 'pays': pays,
@@ -121,7 +340,19 @@ class AnalyseurSemantique:
             print(f"{pays:12s} → Scrum Guide : {similarities.mean():.3f} (σ={similarities.std():.3f})")
         
         df_resultats = pd.DataFrame(resultats)
+        if n_bootstrap:
+            groupes = self._facettes().groupes('pays', self.pays_list)
+            ic = intervalles_bootstrap(groupes, len(self.pays_list), valeurs=similarites_sg,
+                                       n_bootstrap=n_bootstrap, niveau=niveau_confiance)
+            df_resultats['similarite_ic_bas'] = ic['moyennes_bas']
+            df_resultats['similarite_ic_haut'] = ic['moyennes_haut']
+            df_resultats['similarite_std_ic_bas'] = ic['ecarts_bas']
+            df_resultats['similarite_std_ic_haut'] = ic['ecarts_haut']
+            print(f"\n📏 IC bootstrap à {niveau_confiance:.0%} ({n_bootstrap} tirages):")
+            for ligne in df_resultats.itertuples():
+                print(f"{ligne.pays:12s} → [{ligne.similarite_ic_bas:.3f}, {ligne.similarite_ic_haut:.3f}]")
         df_resultats.to_csv('results/distances_scrum_guide.csv', index=False)
+        self._resultats[('distances_scrum_guide', self.empreinte_donnees())] = df_resultats
         
         return df_resultats
     
@@ -129,16 +360,10 @@ class AnalyseurSemantique:
         """Teste si les différences entre pays sont significatives."""
         print("\n=== Tests statistiques ===")
         
-        # Embedding Scrum Guide
-        sg_idx = self.metadata[self.metadata['source'].str.contains('Scrum Guide', na=False)].index.tolist()
-        sg_embedding = self.embeddings[sg_idx].mean(axis=0, keepdims=True)
-        
-        # Distances au Scrum Guide par pays
-        distances_par_pays = {}
-        for pays in self.pays_list:
-            idx_pays = self.metadata[self.metadata['pays'] == pays].index.tolist()
-            emb_pays = self.embeddings[idx_pays]
-            distances_par_pays[pays] = cosine_similarity(emb_pays, sg_embedding).flatten()
+        # Distances au Scrum Guide par pays (similarités mémorisées)
+        similarites_sg = self.similarites_scrum_guide()
+        indices = self._positions_pays()
+        distances_par_pays = {pays: similarites_sg[indices[pays]] for pays in self.pays_list}
         
         # Test de Kruskal-Wallis (non-paramétrique)
         stat, p_value = kruskal(*distances_par_pays.values())
@@ -180,6 +405,63 @@ class AnalyseurSemantique:
             'paires': df_paires
         }
     
+    def test_permutations(self,
+                          n_permutations: int = 10_000,
+                          n_processus: int = None,
+                          graine: int = 0,
+                          output_path: str = 'results/tests_permutations.csv') -> pd.DataFrame:
+        """Tests par permutation des différences entre pays (p-valeurs exactes à 1/(B+1) près).
+        
+        Les étiquettes pays sont permutées B fois (voir scripts/resampling.py):
+        H de Kruskal-Wallis et différences de moyennes sur les similarités au
+        Scrum Guide, et chaque case de la matrice de similarité inter/intra-pays.
+        
+        Args:
+            n_permutations: Nombre de permutations (10 000 à 100 000)
+            n_processus: Processus (défaut: nombre de cœurs)
+            graine: Graine (résultats reproductibles quel que soit n_processus)
+            output_path: CSV de sortie (une ligne par test)
+        
+        Returns:
+            DataFrame test, pays1, pays2, statistique, p_value, significatif
+        """
+        print(f"\n=== Tests par permutation ({n_permutations} permutations) ===")
+        
+        similarites_sg = self.similarites_scrum_guide()
+        if similarites_sg is None:
+            print("⚠️  Scrum Guide non trouvé dans les métadonnées")
+            return None
+        
+        groupes = self._facettes().groupes('pays', self.pays_list)
+        resultat = tester_permutations(similarites_sg, groupes, len(self.pays_list),
+                                       embeddings=self.embeddings,
+                                       n_permutations=n_permutations,
+                                       n_processus=n_processus, graine=graine)
+        
+        lignes = [{'test': 'kruskal_H', 'pays1': None, 'pays2': None,
+                   'statistique': resultat['H'], 'p_value': resultat['p_H']}]
+        for (i, j), diff, p in zip(resultat['paires'], resultat['differences'], resultat['p_differences']):
+            lignes.append({'test': 'difference_moyennes', 'pays1': self.pays_list[i], 'pays2': self.pays_list[j],
+                           'statistique': diff, 'p_value': p})
+        for i in range(len(self.pays_list)):
+            for j in range(i, len(self.pays_list)):
+                lignes.append({'test': 'matrice_similarite', 'pays1': self.pays_list[i], 'pays2': self.pays_list[j],
+                               'statistique': resultat['matrice'][i, j], 'p_value': resultat['p_matrice'][i, j]})
+        df_tests = pd.DataFrame(lignes)
+        df_tests['significatif'] = df_tests['p_value'] < 0.05
+        
+        print(f"\n🎲 Kruskal-Wallis H = {resultat['H']:.2f}, p (permutations) = {resultat['p_H']:.5f}")
+        print(f"\n{'Test':<20} {'Pays 1':<12} {'Pays 2':<12} {'Stat':>8} {'p-value':>10} {'Signif'}")
+        print("-" * 72)
+        for ligne in df_tests.iloc[1:].itertuples():
+            sig = "✅ *" if ligne.significatif else "  ns"
+            print(f"{ligne.test:<20} {ligne.pays1:<12} {ligne.pays2:<12} {ligne.statistique:8.4f} {ligne.p_value:10.5f} {sig}")
+        
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        df_tests.to_csv(output_path, index=False)
+        print(f"✅ Tests sauvegardés: {output_path}")
+        return df_tests
+    
     def visualiser_umap(self, figsize=(14, 10)):
         """Génère la visualisation UMAP 2D de l'espace sémantique."""
         print("\n=== Génération visualisation UMAP ===")
@@ -193,7 +475,7 @@ class AnalyseurSemantique:
             n_neighbors=10,
             min_dist=0.1
         )
-        embedding_2d = reducer.fit_transform(self.embeddings)
+        embedding_2d = reducer.fit_transform(np.asarray(self.embeddings))
         
         # Préparer les couleurs et markers
         colors = [self.color_map.get(self.metadata.loc[i, 'pays'], 'gray') 
@@ -251,13 +533,26 @@ class AnalyseurSemantique:
         
         return fig, ax
     
+    @staticmethod
+    def _formater_ic(tableau: pd.DataFrame) -> pd.DataFrame:
+        """Matrice « valeur [bas, haut] » si le tableau porte des colonnes <col>_ic_bas/_ic_haut."""
+        colonnes = [c for c in tableau.columns if not str(c).endswith(('_ic_bas', '_ic_haut'))]
+        if len(colonnes) == len(tableau.columns):
+            return tableau
+        formate = tableau[colonnes].astype(object)
+        for c in colonnes:
+            formate[c] = [f"{v:.3f} [{b:.3f}, {h:.3f}]" for v, b, h in
+                          zip(tableau[c], tableau[f'{c}_ic_bas'], tableau[f'{c}_ic_haut'])]
+        return formate
+    
     def generer_rapport(self, output_path: str = 'results/analyse.md'):
         """Génère un rapport markdown avec l'interprétation."""
         print("\n=== Génération du rapport ===")
         
-        # Charger les résultats
-        sim_matrix = pd.read_csv('results/matrice_similarite.csv', index_col=0)
-        distances_sg = pd.read_csv('results/distances_scrum_guide.csv')
+        # Résultats de cette session, ou relus depuis results/ (étapes séparées)
+        sim_matrix = self._formater_ic(
+            self._resultat('matrice_similarite', 'results/matrice_similarite.csv', index_col=0))
+        distances_sg = self._resultat('distances_scrum_guide', 'results/distances_scrum_guide.csv')
         
         rapport = f"""# Analyse sémantique - Résultats Phase 3
 
@@ -327,21 +622,28 @@ if __name__ == "__main__":
     # Initialiser l'analyseur
     analyseur = AnalyseurSemantique()
     
-    # Charger les données
+    # Charger les données (ou embeddings compacts, ex. embeddings_bge_m3.int8.npy,
+    # voir scripts/compact_embeddings.py)
     analyseur.charger_donnees(
         emb_path='embeddings/embeddings_bge_m3.npy',
         meta_path='embeddings/metadata.csv'
     )
     
     # Étape 3.1: Matrice de similarité
-    sim_matrix = analyseur.calculer_matrice_similarite()
+    sim_matrix = analyseur.calculer_matrice_similarite(n_bootstrap=2000)
+    
+    # Étape 3.1b: Similarités pays × rôle × type
+    cube = analyseur.calculer_cube_similarite(['pays', 'role', 'type'])
     
     # Étape 3.2: Distance au Scrum Guide
-    distances = analyseur.analyser_distance_scrum_guide()
+    distances = analyseur.analyser_distance_scrum_guide(n_bootstrap=2000)
     
     # Étape 3.3: Tests statistiques
     tests = analyseur.test_statistique_significativite()
     
+    # Étape 3.3b: Tests par permutation (pays, matrice de similarité)
+    permutations = analyseur.test_permutations(n_permutations=10_000)
+    
     # Étape 3.4: Visualisation UMAP
     fig, ax = analyseur.visualiser_umap()
     
@@ -354,8 +656,10 @@ if __name__ == "__main__":
     print("✅ Analyse complète")
     print("\n📁 Fichiers générés dans results/:")
     print("   - matrice_similarite.csv")
+    print("   - cube_similarite.csv")
     print("   - distances_scrum_guide.csv")
     print("   - tests_statistiques.csv")
+    print("   - tests_permutations.csv")
     print("   - clusters_umap.png")
     print("   - analyse.md")
     print("\n📝 PROCHAINES ÉTAPES:")
@@ -0,0 +1,376 @@
+"""Planification des batchs d'encodage et pool d'encodage multi-processus.
+
+Les textes sont triés par longueur tokenisée décroissante puis regroupés
+tant que (nombre de textes × longueur du plus long) reste sous le budget.
+Chaque batch contient ainsi des textes de longueurs proches, ce qui limite
+le padding; les vecteurs sont remis dans l'ordre d'origine.
+
+Les textes plus longs que la fenêtre du modèle peuvent être découpés en
+fenêtres de tokens qui se chevauchent plutôt que tronqués: toutes les
+fenêtres sont encodées dans les mêmes batchs, puis leurs vecteurs sont
+moyennés par document (moyenne simple ou pondérée par le nombre de tokens).
+Le coût d'un document devient linéaire en sa longueur au lieu de
+quadratique, et borné par fenêtre.
+
+Le pool multi-processus découpe le corpus en shards encodés par N workers
+(une copie du modèle et un nombre de threads PyTorch fixé par worker).
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def longueurs_tokens(tokenizer, texts: List[str],
+                     max_length: Optional[int] = None) -> np.ndarray:
+    """Longueur tokenisée (tokens spéciaux inclus, tronquée à max_length)."""
+    encodage = tokenizer(list(texts), add_special_tokens=True,
+                         truncation=max_length is not None,
+                         max_length=max_length)
+    return np.array([len(ids) for ids in encodage['input_ids']], dtype=np.int64)
+
+
+def planifier_batches(longueurs: np.ndarray,
+                      budget_tokens: int,
+                      batch_max: Optional[int] = None) -> List[np.ndarray]:
+    """Forme des batchs d'indices dont le coût paddé reste sous budget_tokens.
+
+    Le coût d'un batch est len(batch) × max(longueurs du batch). Un texte
+    plus long que le budget forme un batch à lui seul.
+    """
+    ordre = np.argsort(-np.asarray(longueurs), kind='stable')
+    batches = []
+    debut = 0
+    while debut < len(ordre):
+        longueur_max = max(int(longueurs[ordre[debut]]), 1)
+        taille = max(1, budget_tokens // longueur_max)
+        if batch_max is not None:
+            taille = min(taille, batch_max)
+        batches.append(ordre[debut:debut + taille])
+        debut += taille
+    return batches
+
+
+def efficacite_padding(longueurs: np.ndarray, batches: List[np.ndarray]) -> float:
+    """Part des tokens utiles parmi les tokens traités (padding compris)."""
+    utiles = sum(int(longueurs[b].sum()) for b in batches)
+    traites = sum(len(b) * int(longueurs[b].max()) for b in batches)
+    return utiles / traites if traites else 1.0
+
+
+def batches_fixes(n: int, batch_size: int) -> List[np.ndarray]:
+    """Batchs de taille fixe dans l'ordre du fichier (référence de comparaison)."""
+    return [np.arange(i, min(i + batch_size, n)) for i in range(0, n, batch_size)]
+
+
+def encoder_par_budget(model,
+                       texts: List[str],
+                       budget_tokens: int,
+                       normalize: bool = True,
+                       batch_max: Optional[int] = None,
+                       batch_size_reference: int = 16,
+                       show_progress_bar: bool = True) -> Tuple[np.ndarray, Dict]:
+    """Encode des textes avec un SentenceTransformer par batchs sous budget.
+
+    Returns:
+        (embeddings dans l'ordre d'origine, statistiques de padding)
+    """
+    from tqdm import tqdm
+
+    longueurs = longueurs_tokens(model.tokenizer, texts, model.max_seq_length)
+    batches = planifier_batches(longueurs, budget_tokens, batch_max)
+
+    stats = {
+        'n_batches': len(batches),
+        'efficacite_padding': efficacite_padding(longueurs, batches),
+        'efficacite_padding_reference': efficacite_padding(
+            longueurs, batches_fixes(len(texts), batch_size_reference)),
+        'tokens_utiles': int(longueurs.sum()),
+    }
+
+    embeddings = None
+    for batch in tqdm(batches, disable=not show_progress_bar):
+        emb = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            show_progress_bar=False,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+        embeddings[batch] = emb
+
+    return embeddings, stats
+
+
+# ============================================================================
+# DÉCOUPAGE EN FENÊTRES (TEXTES LONGS)
+# ============================================================================
+
+POOLINGS = ('moyenne', 'ponderee')
+
+
+def taille_fenetre_modele(model) -> int:
+    """Tokens de contenu par fenêtre: max_seq_length moins les tokens spéciaux.
+
+    Une marge d'un token absorbe les écarts de retokenisation d'une
+    sous-chaîne (espace initial des tokenizers SentencePiece).
+    """
+    speciaux = model.tokenizer.num_special_tokens_to_add(pair=False)
+    return max(1, model.max_seq_length - speciaux - 1)
+
+
+def decouper_fenetres(tokenizer,
+                      texts: List[str],
+                      taille_fenetre: int,
+                      chevauchement: int = 64) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Découpe les textes en fenêtres d'au plus taille_fenetre tokens.
+
+    Les fenêtres successives partagent `chevauchement` tokens. Ce sont des
+    sous-chaînes du texte d'origine, délimitées par les offsets du tokenizer
+    (donc sur des frontières de tokens). Un texte qui tient dans une fenêtre
+    est gardé tel quel.
+
+    Returns:
+        (textes des fenêtres, indice du document de chaque fenêtre,
+        nombre de tokens de chaque fenêtre); les fenêtres d'un même
+        document sont contiguës et dans l'ordre des documents
+    """
+    if not 0 <= chevauchement < taille_fenetre:
+        raise ValueError(f"chevauchement ({chevauchement}) doit être dans [0, {taille_fenetre})")
+    pas = taille_fenetre - chevauchement
+    encodage = tokenizer(list(texts), add_special_tokens=False,
+                         return_offsets_mapping=True, truncation=False)
+
+    fenetres, documents, tokens = [], [], []
+    for i, (texte, offsets) in enumerate(zip(texts, encodage['offset_mapping'])):
+        n = len(offsets)
+        if n <= taille_fenetre:
+            fenetres.append(texte)
+            documents.append(i)
+            tokens.append(max(n, 1))
+            continue
+        debut = 0
+        while True:
+            fin = min(debut + taille_fenetre, n)
+            fenetres.append(texte[offsets[debut][0]:offsets[fin - 1][1]])
+            documents.append(i)
+            tokens.append(fin - debut)
+            if fin >= n:
+                break
+            debut += pas
+    return fenetres, np.array(documents, dtype=np.int64), np.array(tokens, dtype=np.int64)
+
+
+def agreger_fenetres(embeddings: np.ndarray,
+                     documents: np.ndarray,
+                     tokens: np.ndarray,
+                     pooling: str = 'ponderee',
+                     normalize: bool = True) -> np.ndarray:
+    """Moyenne des vecteurs de fenêtres par document (simple ou pondérée par tokens).
+
+    Un document d'une seule fenêtre garde exactement le vecteur de celle-ci.
+    """
+    if pooling not in POOLINGS:
+        raise ValueError(f"pooling inconnu: {pooling} (attendu: {', '.join(POOLINGS)})")
+    poids = np.ones(len(documents)) if pooling == 'moyenne' else tokens.astype(np.float64)
+    debuts = np.flatnonzero(np.r_[True, np.diff(documents) != 0])
+    sommes = np.add.reduceat(embeddings.astype(np.float64) * poids[:, None], debuts, axis=0)
+    sommes /= np.add.reduceat(poids, debuts)[:, None]
+
+    multiples = np.flatnonzero(np.diff(np.r_[debuts, len(documents)]) > 1)
+    resultat = embeddings[debuts].astype(np.float32)
+    if len(multiples):
+        agreges = sommes[multiples]
+        if normalize:
+            agreges /= np.maximum(np.linalg.norm(agreges, axis=1, keepdims=True), 1e-12)
+        resultat[multiples] = agreges
+    return resultat
+
+
+def encoder_par_fenetres(model,
+                         texts: List[str],
+                         pooling: str = 'ponderee',
+                         chevauchement: int = 64,
+                         normalize: bool = True,
+                         batch_size: int = 16,
+                         budget_tokens: Optional[int] = None,
+                         show_progress_bar: bool = True) -> Tuple[np.ndarray, Dict]:
+    """Encode des textes de longueur quelconque par fenêtres de model.max_seq_length.
+
+    Toutes les fenêtres du lot sont encodées ensemble (par budget de tokens
+    si budget_tokens est défini), puis agrégées par document.
+
+    Returns:
+        (embeddings dans l'ordre d'origine, statistiques du découpage)
+    """
+    fenetres, documents, tokens = decouper_fenetres(
+        model.tokenizer, texts, taille_fenetre_modele(model), chevauchement)
+
+    if budget_tokens:
+        emb, stats = encoder_par_budget(model, fenetres, budget_tokens,
+                                        normalize=normalize,
+                                        batch_size_reference=batch_size,
+                                        show_progress_bar=show_progress_bar)
+    else:
+        emb = model.encode(fenetres, batch_size=batch_size,
+                           show_progress_bar=show_progress_bar,
+                           normalize_embeddings=normalize,
+                           convert_to_numpy=True)
+        stats = {}
+
+    n_par_doc = np.bincount(documents, minlength=len(texts))
+    stats.update({
+        'n_fenetres': len(fenetres),
+        'n_documents_decoupes': int((n_par_doc > 1).sum()),
+        'fenetres_max_par_document': int(n_par_doc.max()) if len(texts) else 0,
+    })
+    return agreger_fenetres(np.asarray(emb, dtype=np.float32), documents, tokens,
+                            pooling, normalize), stats
+
+
+# ============================================================================
+# POOL MULTI-PROCESSUS (CPU)
+# ============================================================================
+
+_MODELE_WORKER = None
+
+
+def dimensionner_pool(n_workers: Optional[int] = None,
+                      memoire_par_worker_go: float = 3.0,
+                      threads_par_worker: Optional[int] = None) -> Tuple[int, int]:
+    """Choisit (n_workers, threads_par_worker) selon les cœurs et la RAM libre.
+
+    Sans valeur explicite, vise des workers de 4 threads (au-delà, les threads
+    intra-op de PyTorch rapportent peu), dans la limite de la mémoire
+    disponible divisée par memoire_par_worker_go.
+    """
+    n_cpu = os.cpu_count() or 1
+    if n_workers is None:
+        n_workers = max(1, n_cpu // (threads_par_worker or 4))
+
+    try:
+        memoire_dispo = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+        n_max_memoire = max(1, int(memoire_dispo // (memoire_par_worker_go * 1024**3)))
+        n_workers = min(n_workers, n_max_memoire)
+    except (ValueError, OSError, AttributeError):
+        pass  # sysconf indisponible (hors Linux): pas de limite mémoire
+
+    if threads_par_worker is None:
+        threads_par_worker = max(1, n_cpu // n_workers)
+    return n_workers, threads_par_worker
+
+
+def _initialiser_worker(model_name: str,
+                        revision: Optional[str],
+                        max_seq_length: Optional[int],
+                        threads: int,
+                        backend: str = 'torch'):
+    """Charge le modèle dans le worker avec un nombre de threads fixé."""
+    # Avant l'import de torch pour que OpenMP/MKL respectent la limite
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    global _MODELE_WORKER
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        _MODELE_WORKER = SentenceTransformer(model_name, revision=revision, device='cpu')
+    else:
+        from onnx_backend import charger_modele_onnx
+        _MODELE_WORKER = charger_modele_onnx(model_name, revision,
+                                             quantifier=backend == 'onnx-int8',
+                                             threads=threads)
+    if max_seq_length is not None:
+        _MODELE_WORKER.max_seq_length = max_seq_length
+
+
+def _encoder_shard(texts: List[str],
+                   normalize: bool,
+                   batch_size: int,
+                   budget_tokens: Optional[int],
+                   pooling: Optional[str] = None,
+                   chevauchement: int = 64) -> np.ndarray:
+    if pooling:
+        embeddings, _ = encoder_par_fenetres(_MODELE_WORKER, texts, pooling, chevauchement,
+                                             normalize=normalize, batch_size=batch_size,
+                                             budget_tokens=budget_tokens,
+                                             show_progress_bar=False)
+    elif budget_tokens:
+        embeddings, _ = encoder_par_budget(_MODELE_WORKER, texts, budget_tokens,
+                                           normalize=normalize,
+                                           show_progress_bar=False)
+    else:
+        embeddings = _MODELE_WORKER.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True
+        )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _dimension_worker() -> int:
+    return _MODELE_WORKER.get_sentence_embedding_dimension()
+
+
+def encoder_multiprocess(texts: List[str],
+                         model_name: str,
+                         revision: Optional[str] = None,
+                         backend: str = 'torch',
+                         max_seq_length: Optional[int] = None,
+                         n_workers: int = 2,
+                         threads_par_worker: int = 1,
+                         normalize: bool = True,
+                         batch_size: int = 16,
+                         budget_tokens: Optional[int] = None,
+                         taille_shard: Optional[int] = None,
+                         pooling: Optional[str] = None,
+                         chevauchement: int = 64) -> np.ndarray:
+    """Encode des textes sur un pool de processus et réassemble dans l'ordre.
+
+    Le corpus est découpé en ~4 shards par worker (bornés à [32, 2048]
+    textes) pour équilibrer la charge entre workers. Avec `pooling`, les
+    textes longs sont encodés par fenêtres (voir encoder_par_fenetres).
+    Sans texte, renvoie un array vide (0, dim), la dimension étant lue
+    sur le modèle d'un seul worker.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from tqdm import tqdm
+
+    if taille_shard is None:
+        taille_shard = min(2048, max(32, math.ceil(len(texts) / (4 * n_workers))))
+    debuts = list(range(0, len(texts), taille_shard))
+
+    embeddings = None
+    with ProcessPoolExecutor(
+        max_workers=n_workers if texts else 1,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialiser_worker,
+        initargs=(model_name, revision, max_seq_length, threads_par_worker, backend)
+    ) as executor:
+        futures = {
+            executor.submit(_encoder_shard, texts[d:d + taille_shard],
+                            normalize, batch_size, budget_tokens,
+                            pooling, chevauchement): d
+            for d in debuts
+        }
+        if not futures:
+            dim = executor.submit(_dimension_worker).result()
+            return np.empty((0, dim), dtype=np.float32)
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            d = futures[future]
+            emb = future.result()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+            embeddings[d:d + len(emb)] = emb
+
+    return embeddings
@@ -0,0 +1,232 @@
+"""
+scripts/blob_store.py
+
+Id-addressed store for raw SerpApi job payloads, kept out of the tabular
+corpus (which only stores a `raw_ref`).
+
+Layout:
+    <root>/shard-00000.jsonl.zst   one compressed frame per record, appended
+    <root>/zstd.dict               zstd dictionary trained on the first batch
+    <root>/_index.sqlite           id -> (shard, offset, length, codec)
+
+Each record is a JSON line compressed on its own, so fetching a record is
+one index probe plus one positioned read of `length` bytes, whatever the
+store size. Small JSON records compress poorly in isolation; the shared
+dictionary recovers most of the ratio of whole-file compression. Without
+a dictionary (and with zstd), a shard is a valid multi-frame file:
+`zstd -dc shard-00000.jsonl.zst` prints it as JSONL. zstandard is in
+requirements.txt; records written by the zlib fallback of compression.py
+(zstandard missing) are readable by the store but are not zstd frames.
+
+Data is written (and fsynced) before it is indexed: a crash in between
+leaves unreferenced bytes at the end of a shard, never a dangling index
+entry.
+
+Usage:
+    python scripts/blob_store.py get <id> [--blob-dir DIR]
+    python scripts/blob_store.py stats [--blob-dir DIR]
+    python scripts/blob_store.py migrate data/raw/offres_google_jobs.csv
+        (moves the `raw` column of an existing CSV into the store)
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+from compression import compress, decompress, train_dictionary
+
+DEFAULT_BLOB_DIR = "data/raw/google_jobs_raw"
+INDEX_FILE = "_index.sqlite"
+DICT_FILE = "zstd.dict"
+DEFAULT_MAX_SHARD_BYTES = 256 * 1024 * 1024
+DICT_MIN_SAMPLES = 256
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+
+class BlobStore:
+    """Append-only, id-addressed store of compressed JSON records."""
+
+    def __init__(self, root: str = DEFAULT_BLOB_DIR, max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES):
+        self.root = root
+        self.max_shard_bytes = max_shard_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fds: Dict[int, int] = {}
+        self._conn = sqlite3.connect(os.path.join(root, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (id TEXT PRIMARY KEY, shard INTEGER, offset INTEGER,"
+            " length INTEGER, codec TEXT)"
+        )
+        self._conn.commit()
+        dict_path = os.path.join(root, DICT_FILE)
+        self.dictionary = open(dict_path, "rb").read() if os.path.exists(dict_path) else None
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.root, f"shard-{shard:05d}.jsonl.zst")
+
+    def _current_shard(self) -> int:
+        """Last shard, or a new one once it reaches max_shard_bytes."""
+        row = self._conn.execute("SELECT MAX(shard) FROM blobs").fetchone()
+        shard = row[0] or 0
+        path = self._shard_path(shard)
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_shard_bytes:
+            shard += 1
+        return shard
+
+    def _known(self, ids: Sequence[str]) -> set:
+        found = set()
+        for k in range(0, len(ids), _CHUNK):
+            chunk = ids[k:k + _CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(r[0] for r in self._conn.execute(f"SELECT id FROM blobs WHERE id IN ({placeholders})", chunk))
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Union[Dict, str]]]) -> int:
+        """Store (id, record) pairs whose id is not yet stored. Returns the number written.
+
+        A record is a JSON-serialisable object or an already serialised JSON string.
+        """
+        payloads = {}
+        for id_, record in items:
+            text = record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+            payloads.setdefault(str(id_), text.encode("utf-8") + b"\n")
+        with self._lock:
+            for id_ in self._known(list(payloads)):
+                del payloads[id_]
+            if not payloads:
+                return 0
+            if self.dictionary is None and len(payloads) >= DICT_MIN_SAMPLES and self._count() == 0:
+                self._train(list(payloads.values()))
+
+            shard = self._current_shard()
+            rows = []
+            with open(self._shard_path(shard), "ab") as f:
+                offset = f.tell()
+                for id_, data in payloads.items():
+                    codec, blob = compress(data, dictionary=self.dictionary)
+                    f.write(blob)
+                    rows.append((id_, shard, offset, len(blob), codec))
+                    offset += len(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def _train(self, samples):
+        dictionary = train_dictionary(samples)
+        if dictionary is None:
+            return
+        path = os.path.join(self.root, DICT_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(dictionary)
+        os.replace(tmp, path)
+        self.dictionary = dictionary
+
+    def _read(self, shard: int, offset: int, length: int, codec: str) -> Dict:
+        # Under the lock: close() must not close (and the OS reuse) an fd mid-read
+        with self._lock:
+            fd = self._fds.get(shard)
+            if fd is None:
+                fd = self._fds[shard] = os.open(self._shard_path(shard), os.O_RDONLY)
+            blob = os.pread(fd, length, offset)
+        return json.loads(decompress(codec, blob, self.dictionary))
+
+    def get(self, id_: str) -> Optional[Dict]:
+        """Raw record for `id_`, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT shard, offset, length, codec FROM blobs WHERE id = ?",
+                                     (str(id_),)).fetchone()
+        return self._read(*row) if row else None
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict]:
+        """Records for the known ids among `ids`, read in file order."""
+        ids = list(dict.fromkeys(str(i) for i in ids))
+        rows = []
+        with self._lock:
+            for k in range(0, len(ids), _CHUNK):
+                chunk = ids[k:k + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(self._conn.execute(
+                    f"SELECT id, shard, offset, length, codec FROM blobs WHERE id IN ({placeholders})", chunk))
+        rows.sort(key=lambda r: (r[1], r[2]))
+        return {r[0]: self._read(*r[1:]) for r in rows}
+
+    def __contains__(self, id_: str) -> bool:
+        with self._lock:
+            return bool(self._known([str(id_)]))
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n, size, shards = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COUNT(DISTINCT shard) FROM blobs").fetchone()
+        return {"records": n, "bytes": size, "shards": shards, "dictionary": self.dictionary is not None}
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            self._conn.close()
+
+
+def migrate_csv(csv_path: str, store: BlobStore, chunk_size: int = 10_000) -> int:
+    """Move the `raw` column of a collector CSV into the store; the CSV keeps `raw_ref`."""
+    import pandas as pd
+
+    tmp = csv_path + ".tmp"
+    moved = 0
+    header = True
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        if "raw" in chunk.columns:
+            has_raw = chunk["raw"] != ""
+            moved += store.put_many(zip(chunk.loc[has_raw, "id"], chunk.loc[has_raw, "raw"]))
+            chunk["raw_ref"] = chunk["id"].where(has_raw, "")
+            chunk = chunk.drop(columns="raw")
+        chunk.to_csv(tmp, mode="w" if header else "a", header=header, index=False)
+        header = False
+    os.replace(tmp, csv_path)
+    return moved
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Store des payloads SerpApi bruts (zstd, adressé par id).")
+    parser.add_argument("command", choices=["get", "stats", "migrate"])
+    parser.add_argument("target", nargs="?", help="Id (get) ou CSV à migrer (migrate).")
+    parser.add_argument("--blob-dir", type=str, default=DEFAULT_BLOB_DIR, help=f"Répertoire du store (défaut: {DEFAULT_BLOB_DIR}).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    store = BlobStore(args.blob_dir)
+    if args.command == "get":
+        record = store.get(args.target)
+        if record is None:
+            print(f"❌ Id inconnu: {args.target}")
+        else:
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+    elif args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    else:
+        moved = migrate_csv(args.target, store)
+        print(f"✅ {moved} payloads déplacés de {args.target} vers {args.blob_dir} ({len(store)} au total)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Suppression des lignes passe-partout (boilerplate) avant les embeddings.
+
+Les offres d'un même employeur répètent les mêmes blocs (présentation de
+l'entreprise, avantages, mention d'égalité des chances), et certains blocs
+se retrouvent chez tous les employeurs. Ces lignes coûtent des tokens à
+BGE-M3 et rapprochent artificiellement les offres d'une même entreprise.
+
+Chaque ligne est normalisée puis hachée (64 bits); une passe de comptage
+(en continu, par chunks) note dans combien d'offres apparaît chaque hash,
+globalement et par entreprise. La fréquence d'une ligne n'est connue qu'à la
+fin du comptage: le retrait est donc une seconde passe, texte par texte.
+Une ligne est retirée si elle dépasse le seuil de fréquence global ou celui
+de son entreprise. Les lignes courtes (titres de section,
+puces d'un mot) ne sont jamais retirées.
+"""
+
+import hashlib
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_ESPACES = re.compile(r'\s+')
+# Puces et ponctuation en bord de ligne («•», «-», «*», «:»…)
+_BORDS = re.compile(r'^[\W_]+|[\W_]+$')
+_LIGNES_VIDES = re.compile(r'\n\s*\n\s*\n+')
+
+GROUPES_INCONNUS = {'', 'n/a', 'nan', 'none', 'unknown'}
+
+
+def normaliser_ligne(ligne: str) -> str:
+    """Forme canonique d'une ligne: casse, espaces et puces neutralisés."""
+    ligne = unicodedata.normalize('NFKC', ligne).lower()
+    ligne = _BORDS.sub('', ligne)
+    return _ESPACES.sub(' ', ligne).strip()
+
+
+def _hash_ligne(ligne_normalisee: str) -> int:
+    return int.from_bytes(hashlib.blake2b(ligne_normalisee.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class FiltreBoilerplate:
+    """Compte les lignes répétées d'un corpus puis les retire des textes."""
+
+    def __init__(self,
+                 freq_globale: float = 0.02,
+                 min_docs_global: int = 5,
+                 freq_entreprise: float = 0.5,
+                 min_docs_entreprise: int = 3,
+                 longueur_min: int = 30):
+        """
+        Args:
+            freq_globale: Part des offres au-delà de laquelle une ligne est
+                du boilerplate, toutes entreprises confondues
+            min_docs_global: Nombre minimal d'offres pour le seuil global
+            freq_entreprise: Part des offres d'une même entreprise au-delà de
+                laquelle une ligne est du boilerplate pour cette entreprise
+            min_docs_entreprise: Nombre minimal d'offres (de l'entreprise)
+                pour le seuil par entreprise
+            longueur_min: Longueur minimale (normalisée) d'une ligne candidate
+        """
+        self.freq_globale = freq_globale
+        self.min_docs_global = min_docs_global
+        self.freq_entreprise = freq_entreprise
+        self.min_docs_entreprise = min_docs_entreprise
+        self.longueur_min = longueur_min
+
+        self.n_docs = 0
+        self._codes_groupes: Dict[str, int] = {}
+        self._docs_par_groupe: List[int] = []
+        self._hashs: List[np.ndarray] = []
+        self._groupes: List[np.ndarray] = []
+        self._global = None
+        self._par_groupe = None
+
+    def _code_groupe(self, groupe) -> int:
+        """Code entier de l'entreprise (-1 si inconnue)."""
+        if groupe is None or (isinstance(groupe, float) and math.isnan(groupe)):
+            return -1
+        cle = str(groupe).strip().lower()
+        if cle in GROUPES_INCONNUS:
+            return -1
+        if cle not in self._codes_groupes:
+            self._codes_groupes[cle] = len(self._docs_par_groupe)
+            self._docs_par_groupe.append(0)
+        return self._codes_groupes[cle]
+
+    def _hashs_texte(self, texte: str) -> List[Optional[int]]:
+        """Hash de chaque ligne (None pour les lignes trop courtes)."""
+        hashs = []
+        for ligne in str(texte).split('\n'):
+            norm = normaliser_ligne(ligne)
+            hashs.append(_hash_ligne(norm) if len(norm) >= self.longueur_min else None)
+        return hashs
+
+    def compter(self, textes: Iterable[str], groupes: Optional[Iterable] = None) -> 'FiltreBoilerplate':
+        """Passe de comptage; peut être appelée sur des chunks successifs."""
+        groupes = iter(groupes) if groupes is not None else None
+        bloc_hashs, bloc_groupes = [], []
+        for texte in textes:
+            code = self._code_groupe(next(groupes) if groupes is not None else None)
+            self.n_docs += 1
+            if code >= 0:
+                self._docs_par_groupe[code] += 1
+            # Fréquence documentaire: chaque ligne compte une fois par offre
+            uniques = {h for h in self._hashs_texte(texte) if h is not None}
+            bloc_hashs.extend(uniques)
+            bloc_groupes.extend([code] * len(uniques))
+        self._hashs.append(np.array(bloc_hashs, dtype=np.uint64))
+        self._groupes.append(np.array(bloc_groupes, dtype=np.int64))
+        self._global = self._par_groupe = None
+        return self
+
+    def seuil_global(self) -> int:
+        return max(self.min_docs_global, math.ceil(self.freq_globale * self.n_docs))
+
+    def _finaliser(self):
+        """Calcule (une fois) les ensembles de hashs à retirer."""
+        if self._global is not None:
+            return
+        hashs = np.concatenate(self._hashs) if self._hashs else np.empty(0, dtype=np.uint64)
+        groupes = np.concatenate(self._groupes) if self._groupes else np.empty(0, dtype=np.int64)
+
+        uniques, effectifs = np.unique(hashs, return_counts=True)
+        self._global = dict(zip(uniques[effectifs >= self.seuil_global()].tolist(),
+                                effectifs[effectifs >= self.seuil_global()].tolist()))
+
+        connus = groupes >= 0
+        paires = np.ascontiguousarray(np.stack([groupes[connus].astype(np.uint64), hashs[connus]], axis=1))
+        cles = paires.view(np.dtype((np.void, 16))).ravel()
+        _, premiers, effectifs = np.unique(cles, return_index=True, return_counts=True)
+        docs = np.array(self._docs_par_groupe, dtype=np.int64)
+        seuils = np.maximum(self.min_docs_entreprise, np.ceil(self.freq_entreprise * docs)).astype(np.int64)
+        paires_uniques = paires[premiers]
+        retenues = effectifs >= seuils[paires_uniques[:, 0].astype(np.int64)]
+        self._par_groupe = {(int(g), int(h)): int(n) for (g, h), n
+                            in zip(paires_uniques[retenues].tolist(), effectifs[retenues].tolist())}
+
+    def filtrer(self, texte: str, groupe=None) -> Tuple[str, List[Tuple[str, int, str]]]:
+        """Retire les lignes boilerplate d'un texte.
+
+        Returns:
+            (texte filtré, [(ligne retirée, nb d'offres, portée)])
+        """
+        self._finaliser()
+        code = self._code_groupe(groupe)
+        lignes = str(texte).split('\n')
+        gardees, retirees = [], []
+        for ligne, h in zip(lignes, self._hashs_texte(texte)):
+            if h is not None and h in self._global:
+                retirees.append((ligne, self._global[h], 'global'))
+            elif h is not None and (code, h) in self._par_groupe:
+                retirees.append((ligne, self._par_groupe[(code, h)], 'entreprise'))
+            else:
+                gardees.append(ligne)
+        if not retirees:
+            return texte, retirees
+        filtre = _LIGNES_VIDES.sub('\n\n', '\n'.join(gardees)).strip()
+        # Un texte entièrement passe-partout est gardé tel quel plutôt que vidé
+        return (filtre, retirees) if filtre else (texte, [])
+
+
+def filtrer_boilerplate(df: pd.DataFrame,
+                        colonne: str = 'texte_brut',
+                        colonne_groupe: Optional[str] = None,
+                        masque: pd.Series = None,
+                        tokenizer=None,
+                        max_length: Optional[int] = None,
+                        **kwargs) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Retire les lignes passe-partout de la colonne `colonne`.
+
+    Args:
+        df: Corpus
+        colonne_groupe: Colonne entreprise (par défaut 'entreprise' ou
+            'company', selon le schéma); None si absente
+        masque: Lignes filtrées (par défaut toutes); les autres ne sont ni
+            comptées ni modifiées
+        tokenizer: Tokenizer du modèle pour compter exactement les tokens
+            économisés (sinon estimation ≈ 4 caractères par token)
+        max_length: Troncature du modèle (les tokens au-delà ne coûtent rien)
+        **kwargs: Paramètres de FiltreBoilerplate
+
+    Returns:
+        (corpus filtré, table des lignes retirées: ligne, n_offres, portee, n_retraits)
+    """
+    if colonne_groupe is None:
+        colonne_groupe = next((c for c in ('entreprise', 'company') if c in df.columns), None)
+    if masque is None:
+        masque = pd.Series(True, index=df.index)
+    cibles = df.index[masque.values]
+    textes = df.loc[cibles, colonne].fillna('').astype(str).tolist()
+    groupes = df.loc[cibles, colonne_groupe].tolist() if colonne_groupe else [None] * len(textes)
+
+    filtre = FiltreBoilerplate(**kwargs).compter(textes, groupes)
+
+    nouveaux, retraits = [], {}
+    for texte, groupe in zip(textes, groupes):
+        resultat, retirees = filtre.filtrer(texte, groupe)
+        nouveaux.append(resultat)
+        for ligne, n_offres, portee in retirees:
+            cle = normaliser_ligne(ligne)
+            if cle not in retraits:
+                retraits[cle] = [ligne.strip(), n_offres, portee, 0]
+            retraits[cle][3] += 1
+
+    modifies = [i for i, (a, b) in enumerate(zip(textes, nouveaux)) if a != b]
+    avant = [textes[i] for i in modifies]
+    apres = [nouveaux[i] for i in modifies]
+    if tokenizer is not None and modifies:
+        from batch_encoding import longueurs_tokens
+        economises = int(longueurs_tokens(tokenizer, avant, max_length).sum()
+                         - longueurs_tokens(tokenizer, apres, max_length).sum())
+        unite = "tokens"
+    else:
+        economises = (sum(len(t) for t in avant) - sum(len(t) for t in apres)) // 4
+        unite = "tokens (≈ 4 caractères/token)"
+
+    resultat = df.copy()
+    resultat.loc[cibles, colonne] = nouveaux
+    n_lignes = sum(r[3] for r in retraits.values())
+    print(f"🧹 Boilerplate: {n_lignes} lignes retirées ({len(retraits)} distinctes) "
+          f"dans {len(modifies)}/{len(textes)} textes")
+    print(f"   Seuil global: {filtre.seuil_global()} offres, "
+          f"par entreprise: {filtre.freq_entreprise:.0%} (min {filtre.min_docs_entreprise})")
+    print(f"   {economises:,} {unite} économisés")
+
+    table = pd.DataFrame(list(retraits.values()), columns=['ligne', 'n_offres', 'portee', 'n_retraits'])
+    table = table.sort_values('n_retraits', ascending=False, kind='stable').reset_index(drop=True)
+    table.attrs['tokens_economises'] = economises
+    return resultat, table
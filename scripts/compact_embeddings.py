@@ -0,0 +1,331 @@
+"""Stockage compact des embeddings: float16, int8 par dimension, binaire.
+
+En float32, un vecteur BGE-M3 (1024 dimensions) occupe 4 Ko. Précisions
+disponibles:
+    float16  2 Ko   demi-précision
+    int8     1 Ko   quantification symétrique par dimension:
+                    x[:, d] ≈ code[:, d] × echelle[d], echelle = max|x[:, d]| / 127
+    binaire  128 o  signe de chaque composante (np.packbits)
+
+Les codes sont écrits dans <base>.<precision>.npy (relisible en
+memory-mapping) et les paramètres de quantification dans
+<base>.<precision>.json (précision, dimension, échelles, fichier float32
+d'origine).
+
+`EmbeddingsCompacts` garde les codes tels quels en mémoire et ne
+déquantifie que des blocs de lignes: les sommes par groupe et les normes
+sont calculées bloc par bloc, l'indexation (`emb[indices]`) ne déquantifie
+que les lignes demandées. Avec `rescorer=True`, ces lignes sont relues en
+pleine précision dans le fichier float32 d'origine (memory-mapping), les
+agrégats restant calculés sur la forme compacte. Les vecteurs d'origine
+normalisés sont renormalisés après déquantification.
+
+Compromis précision / taille sur le corpus:
+    python scripts/compact_embeddings.py rapport
+Conversion d'un fichier float32 existant:
+    python scripts/compact_embeddings.py convertir --precision int8
+"""
+
+import argparse
+import hashlib
+import json
+import runpy
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PRECISIONS = ('float32', 'float16', 'int8', 'binaire')
+TAILLE_BLOC = 16_384
+
+
+def quantifier(embeddings: np.ndarray, precision: str) -> Tuple[np.ndarray, Dict]:
+    """Codes compacts et paramètres de quantification d'un array (N, d)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    normes = np.linalg.norm(embeddings, axis=1)
+    meta = {
+        'precision': precision,
+        'dimension': int(embeddings.shape[1]),
+        'normalise': bool(len(normes) and np.allclose(normes, 1.0, atol=1e-3)),
+    }
+    if precision == 'float32':
+        return embeddings, meta
+    if precision == 'float16':
+        return embeddings.astype(np.float16), meta
+    if precision == 'int8':
+        echelles = np.abs(embeddings).max(axis=0) / 127.0
+        echelles[echelles == 0] = 1.0
+        meta['echelles'] = echelles.astype(np.float32).tolist()
+        return np.clip(np.rint(embeddings / echelles), -127, 127).astype(np.int8), meta
+    if precision == 'binaire':
+        return np.packbits(embeddings > 0, axis=1), meta
+    raise ValueError(f"Précision inconnue: {precision} (attendu: {', '.join(PRECISIONS)})")
+
+
+def dequantifier(codes: np.ndarray, meta: Dict) -> np.ndarray:
+    """Vecteurs float32 approchés à partir des codes."""
+    precision = meta['precision']
+    if precision in ('float32', 'float16'):
+        vecteurs = np.array(codes, dtype=np.float32)
+    elif precision == 'int8':
+        vecteurs = np.asarray(codes, dtype=np.float32) * np.asarray(meta['echelles'], dtype=np.float32)
+    elif precision == 'binaire':
+        bits = np.unpackbits(np.asarray(codes), axis=1, count=meta['dimension'])
+        # ±1/√d: vecteurs de norme 1
+        vecteurs = (bits.astype(np.float32) * 2 - 1) / np.sqrt(meta['dimension'], dtype=np.float32)
+    else:
+        raise ValueError(f"Précision inconnue: {precision}")
+    if meta.get('normalise') and precision != 'binaire':
+        vecteurs /= np.maximum(np.linalg.norm(vecteurs, axis=1, keepdims=True), 1e-12)
+    return vecteurs
+
+
+class EmbeddingsCompacts:
+    """Embeddings quantifiés, déquantifiés à la demande par blocs de lignes."""
+
+    def __init__(self, codes: np.ndarray, meta: Dict, reference: Optional[np.ndarray] = None):
+        """
+        Args:
+            codes: Codes (N, d) ou (N, d/8) pour le binaire
+            meta: Paramètres de quantification (voir quantifier)
+            reference: Vecteurs float32 d'origine (memmap) utilisés pour
+                l'indexation si fournis (rescoring en pleine précision)
+        """
+        self.codes = codes
+        self.meta = meta
+        self.precision = meta['precision']
+        self.reference = reference
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self.codes), self.meta['dimension'])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def __getitem__(self, indices) -> np.ndarray:
+        if self.reference is not None:
+            return np.asarray(self.reference[indices], dtype=np.float32)
+        lignes = self.codes[indices]
+        if lignes.ndim == 1:
+            return dequantifier(lignes[None, :], self.meta)[0]
+        return dequantifier(lignes, self.meta)
+
+    def __array__(self, dtype=None, copy=None):
+        vecteurs = np.empty(self.shape, dtype=np.float32)
+        for debut, bloc in self.blocs():
+            vecteurs[debut:debut + len(bloc)] = bloc
+        return vecteurs if dtype is None else vecteurs.astype(dtype)
+
+    def blocs(self, taille: int = TAILLE_BLOC, rescorer: bool = False):
+        """(indice de début, vecteurs déquantifiés) par blocs de `taille` lignes.
+
+        Avec rescorer=True et une référence float32, les blocs sont lus en
+        pleine précision (comme l'indexation).
+        """
+        for debut in range(0, len(self.codes), taille):
+            if rescorer and self.reference is not None:
+                yield debut, np.asarray(self.reference[debut:debut + taille], dtype=np.float32)
+            else:
+                yield debut, dequantifier(self.codes[debut:debut + taille], self.meta)
+
+    def produit_creux(self, matrice) -> np.ndarray:
+        """matrice (G × N, creuse ou dense) @ vecteurs, sans déquantifier tout le corpus."""
+        resultat = np.zeros((matrice.shape[0], self.meta['dimension']), dtype=np.float64)
+        for debut, bloc in self.blocs():
+            resultat += matrice[:, debut:debut + len(bloc)] @ bloc.astype(np.float64)
+        return resultat
+
+    def normes_carrees(self) -> np.ndarray:
+        normes2 = np.empty(len(self.codes), dtype=np.float64)
+        for debut, bloc in self.blocs():
+            normes2[debut:debut + len(bloc)] = np.einsum('ij,ij->i', bloc, bloc)
+        return normes2
+
+
+def produit_creux(matrice, embeddings: Union[np.ndarray, EmbeddingsCompacts]) -> np.ndarray:
+    """matrice @ embeddings, pour des embeddings float32 ou compacts."""
+    if isinstance(embeddings, EmbeddingsCompacts):
+        return embeddings.produit_creux(matrice)
+    return np.asarray(matrice @ embeddings, dtype=np.float64)
+
+
+def normes_carrees(embeddings: Union[np.ndarray, EmbeddingsCompacts]) -> np.ndarray:
+    """Norme L2 au carré de chaque vecteur."""
+    if isinstance(embeddings, EmbeddingsCompacts):
+        return embeddings.normes_carrees()
+    return np.einsum('ij,ij->i', embeddings, embeddings)
+
+
+def cosinus_vecteur(embeddings: Union[np.ndarray, EmbeddingsCompacts],
+                    vecteur: np.ndarray,
+                    taille: int = TAILLE_BLOC) -> np.ndarray:
+    """Cosinus de chaque ligne avec `vecteur` (0 pour un vecteur nul), par blocs.
+
+    Pour des embeddings compacts, les lignes sont lues comme par
+    l'indexation (pleine précision si une référence est chargée).
+    """
+    vecteur = np.asarray(vecteur, dtype=np.float64).ravel()
+    if isinstance(embeddings, EmbeddingsCompacts):
+        blocs = embeddings.blocs(taille, rescorer=True)
+    else:
+        blocs = ((debut, embeddings[debut:debut + taille]) for debut in range(0, len(embeddings), taille))
+    cosinus = np.empty(len(embeddings), dtype=np.float64)
+    norme = np.linalg.norm(vecteur)
+    for debut, bloc in blocs:
+        bloc = np.asarray(bloc, dtype=np.float64)
+        normes = np.linalg.norm(bloc, axis=1) * norme
+        cosinus[debut:debut + len(bloc)] = np.divide(bloc @ vecteur, normes,
+                                                     out=np.zeros(len(bloc)), where=normes > 0)
+    return cosinus
+
+
+def empreinte_embeddings(embeddings: Union[np.ndarray, EmbeddingsCompacts]) -> str:
+    """Empreinte du contenu (codes et paramètres pour des embeddings compacts)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(embeddings, EmbeddingsCompacts):
+        h.update(json.dumps(embeddings.meta, sort_keys=True).encode('utf-8'))
+        h.update(b'rescoring' if embeddings.reference is not None else b'')
+        tableau = embeddings.codes
+    else:
+        tableau = embeddings
+    h.update(f"{tableau.dtype}{tableau.shape}".encode('utf-8'))
+    for debut in range(0, len(tableau), TAILLE_BLOC):
+        h.update(np.ascontiguousarray(tableau[debut:debut + TAILLE_BLOC]).data)
+    return h.hexdigest()
+
+
+# ============================================================================
+# FICHIERS
+# ============================================================================
+
+def chemin_compact(emb_path: str, precision: str) -> Path:
+    """embeddings/x.npy → embeddings/x.<precision>.npy"""
+    chemin = Path(emb_path)
+    return chemin.with_name(f"{chemin.stem}.{precision}.npy")
+
+
+def sauvegarder_compact(embeddings: np.ndarray, emb_path: str, precision: str) -> Path:
+    """Écrit les codes et leurs paramètres à côté du fichier float32 `emb_path`.
+
+    Returns:
+        Chemin du fichier de codes
+    """
+    codes, meta = quantifier(embeddings, precision)
+    chemin = chemin_compact(emb_path, precision)
+    meta['n'] = int(len(codes))
+    meta['source'] = Path(emb_path).name
+    np.save(chemin, codes)
+    chemin.with_suffix('.json').write_text(json.dumps(meta), encoding='utf-8')
+    return chemin
+
+
+def charger_embeddings(emb_path: str,
+                       rescorer: bool = False) -> Union[np.ndarray, EmbeddingsCompacts]:
+    """Charge un fichier d'embeddings float32 (array) ou compact (EmbeddingsCompacts).
+
+    Un fichier est compact si un .json de paramètres l'accompagne.
+    """
+    chemin = Path(emb_path)
+    chemin_meta = chemin.with_suffix('.json')
+    if not chemin_meta.exists():
+        return np.load(chemin)
+    meta = json.loads(chemin_meta.read_text(encoding='utf-8'))
+    reference = None
+    if rescorer:
+        source = chemin.with_name(meta['source'])
+        if not source.exists():
+            raise FileNotFoundError(f"Rescoring impossible: {source} (float32) introuvable")
+        reference = np.load(source, mmap_mode='r')
+    return EmbeddingsCompacts(np.load(chemin), meta, reference)
+
+
+# ============================================================================
+# RAPPORT PRÉCISION / TAILLE
+# ============================================================================
+
+def rapport_compromis(embeddings: np.ndarray,
+                      metadata: pd.DataFrame,
+                      precisions=PRECISIONS[1:],
+                      output_path: str = 'results/precision_stockage.csv') -> pd.DataFrame:
+    """Taille et écarts d'analyse de chaque précision par rapport au float32.
+
+    La matrice inter/intra-pays et les distances au Scrum Guide sont
+    recalculées par AnalyseurSemantique sur la forme compacte.
+    """
+    from onnx_backend import repertoire_temporaire
+
+    module = runpy.run_path(str(Path(__file__).with_name('03_analyze.py')), run_name='03_analyze')
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def analyser(emb):
+        analyseur = module['AnalyseurSemantique']()
+        analyseur.embeddings = emb
+        analyseur.metadata = metadata.reset_index(drop=True)
+        matrice = analyseur.calculer_matrice_similarite('sommes')
+        distances = analyseur.analyser_distance_scrum_guide()
+        return matrice, (distances.set_index('pays')['similarite_moyenne']
+                         if distances is not None else None)
+
+    lignes = []
+    with repertoire_temporaire():
+        matrice_ref, distances_ref = analyser(embeddings)
+        for precision in precisions:
+            codes, meta = quantifier(embeddings, precision)
+            compact = EmbeddingsCompacts(codes, meta)
+            approches = np.asarray(compact)
+            accord = np.einsum('ij,ij->i', embeddings, approches) / np.maximum(
+                np.linalg.norm(embeddings, axis=1) * np.linalg.norm(approches, axis=1), 1e-12)
+            matrice, distances = analyser(compact)
+            ligne = {
+                'precision': precision,
+                'octets_par_texte': codes.nbytes / max(len(codes), 1),
+                'ratio': embeddings.nbytes / max(codes.nbytes, 1),
+                'accord_cosinus_moyen': float(accord.mean()),
+                'accord_cosinus_min': float(accord.min()),
+                'ecart_max_matrice': float(np.nanmax(np.abs(matrice.values - matrice_ref.values))),
+            }
+            if distances_ref is not None:
+                ligne['ecart_max_scrum_guide'] = float((distances - distances_ref).abs().max())
+                ligne['pays_changeant_de_rang'] = int(
+                    (distances.rank(ascending=False) != distances_ref.rank(ascending=False)).sum())
+            lignes.append(ligne)
+
+    table = pd.DataFrame(lignes)
+    print("\n📦 Compromis précision / taille (référence float32, "
+          f"{embeddings.nbytes / max(len(embeddings), 1):.0f} octets par texte):")
+    print(table.round(4).to_string(index=False))
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output_path, index=False)
+    print(f"✅ Rapport sauvegardé: {output_path}")
+    return table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stockage compact des embeddings (float16, int8, binaire).")
+    parser.add_argument("command", choices=["rapport", "convertir"])
+    parser.add_argument("--emb-path", default="embeddings/embeddings_bge_m3.npy", help="Embeddings float32.")
+    parser.add_argument("--meta-path", default="embeddings/metadata.csv", help="Métadonnées (rapport).")
+    parser.add_argument("--precision", choices=PRECISIONS[1:], default="int8", help="Précision (convertir).")
+    parser.add_argument("--output", default="results/precision_stockage.csv", help="Tableau du rapport.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    embeddings = np.load(args.emb_path, mmap_mode='r')
+    if args.command == "rapport":
+        rapport_compromis(embeddings, pd.read_csv(args.meta_path), output_path=args.output)
+    else:
+        chemin = sauvegarder_compact(embeddings, args.emb_path, args.precision)
+        print(f"✅ {args.precision}: {chemin} ({chemin.stat().st_size / 1e6:.1f} Mo, "
+              f"float32: {Path(args.emb_path).stat().st_size / 1e6:.1f} Mo)")
+
+
+if __name__ == "__main__":
+    main()
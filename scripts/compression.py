@@ -0,0 +1,68 @@
+"""
+scripts/compression.py
+
+Compression helpers shared by the SerpApi response cache and the raw blob
+store: zstd when `zstandard` is installed, zlib otherwise. The codec name
+is returned with the payload and must be stored next to it so that both
+kinds of entries can be read back.
+
+Compressor objects are reused per thread (they are costly to build and
+not thread-safe), which matters when compressing many small records.
+"""
+from __future__ import annotations
+import threading
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard optional: fall back to zlib
+    zstandard = None
+
+DEFAULT_LEVEL = 10
+
+_local = threading.local()
+
+
+def _zstd(kind: str, level: int, dictionary: Optional[bytes]):
+    """Per-thread (de)compressor for a level and an optional dictionary."""
+    cache = _local.__dict__.setdefault("cache", {})
+    key = (kind, level, dictionary)
+    if key not in cache:
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        if kind == "c":
+            cache[key] = zstandard.ZstdCompressor(level=level, dict_data=zdict)
+        else:
+            cache[key] = zstandard.ZstdDecompressor(dict_data=zdict)
+    return cache[key]
+
+
+def compress(data: bytes, level: int = DEFAULT_LEVEL, dictionary: Optional[bytes] = None) -> Tuple[str, bytes]:
+    """Compress `data`; returns (codec, payload). The dictionary only applies to zstd."""
+    if zstandard is not None:
+        return ("zstd-dict" if dictionary else "zstd"), _zstd("c", level, dictionary).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decompress(codec: str, blob: bytes, dictionary: Optional[bytes] = None) -> bytes:
+    if codec in ("zstd", "zstd-dict"):
+        if zstandard is None:
+            raise RuntimeError("Entrée compressée en zstd mais zstandard n'est pas installé (pip install zstandard)")
+        if codec == "zstd-dict" and not dictionary:
+            raise ValueError("Entrée compressée avec un dictionnaire zstd absent")
+        return _zstd("d", 0, dictionary if codec == "zstd-dict" else None).decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"Codec inconnu: {codec}")
+
+
+def train_dictionary(samples, size: int = 64 * 1024) -> Optional[bytes]:
+    """zstd dictionary trained on sample records (None without zstandard or with too few samples)."""
+    if zstandard is None or len(samples) < 8:
+        return None
+    try:
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+    except zstandard.ZstdError:
+        # Too little or too uniform data to train on
+        return None
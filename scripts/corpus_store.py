@@ -0,0 +1,110 @@
+"""
+scripts/corpus_store.py
+
+Append-only, partitioned store for collected job offers.
+
+Layout (Hive partitioning, Parquet files):
+    <root>/country=<c>/role_query=<r>/collected=<YYYY-MM-DD>/part-<ts>-<uid>.parquet
+    <root>/_ids.sqlite   persistent id index (see id_index.py)
+
+Each append writes only new rows: ids are checked against the index, so
+dedup costs O(new rows) instead of re-reading the whole corpus. Readers
+scan lazily with column pruning and partition filters through pyarrow.dataset.
+
+A file is written before its ids are indexed: a crash in between can at
+worst re-append the same rows on the next run, never lose them.
+"""
+from __future__ import annotations
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Union
+from urllib.parse import quote
+
+import pandas as pd
+
+from id_index import IdIndex
+
+DEFAULT_STORE_DIR = "data/raw/google_jobs_store"
+PARTITION_COLS = ["country", "role_query", "collected"]
+INDEX_FILE = "_ids.sqlite"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow non installé. Exécutez: pip install pyarrow")
+
+
+class PartitionedStore:
+    """Append-only Parquet store partitioned by country, role and collection date."""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        _require_pyarrow()
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index = IdIndex(os.path.join(root, INDEX_FILE))
+
+    def append(self, records: Union[List[Dict], pd.DataFrame]) -> int:
+        """Append records whose id is not yet stored. Returns the number of rows written."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = pd.DataFrame(records) if not isinstance(records, pd.DataFrame) else records.copy()
+        if df.empty:
+            return 0
+        df = df.drop_duplicates(subset=["id"])
+        df = df[~df["id"].isin(self.index.known(df["id"]))]
+        if df.empty:
+            return 0
+
+        if "collected" not in df.columns:
+            df["collected"] = df["retrieved_at"].astype(str).str[:10] if "retrieved_at" in df.columns \
+                else time.strftime("%Y-%m-%d")
+        for col in PARTITION_COLS:
+            df[col] = df[col].fillna("unknown").astype(str)
+
+        data_cols = [c for c in df.columns if c not in PARTITION_COLS]
+        # All data columns as (nullable) strings: identical schema across files
+        schema = pa.schema([(c, pa.string()) for c in data_cols])
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+
+        for keys, part in df.groupby(PARTITION_COLS, sort=False):
+            directory = os.path.join(self.root, *(f"{c}={quote(str(v), safe='')}" for c, v in zip(PARTITION_COLS, keys)))
+            os.makedirs(directory, exist_ok=True)
+            values = {c: [None if pd.isna(v) else str(v) for v in part[c]] for c in data_cols}
+            table = pa.Table.from_pydict(values, schema=schema)
+            name = f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp = os.path.join(directory, "." + name)
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, os.path.join(directory, name))
+
+        self.index.add(df["id"])
+        return len(df)
+
+    def dataset(self):
+        """Lazy pyarrow Dataset over all partitions (no data is read)."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor="hive")
+        return ds.dataset(self.root, format="parquet", partitioning=partitioning)
+
+    def scan(self, columns: Optional[Sequence[str]] = None, filter=None, batch_size: int = 65536):
+        """Iterate over record batches, reading only `columns` from matching partitions.
+
+        Example:
+            import pyarrow.dataset as ds
+            store.scan(["id", "description"], filter=ds.field("country") == "France")
+        """
+        return self.dataset().to_batches(columns=list(columns) if columns else None,
+                                         filter=filter, batch_size=batch_size)
+
+    def to_pandas(self, columns: Optional[Sequence[str]] = None, filter=None) -> pd.DataFrame:
+        return self.dataset().to_table(columns=list(columns) if columns else None, filter=filter).to_pandas()
+
+    def __len__(self) -> int:
+        return len(self.index)
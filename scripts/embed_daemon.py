@@ -0,0 +1,228 @@
+"""Service d'embeddings local qui garde le modèle en mémoire entre les exécutions.
+
+Charger BGE-M3 (~2 Go) prend des dizaines de secondes à chaque exécution
+de 02_embed.py. Le daemon charge le modèle une fois et répond en HTTP sur
+localhost:
+    GET  /health  configuration du modèle servi (nom, révision,
+                  max_seq_length, variante), dimension, compteurs
+    POST /embed   {"texts": [...], "normalize": true, "batch_size": 16,
+                   "budget_tokens": null}
+                  → {"shape": [n, d], "data": <float32 little-endian, base64>}
+
+Le daemon est opt-in: EmbeddingCalculator(daemon_url=DEFAULT_DAEMON_URL)
+(ou DAEMON_URL dans la configuration de 02_embed.py) interroge /health au
+premier encodage: si un daemon tourne avec la même configuration (donc les
+mêmes clés de cache), les textes absents du cache lui sont envoyés; sinon le
+modèle est chargé dans le processus comme avant. Les requêtes sont encodées une à la fois (un seul
+modèle en mémoire), /health reste disponible pendant un encodage.
+
+Usage:
+    python scripts/embed_daemon.py [--port 8765] [--backend onnx-int8]
+        [--max-seq-length 512 --pooling-fenetres ponderee]
+"""
+
+import argparse
+import base64
+import json
+import runpy
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_DAEMON_URL = 'http://127.0.0.1:8765'
+
+# Champs de /health qui doivent correspondre à la configuration du client
+CHAMPS_CONFIGURATION = ('model_name', 'model_revision', 'max_seq_length', 'variante')
+
+
+class ClientDaemon:
+    """Client HTTP (stdlib) du daemon d'embeddings."""
+
+    def __init__(self,
+                 url: str = DEFAULT_DAEMON_URL,
+                 timeout: float = 600.0,
+                 textes_par_requete: int = 512):
+        """
+        Args:
+            url: Adresse du daemon
+            timeout: Délai max d'une requête /embed (s)
+            textes_par_requete: Taille max d'un lot envoyé en une requête
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.textes_par_requete = textes_par_requete
+
+    def sante(self, timeout: float = 0.5) -> Optional[dict]:
+        """Réponse de /health, ou None si aucun daemon ne répond."""
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=timeout) as reponse:
+                return json.loads(reponse.read())
+        except (OSError, ValueError):
+            return None
+
+    def compatible(self, configuration: dict) -> bool:
+        """Vrai si un daemon tourne et sert exactement cette configuration."""
+        sante = self.sante()
+        if sante is None:
+            return False
+        differences = [k for k in CHAMPS_CONFIGURATION if sante.get(k) != configuration.get(k)]
+        if differences:
+            print(f"⚠️  Daemon {self.url} ignoré: configuration différente ({', '.join(differences)})")
+            return False
+        return True
+
+    def encoder(self,
+                texts: List[str],
+                normalize: bool = True,
+                batch_size: int = 16,
+                budget_tokens: Optional[int] = None) -> np.ndarray:
+        """Encode des textes via le daemon, par lots de textes_par_requete."""
+        blocs = []
+        for debut in range(0, len(texts), self.textes_par_requete):
+            corps = json.dumps({
+                'texts': [str(t) for t in texts[debut:debut + self.textes_par_requete]],
+                'normalize': normalize,
+                'batch_size': batch_size,
+                'budget_tokens': budget_tokens,
+            }).encode('utf-8')
+            requete = urllib.request.Request(f"{self.url}/embed", data=corps,
+                                             headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(requete, timeout=self.timeout) as reponse:
+                blocs.append(decoder_vecteurs(json.loads(reponse.read())))
+        return np.concatenate(blocs) if blocs else np.empty((0, 0), dtype=np.float32)
+
+
+def encoder_vecteurs(embeddings: np.ndarray) -> dict:
+    tableau = np.ascontiguousarray(embeddings, dtype='<f4')
+    return {'shape': list(tableau.shape), 'data': base64.b64encode(tableau.tobytes()).decode('ascii')}
+
+
+def decoder_vecteurs(contenu: dict) -> np.ndarray:
+    donnees = base64.b64decode(contenu['data'])
+    return np.frombuffer(donnees, dtype='<f4').reshape(contenu['shape']).astype(np.float32)
+
+
+# ============================================================================
+# SERVEUR
+# ============================================================================
+
+class ServeurEmbeddings(ThreadingHTTPServer):
+    """Serveur HTTP qui partage un EmbeddingCalculator chargé une fois."""
+
+    daemon_threads = True
+
+    def __init__(self, adresse, calc):
+        super().__init__(adresse, GestionnaireEmbeddings)
+        self.calc = calc
+        self.verrou = threading.Lock()
+        self.demarrage = time.time()
+        self.requetes = 0
+        self.textes = 0
+
+    def sante(self) -> dict:
+        calc = self.calc
+        return {
+            'statut': 'ok',
+            'model_name': calc.model_name,
+            'model_revision': calc.model_revision,
+            'max_seq_length': calc.max_seq_length,
+            'variante': calc._variante(),
+            'dimension': calc.model.get_sentence_embedding_dimension(),
+            'requetes': self.requetes,
+            'textes': self.textes,
+            'uptime_s': round(time.time() - self.demarrage, 1),
+        }
+
+    def encoder(self, demande: dict) -> np.ndarray:
+        texts = demande['texts']
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise ValueError("'texts' doit être une liste de chaînes")
+        encoder = self.calc._encodeur_local(int(demande.get('batch_size') or 16),
+                                            bool(demande.get('normalize', True)),
+                                            demande.get('budget_tokens'),
+                                            show_progress_bar=False)
+        with self.verrou:
+            embeddings = np.asarray(encoder(texts), dtype=np.float32)
+            self.requetes += 1
+            self.textes += len(texts)
+        return embeddings
+
+
+class GestionnaireEmbeddings(BaseHTTPRequestHandler):
+
+    def _repondre(self, code: int, contenu: dict):
+        corps = json.dumps(contenu).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._repondre(200, self.server.sante())
+        else:
+            self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/embed':
+            self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+            return
+        try:
+            longueur = int(self.headers.get('Content-Length', 0))
+            demande = json.loads(self.rfile.read(longueur))
+            debut = time.time()
+            embeddings = self.server.encoder(demande)
+        except (KeyError, TypeError, ValueError) as e:
+            self._repondre(400, {'erreur': str(e)})
+            return
+        self._repondre(200, encoder_vecteurs(embeddings))
+        print(f"   /embed {len(embeddings)} textes en {time.time() - debut:.2f}s")
+
+    def log_message(self, format, *args):
+        pass  # une ligne par /embed suffit (voir do_POST)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Daemon d'embeddings: garde le modèle en mémoire, répond en HTTP local.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute (défaut: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute (défaut: 8765).")
+    parser.add_argument("--model", default="BAAI/bge-m3", help="Modèle sentence-transformers.")
+    parser.add_argument("--revision", default=None, help="Révision du modèle.")
+    parser.add_argument("--max-seq-length", type=int, default=None, help="Longueur max de séquence.")
+    parser.add_argument("--pooling-fenetres", choices=["moyenne", "ponderee"], default=None,
+                        help="Textes longs découpés en fenêtres (voir EmbeddingCalculator).")
+    parser.add_argument("--chevauchement", type=int, default=64, help="Chevauchement des fenêtres (tokens).")
+    parser.add_argument("--backend", choices=["torch", "onnx", "onnx-int8"], default="torch", help="Backend d'inférence.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    module = runpy.run_path(str(Path(__file__).with_name('02_embed.py')), run_name='02_embed')
+    # Ni cache (il reste côté client) ni daemon (c'est nous)
+    calc = module['EmbeddingCalculator'](
+        model_name=args.model, model_revision=args.revision,
+        max_seq_length=args.max_seq_length, cache_dir=None, daemon_url=None,
+        pooling_fenetres=args.pooling_fenetres, chevauchement_fenetres=args.chevauchement,
+        backend=args.backend
+    )
+    calc._charger_modele()
+
+    serveur = ServeurEmbeddings((args.host, args.port), calc)
+    print(f"🔌 Daemon d'embeddings prêt sur http://{args.host}:{args.port} ({args.model}, {args.backend})")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du daemon")
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Cache d'embeddings adressé par contenu.
+
+Chaque vecteur est indexé par une empreinte de (texte, modèle, révision,
+normalisation, longueur max de séquence). La révision est résolue en sha
+de commit: une branche comme 'main' qui avance sur le Hub ne sert pas les
+vecteurs de l'ancienne version du modèle.
+
+Les vecteurs sont écrits dans des segments .npy (un par appel à `ajouter`)
+relus en memory-mapping; dès que les petits segments s'accumulent, ils
+sont fusionnés en un seul. L'index (.npz) garde pour chaque clé son
+segment, sa ligne et sa date de dernier accès, ce qui permet une éviction
+LRU au-delà de `max_entrees`. Il n'est réécrit que lorsque des entrées sont
+ajoutées ou évincées (une fois par lot d'ajouts avec `ajouter(...,
+sauvegarder=False)` puis `sauvegarder()`); les dates d'accès seules sont
+écrites au plus toutes les `delai_acces` secondes (ou par
+`sauvegarder(forcer=True)`).
+
+Un seul processus écrivain à la fois est supposé.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_SHA = re.compile(r'[0-9a-f]{40}')
+
+
+def _sha_hub(model_name: str, revision: Optional[str]) -> Optional[str]:
+    """sha du commit pointé par `revision` sur le Hub (None hors ligne)."""
+    try:
+        from huggingface_hub import model_info
+        return model_info(model_name, revision=revision, timeout=10).sha
+    except Exception:
+        return None
+
+
+def _sha_cache_local(model_name: str, revision: Optional[str]) -> Optional[str]:
+    """sha noté par huggingface_hub dans son cache local pour `revision`."""
+    hub = os.environ.get('HF_HUB_CACHE') or os.path.join(
+        os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface')), 'hub')
+    ref = Path(hub) / f"models--{model_name.replace('/', '--')}" / 'refs' / (revision or 'main')
+    try:
+        sha = ref.read_text().strip()
+    except OSError:
+        return None
+    return sha if _SHA.fullmatch(sha) else None
+
+
+@functools.lru_cache(maxsize=None)
+def resoudre_revision(model_name: str, revision: Optional[str] = None) -> str:
+    """Révision (branche, tag ou None = 'main') → sha du commit correspondant.
+
+    Le Hub est interrogé une fois par processus; hors ligne, la référence du
+    cache local de huggingface_hub est utilisée. Un dossier local ou une
+    révision introuvable gardent leur nom.
+    """
+    if revision and _SHA.fullmatch(revision):
+        return revision
+    if not os.path.isdir(model_name):
+        sha = _sha_hub(model_name, revision) or _sha_cache_local(model_name, revision)
+        if sha:
+            return sha
+        print(f"⚠️ Révision '{revision or 'main'}' de {model_name} non résolue en sha: "
+              "clés de cache indexées par le nom de la révision")
+    return str(revision or 'main')
+
+
+class CacheEmbeddings:
+    """Stockage persistant des embeddings déjà calculés."""
+
+    INDEX = 'index.npz'
+    # Segments de moins de LIGNES_SEGMENT lignes fusionnés au-delà de MAX_PETITS_SEGMENTS
+    LIGNES_SEGMENT = 65_536
+    MAX_PETITS_SEGMENTS = 16
+
+    def __init__(self, cache_dir: str = 'embeddings/cache',
+                 max_entrees: Optional[int] = 500_000,
+                 delai_acces: float = 300.0):
+        self.cache_dir = Path(cache_dir)
+        self.max_entrees = max_entrees
+        self.delai_acces = delai_acces
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._segments: Dict[int, np.ndarray] = {}
+        self._modifie = False
+        self._acces_modifies = False
+        self._derniere_sauvegarde = time.time()
+        self._charger_index()
+
+    # ------------------------------------------------------------------
+    # Clés
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def cles(texts: List[str],
+             model_name: str,
+             revision: Optional[str] = None,
+             normalize: Optional[bool] = True,
+             max_seq_length: Optional[int] = None,
+             variante: str = '') -> np.ndarray:
+        """Calcule les clés de cache (hex 32 caractères) d'une liste de textes."""
+        prefixe = '\x1f'.join([
+            model_name, resoudre_revision(model_name, revision), str(normalize),
+            str(max_seq_length or 'defaut'), variante
+        ]).encode('utf-8') + b'\x1e'
+        cles = [hashlib.blake2b(prefixe + str(t).encode('utf-8'),
+                                digest_size=16).hexdigest()
+                for t in texts]
+        return np.array(cles, dtype='S32')
+
+    # ------------------------------------------------------------------
+    # Lecture / écriture
+    # ------------------------------------------------------------------
+
+    def chercher(self, cles: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Cherche des clés dans le cache.
+
+        Returns:
+            (masque des clés trouvées, array (n, dim) rempli pour les clés
+            trouvées, ou None si aucune clé n'est en cache)
+        """
+        positions = np.array([self._position.get(c, -1) for c in cles.tolist()],
+                             dtype=np.int64)
+        trouves = positions >= 0
+        if not trouves.any():
+            return trouves, None
+
+        vecteurs = None
+        lignes_req = np.flatnonzero(trouves)
+        pos = positions[lignes_req]
+        segments = self._segment[pos]
+        for seg in np.unique(segments):
+            sel = segments == seg
+            bloc = self._lire_segment(int(seg))[self._ligne[pos[sel]]]
+            if vecteurs is None:
+                vecteurs = np.empty((len(cles), bloc.shape[1]), dtype=np.float32)
+            vecteurs[lignes_req[sel]] = bloc
+
+        self._acces[pos] = time.time()
+        self._acces_modifies = True
+        return trouves, vecteurs
+
+    def ajouter(self, cles: np.ndarray, vecteurs: np.ndarray, sauvegarder: bool = True):
+        """Ajoute des vecteurs au cache (les clés déjà présentes sont ignorées).
+
+        Args:
+            sauvegarder: Réécrire l'index tout de suite. Avec False, l'appelant
+                appelle `sauvegarder()` après une série d'ajouts; un arrêt
+                entre-temps perd ces entrées sans corrompre le cache.
+        """
+        vues = set()
+        nouvelles = []
+        for i, c in enumerate(cles.tolist()):
+            if c not in self._position and c not in vues:
+                vues.add(c)
+                nouvelles.append(i)
+        if not nouvelles:
+            return
+        nouvelles = np.array(nouvelles, dtype=np.int64)
+
+        seg = int(self._segment.max()) + 1 if len(self._segment) else 0
+        self._ecrire_segment(seg, np.asarray(vecteurs, dtype=np.float32)[nouvelles])
+
+        debut = len(self._cles)
+        self._cles = np.concatenate([self._cles, cles[nouvelles]])
+        self._segment = np.concatenate([self._segment,
+                                        np.full(len(nouvelles), seg, dtype=np.int32)])
+        self._ligne = np.concatenate([self._ligne,
+                                      np.arange(len(nouvelles), dtype=np.int64)])
+        self._acces = np.concatenate([self._acces,
+                                      np.full(len(nouvelles), time.time())])
+        for k, c in enumerate(self._cles[debut:].tolist()):
+            self._position[c] = debut + k
+
+        self._modifie = True
+        self._evincer()
+        self._fusionner_petits_segments()
+        if sauvegarder:
+            self.sauvegarder()
+
+    def sauvegarder(self, forcer: bool = False):
+        """Écrit l'index sur disque (écriture atomique) s'il a changé.
+
+        Args:
+            forcer: Écrire aussi des dates d'accès récentes (sinon seulement
+                après `delai_acces` secondes)
+        """
+        acces_a_ecrire = self._acces_modifies and (
+            forcer or time.time() - self._derniere_sauvegarde >= self.delai_acces)
+        if not (self._modifie or acces_a_ecrire):
+            return
+        tmp = self.cache_dir / 'index.tmp.npz'
+        np.savez(tmp, cles=self._cles, segment=self._segment,
+                 ligne=self._ligne, acces=self._acces)
+        os.replace(tmp, self.cache_dir / self.INDEX)
+        self._modifie = self._acces_modifies = False
+        self._derniere_sauvegarde = time.time()
+
+    # ------------------------------------------------------------------
+    # Éviction
+    # ------------------------------------------------------------------
+
+    def _evincer(self):
+        """Éviction LRU au-delà de max_entrees, puis compactage si besoin."""
+        if self.max_entrees is None or len(self._cles) <= self.max_entrees:
+            return
+
+        garder = np.sort(np.argsort(-self._acces, kind='stable')[:self.max_entrees])
+        n_evinces = len(self._cles) - len(garder)
+        self._reindexer(garder)
+        print(f"🧹 Cache: {n_evinces} entrées évincées (LRU)")
+
+        # Compacter si les segments contiennent plus de lignes mortes que vivantes
+        lignes_totales = sum(self._lire_segment(int(s)).shape[0]
+                             for s in np.unique(self._segment))
+        if lignes_totales > 2 * len(self._cles):
+            self.compacter()
+        else:
+            # Index écrit avant de supprimer les segments qu'il référençait
+            self.sauvegarder()
+            self._supprimer_segments_orphelins()
+
+    def _fusionner_petits_segments(self):
+        """Fusionne les petits segments (un par appel à `ajouter`) quand ils s'accumulent."""
+        petits = [int(s) for s in np.unique(self._segment)
+                  if self._lire_segment(int(s)).shape[0] < self.LIGNES_SEGMENT]
+        if len(petits) > self.MAX_PETITS_SEGMENTS:
+            self.compacter(petits)
+
+    def compacter(self, segments: Optional[List[int]] = None):
+        """Réécrit les entrées vivantes dans un segment unique par dimension.
+
+        Args:
+            segments: Segments à fusionner (par défaut tous)
+        """
+        if len(self._cles) == 0:
+            self._supprimer_segments_orphelins()
+            return
+
+        # Regrouper par dimension (plusieurs modèles peuvent partager le cache)
+        par_dim: Dict[int, List[int]] = {}
+        for seg in (np.unique(self._segment) if segments is None else segments):
+            par_dim.setdefault(self._lire_segment(int(seg)).shape[1], []).append(int(seg))
+
+        seg_suivant = int(self._segment.max()) + 1
+        for dim, segs in par_dim.items():
+            sel = np.flatnonzero(np.isin(self._segment, segs))
+            bloc = np.empty((len(sel), dim), dtype=np.float32)
+            for seg in segs:
+                s = self._segment[sel] == seg
+                bloc[s] = self._lire_segment(seg)[self._ligne[sel[s]]]
+            self._ecrire_segment(seg_suivant, bloc)
+            self._segment[sel] = seg_suivant
+            self._ligne[sel] = np.arange(len(sel))
+            seg_suivant += 1
+
+        self._modifie = True
+        self.sauvegarder()
+        self._supprimer_segments_orphelins()
+
+    # ------------------------------------------------------------------
+    # Interne
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._cles)
+
+    def _chemin_segment(self, seg: int) -> Path:
+        return self.cache_dir / f'seg_{seg:06d}.npy'
+
+    def _ecrire_segment(self, seg: int, vecteurs: np.ndarray):
+        chemin = self._chemin_segment(seg)
+        tmp = self.cache_dir / f'tmp_{seg:06d}.npy'
+        np.save(tmp, vecteurs)
+        os.replace(tmp, chemin)
+        self._segments.pop(seg, None)
+
+    def _lire_segment(self, seg: int) -> np.ndarray:
+        if seg not in self._segments:
+            self._segments[seg] = np.load(self._chemin_segment(seg), mmap_mode='r')
+        return self._segments[seg]
+
+    def _charger_index(self):
+        chemin = self.cache_dir / self.INDEX
+        if chemin.exists():
+            with np.load(chemin) as idx:
+                self._cles = idx['cles']
+                self._segment = idx['segment']
+                self._ligne = idx['ligne']
+                self._acces = idx['acces']
+        else:
+            self._cles = np.array([], dtype='S32')
+            self._segment = np.array([], dtype=np.int32)
+            self._ligne = np.array([], dtype=np.int64)
+            self._acces = np.array([], dtype=np.float64)
+        self._position = {c: i for i, c in enumerate(self._cles.tolist())}
+
+    def _reindexer(self, garder: np.ndarray):
+        self._cles = self._cles[garder]
+        self._segment = self._segment[garder]
+        self._ligne = self._ligne[garder]
+        self._acces = self._acces[garder]
+        self._position = {c: i for i, c in enumerate(self._cles.tolist())}
+        self._modifie = True
+
+    def _supprimer_segments_orphelins(self):
+        vivants = set(np.unique(self._segment).tolist())
+        for chemin in self.cache_dir.glob('seg_*.npy'):
+            seg = int(chemin.stem.split('_')[1])
+            if seg not in vivants:
+                self._segments.pop(seg, None)
+                chemin.unlink()
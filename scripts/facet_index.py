@@ -0,0 +1,126 @@
+"""Index des facettes du corpus (pays, rôle, type, langue, source).
+
+Chaque colonne est convertie une fois en codes catégoriels; un tri stable
+des codes et les offsets de début de chaque catégorie (format CSR) donnent
+les positions des lignes d'une valeur par simple tranche, sans masque
+booléen ni liste Python. Les positions d'une valeur sont croissantes.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+FACETTES = ('pays', 'role', 'type', 'langue', 'source')
+
+
+class IndexFacettes:
+    """Positions des lignes par valeur de facette, calculées une fois."""
+
+    def __init__(self, metadata: pd.DataFrame, colonnes: Iterable[str] = FACETTES):
+        self.metadata = metadata
+        self.n = len(metadata)
+        self._categories: Dict[str, pd.Index] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._ordre: Dict[str, np.ndarray] = {}
+        self._offsets: Dict[str, np.ndarray] = {}
+        self._motifs: Dict[tuple, np.ndarray] = {}
+        for colonne in colonnes:
+            if colonne in metadata.columns:
+                self._indexer(colonne)
+
+    def _indexer(self, colonne: str):
+        categoriel = pd.Categorical(self.metadata[colonne])
+        codes = categoriel.codes.astype(np.int64)  # -1 = valeur manquante
+        ordre = np.argsort(codes, kind='stable')
+        self._categories[colonne] = categoriel.categories
+        self._codes[colonne] = codes
+        self._ordre[colonne] = ordre
+        self._offsets[colonne] = np.searchsorted(codes[ordre], np.arange(len(categoriel.categories) + 1))
+
+    def __contains__(self, colonne: str) -> bool:
+        return colonne in self._codes
+
+    def categories(self, colonne: str) -> List:
+        return self._categories[colonne].tolist()
+
+    def codes(self, colonne: str) -> np.ndarray:
+        """Code catégoriel de chaque ligne (-1 = manquant)."""
+        return self._codes[colonne]
+
+    def positions(self, colonne: str, valeur) -> np.ndarray:
+        """Positions des lignes où colonne == valeur (array vide si absente)."""
+        k = self._categories[colonne].get_indexer([valeur])[0]
+        if k < 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = self._offsets[colonne]
+        return self._ordre[colonne][offsets[k]:offsets[k + 1]]
+
+    def contient(self, colonne: str, motif: str) -> np.ndarray:
+        """Positions des lignes dont la valeur contient `motif` (mémorisé).
+
+        Le test ne porte que sur les catégories distinctes, pas sur chaque ligne.
+        """
+        cle = (colonne, motif)
+        if cle not in self._motifs:
+            categories = self._categories[colonne]
+            retenues = np.flatnonzero(categories.astype(str).str.contains(motif, regex=False))
+            offsets = self._offsets[colonne]
+            tranches = [self._ordre[colonne][offsets[k]:offsets[k + 1]] for k in retenues]
+            self._motifs[cle] = np.sort(np.concatenate(tranches)) if tranches else np.empty(0, dtype=np.int64)
+        return self._motifs[cle]
+
+    def groupes(self, colonne: str, valeurs: Sequence) -> np.ndarray:
+        """Numéro de groupe de chaque ligne selon sa place dans `valeurs` (-1 = hors liste)."""
+        correspondance = self._categories[colonne].get_indexer(list(valeurs))
+        table = np.full(len(self._categories[colonne]) + 1, -1, dtype=np.int64)
+        presentes = correspondance >= 0
+        table[correspondance[presentes]] = np.flatnonzero(presentes)
+        # Le code -1 (manquant) tombe sur la dernière case, toujours -1
+        return table[self._codes[colonne]]
+
+    def cellules(self,
+                 colonnes: Sequence[str],
+                 valeurs: Optional[Mapping[str, Sequence]] = None) -> Tuple[np.ndarray, List[tuple]]:
+        """Croisement de plusieurs facettes: numéro de cellule de chaque ligne.
+
+        Args:
+            colonnes: Facettes croisées (une cellule = une combinaison de
+                valeurs); une colonne hors FACETTES est indexée à la demande
+            valeurs: {colonne: valeurs retenues, dans l'ordre voulu}; par
+                défaut toutes les valeurs non manquantes de la colonne
+
+        Returns:
+            (cellule de chaque ligne, -1 si une valeur manque ou n'est pas
+            retenue; libellés (tuples de valeurs) des cellules présentes,
+            dans l'ordre des colonnes puis des valeurs)
+        """
+        valeurs = valeurs or {}
+        for colonne in colonnes:
+            if colonne not in self and colonne in self.metadata.columns:
+                self._indexer(colonne)
+        inconnues = [c for c in colonnes if c not in self]
+        if inconnues:
+            raise ValueError(f"Facettes absentes des métadonnées: {', '.join(inconnues)}")
+
+        combine = np.zeros(self.n, dtype=np.int64)
+        valide = np.ones(self.n, dtype=bool)
+        modalites = []
+        for colonne in colonnes:
+            if colonne in valeurs:
+                modalites.append(list(valeurs[colonne]))
+                codes = self.groupes(colonne, modalites[-1])
+            else:
+                modalites.append(self.categories(colonne))
+                codes = self._codes[colonne]
+            valide &= codes >= 0
+            combine = combine * len(modalites[-1]) + codes
+
+        # Seules les combinaisons présentes deviennent des cellules
+        presentes, cellules = np.unique(combine[valide], return_inverse=True)
+        resultat = np.full(self.n, -1, dtype=np.int64)
+        resultat[valide] = cellules
+        tailles = [len(m) for m in modalites]
+        libelles = [tuple(m[k] for m, k in zip(modalites, np.unravel_index(code, tailles)))
+                    for code in presentes.tolist()]
+        return resultat, libelles
@@ -0,0 +1,218 @@
+"""Client asynchrone pour un Hugging Face Inference Endpoint d'embeddings.
+
+Les batchs sont envoyés en parallèle sur un pool de connexions persistant
+(aiohttp), avec un nombre de requêtes en vol borné, un limiteur de débit à
+jetons et des retries avec backoff exponentiel qui respectent l'en-tête
+Retry-After. Les vecteurs sont réassemblés dans l'ordre des textes.
+
+Exécuter ce module lance un serveur factice local (même format de réponse
+{"embeddings": ...}) et vérifie le client contre lui:
+    python scripts/hf_client.py
+"""
+
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
+import numpy as np
+
+from rate_limiter import LimiteurDebit
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+CODES_RETRY = {408, 425, 429, 500, 502, 503, 504}
+
+
+def _delai_retry_after(valeur: Optional[str]) -> Optional[float]:
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes."""
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        pass
+    try:
+        import datetime as dt
+        date = parsedate_to_datetime(valeur)
+        return max(0.0, (date - dt.datetime.now(date.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClientEmbeddingsHF:
+    """Client HTTP asynchrone avec pool de connexions, débit borné et retries."""
+
+    def __init__(self,
+                 endpoint_url: str,
+                 hf_token: Optional[str] = None,
+                 concurrence: int = 8,
+                 requetes_par_seconde: float = 10.0,
+                 max_retries: int = 5,
+                 backoff_base: float = 1.0,
+                 timeout: float = 120.0):
+        """
+        Args:
+            endpoint_url: URL de l'endpoint HF
+            hf_token: Token Hugging Face (None = pas d'en-tête Authorization)
+            concurrence: Nombre max de requêtes en vol
+            requetes_par_seconde: Débit max (seau à jetons partagé)
+            max_retries: Nombre max de nouvelles tentatives par batch
+            backoff_base: Délai de base du backoff exponentiel (s)
+            timeout: Timeout total par requête (s)
+        """
+        self.endpoint_url = endpoint_url
+        self.hf_token = hf_token
+        self.concurrence = concurrence
+        self.limiteur = LimiteurDebit(requetes_par_seconde)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+
+    def encoder(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        """Version synchrone de encoder_async.
+
+        Dans une boucle asyncio déjà active (Jupyter, Colab), asyncio.run est
+        interdit: la coroutine tourne alors dans sa propre boucle, sur un
+        thread dédié, et l'appel bloque jusqu'au résultat.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.encoder_async(texts, batch_size))
+        with ThreadPoolExecutor(max_workers=1) as executeur:
+            return executeur.submit(asyncio.run, self.encoder_async(texts, batch_size)).result()
+
+    async def encoder_async(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        """Encode tous les textes et renvoie un array (n_texts, dim) ordonné."""
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError(
+                "aiohttp non installé. "+
+                "Exécutez: pip install aiohttp"
+            )
+        from tqdm import tqdm
+
+        headers = {"Content-Type": "application/json"}
+        if self.hf_token:
+            headers["Authorization"] = f"Bearer {self.hf_token}"
+
+        debuts = list(range(0, len(texts), batch_size))
+        semaphore = asyncio.Semaphore(self.concurrence)
+        connecteur = aiohttp.TCPConnector(limit=self.concurrence, keepalive_timeout=60)
+        pbar = tqdm(total=len(debuts))
+
+        async with aiohttp.ClientSession(
+            connector=connecteur,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as session:
+            async def traiter(debut):
+                async with semaphore:
+                    emb = await self._post(session, texts[debut:debut + batch_size])
+                pbar.update(1)
+                return emb
+
+            resultats = await asyncio.gather(*(traiter(d) for d in debuts))
+        pbar.close()
+
+        return np.vstack(resultats) if resultats else np.empty((0, 0), dtype=np.float32)
+
+    async def _post(self, session, batch: List[str]) -> np.ndarray:
+        """Envoie un batch avec retries; lève ValueError si l'échec est définitif."""
+        import aiohttp
+
+        for tentative in range(self.max_retries + 1):
+            await self.limiteur.acquerir_async()
+            attente = None
+            try:
+                async with session.post(self.endpoint_url, json={"inputs": batch}) as resp:
+                    if resp.status == 200:
+                        data = await resp.json()
+                        return np.asarray(data['embeddings'], dtype=np.float32)
+                    texte = await resp.text()
+                    if resp.status not in CODES_RETRY or tentative == self.max_retries:
+                        raise ValueError(f"Erreur {resp.status}: {texte}")
+                    attente = _delai_retry_after(resp.headers.get('Retry-After'))
+                    if attente is not None:
+                        # Le serveur demande une pause: elle vaut pour toutes les requêtes
+                        self.limiteur.penaliser(attente)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if tentative == self.max_retries:
+                    raise ValueError(f"Erreur réseau après {tentative + 1} tentatives: {e}")
+
+            if attente is None:
+                attente = self.backoff_base * 2 ** tentative * (0.5 + random.random())
+            await asyncio.sleep(attente)
+
+        raise ValueError("Échec après retries")  # pragma: no cover
+
+
+# ============================================================================
+# SERVEUR FACTICE (vérification locale)
+# ============================================================================
+
+def lancer_serveur_factice(dim: int = 8, taux_429: float = 0.2):
+    """Démarre un endpoint factice sur localhost dans un thread.
+
+    Renvoie {"embeddings": [...]} avec des vecteurs déterministes dérivés du
+    texte, et répond aléatoirement 429 + Retry-After pour tester les retries.
+
+    Returns:
+        (serveur, url)
+    """
+    import hashlib
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            corps = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if random.random() < taux_429:
+                self._repondre(429, b'{"error": "rate limited"}', {'Retry-After': '0.05'})
+                return
+            inputs = json.loads(corps)['inputs']
+            embeddings = [vecteur_factice(t, dim) for t in inputs]
+            self._repondre(200, json.dumps({'embeddings': embeddings}).encode())
+
+        def _repondre(self, code, corps, extra=None):
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corps)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, *args):
+            pass
+
+    def vecteur_factice(texte, dim):
+        graine = int.from_bytes(hashlib.sha1(texte.encode('utf-8')).digest()[:4], 'little')
+        return np.random.default_rng(graine).normal(size=dim).round(6).tolist()
+
+    serveur = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    serveur.vecteur_factice = vecteur_factice
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}/embed"
+
+
+if __name__ == "__main__":
+    import time
+
+    serveur, url = lancer_serveur_factice(dim=8, taux_429=0.2)
+    textes = [f"offre {i}" for i in range(500)]
+
+    client = ClientEmbeddingsHF(url, concurrence=16, requetes_par_seconde=200.0,
+                                backoff_base=0.05)
+    debut = time.time()
+    emb = client.encoder(textes, batch_size=8)
+    attendu = np.array([serveur.vecteur_factice(t, 8) for t in textes], dtype=np.float32)
+
+    print(f"✅ {len(textes)} textes encodés en {time.time() - debut:.2f}s")
+    print(f"   Ordre préservé: {np.allclose(emb, attendu)}")
+    serveur.shutdown()
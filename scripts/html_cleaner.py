@@ -0,0 +1,315 @@
+"""Nettoyage rapide des descriptions d'offres (HTML → texte, section missions).
+
+Remplace BeautifulSoup dans GoogleJobsCollector._nettoyer_description:
+- le HTML est parcouru en flux (html.parser) sans construire d'arbre: seuls
+  les morceaux de texte sont accumulés, avec les mêmes règles que
+  BeautifulSoup(…, 'html.parser').get_text(separator='\\n') (entités,
+  espaces, contenus script/style/template ignorés, CDATA conservé);
+- le début de la section missions est trouvé en une passe (Aho-Corasick si
+  pyahocorasick est installé, sinon une alternance regex précompilée) au
+  lieu d'un test par mot-clé et par ligne;
+- nettoyer_lot nettoie un lot de descriptions, sur un pool de processus
+  seulement si on le demande (n_processus > 1): le nettoyage d'une
+  description coûte ~80 µs, si bien que le démarrage du pool et l'envoi
+  des textes ne sont amortis que sur plusieurs cœurs et de gros lots.
+
+Exécuter ce module vérifie l'équivalence avec l'ancien nettoyeur sur le
+corpus de référence data/fixtures/descriptions_html.jsonl:
+    python scripts/html_cleaner.py
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional
+
+try:
+    import ahocorasick
+except ImportError:
+    # pyahocorasick optionnel: alternance regex (également en une passe)
+    ahocorasick = None
+
+MOTS_CLES_SECTION = (
+    'missions', 'responsabilités', 'responsabilities',
+    'your role', 'you will', 'aufgaben', '業務内容',
+    'what you\'ll do', 'your responsibilities', 'vos missions'
+)
+MAX_LIGNES_SECTION = 40
+
+FIXTURE_PATH = 'data/fixtures/descriptions_html.jsonl'
+
+_LIGNES_VIDES = re.compile(r'\n\s*\n')
+_ESPACES_ASCII = frozenset(' \n\t\x0c\r')
+
+# Entités nommées telles que résolues par BeautifulSoup (sans le ';' final)
+_ENTITES = {nom.rstrip(';'): car for nom, car in html5.items()}
+_REF_DECIMALE = re.compile(r'^([0-9]+)(.*)')
+_REF_HEXA = re.compile(r'^([0-9a-f]+)(.*)')
+
+# Balises sans fermeture, à texte préservé, et dont le texte est exclu de get_text
+_BALISES_VIDES = frozenset((
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame',
+    'hr', 'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta',
+    'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+))
+_BALISES_PRESERVEES = frozenset(('pre', 'textarea'))
+_BALISES_CONTENEURS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+
+def _caractere_numerique(n: int) -> str:
+    """Référence numérique → caractère (algorithme HTML5, comme UnicodeDammit)."""
+    if n == 0 or n > 0x10FFFF or 0xD800 <= n <= 0xDFFF:
+        return '\ufffd'
+    if 0x80 <= n <= 0x9F:
+        # Références encodées en windows-1252 au lieu d'Unicode
+        try:
+            return bytes([n]).decode('cp1252')
+        except UnicodeDecodeError:
+            pass
+    return chr(n)
+
+
+class _ExtracteurTexte(HTMLParser):
+    """Accumule les morceaux de texte d'un document HTML, sans arbre.
+
+    Reproduit la segmentation de BeautifulSoup: les données consécutives
+    forment un seul morceau, clos par toute balise, commentaire ou
+    déclaration; un morceau fait uniquement d'espaces ASCII devient '\\n'
+    (ou ' ') hors <pre>/<textarea>.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.morceaux = []
+        self._donnees = []
+        self._pile = []            # noms des balises ouvertes
+        self._preservees = []      # positions dans _pile des <pre>/<textarea> ouverts
+        self._conteneurs = []      # positions dans _pile des script/style/template/rt/rp
+        self._vides_fermees = []   # balises vides déjà fermées (</br> redondant ignoré)
+
+    def _fin_donnees(self, cdata: bool = False):
+        if not self._donnees:
+            return
+        texte = ''.join(self._donnees)
+        self._donnees = []
+        if not self._preservees and all(c in _ESPACES_ASCII for c in texte):
+            texte = '\n' if '\n' in texte else ' '
+        if cdata or not self._conteneurs:
+            self.morceaux.append(texte)
+
+    def _ouvrir(self, balise: str):
+        if balise in _BALISES_PRESERVEES:
+            self._preservees.append(len(self._pile))
+        if balise in _BALISES_CONTENEURS:
+            self._conteneurs.append(len(self._pile))
+        self._pile.append(balise)
+
+    def _fermer(self, balise: str):
+        """Ferme la dernière balise `balise` ouverte et tout ce qu'elle contient."""
+        if balise not in self._pile:
+            return
+        while self._pile:
+            position = len(self._pile) - 1
+            ouverte = self._pile.pop()
+            if self._preservees and self._preservees[-1] == position:
+                self._preservees.pop()
+            if self._conteneurs and self._conteneurs[-1] == position:
+                self._conteneurs.pop()
+            if ouverte == balise:
+                break
+
+    def handle_starttag(self, tag, attrs):
+        self._fin_donnees()
+        self._ouvrir(tag)
+        if tag in _BALISES_VIDES:
+            self._fermer(tag)
+            self._vides_fermees.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._fin_donnees()
+        self._ouvrir(tag)
+        self._fermer(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._vides_fermees:
+            self._vides_fermees.remove(tag)
+            return
+        self._fin_donnees()
+        self._fermer(tag)
+
+    def handle_data(self, data):
+        self._donnees.append(data)
+
+    def handle_entityref(self, name):
+        self._donnees.append(_ENTITES.get(name, '&' + name))
+
+    def handle_charref(self, name):
+        base, motif = 10, _REF_DECIMALE
+        if name[:1] in ('x', 'X'):
+            name, base, motif = name[1:], 16, _REF_HEXA
+        try:
+            self._donnees.append(_caractere_numerique(int(name, base)))
+            self._donnees.append('')
+            return
+        except ValueError:
+            pass
+        match = motif.search(name)
+        if match is None:
+            self._donnees.extend(('', name))
+        else:
+            self._donnees.extend((_caractere_numerique(int(match.group(1), base)), match.group(2)))
+
+    def unknown_decl(self, data):
+        self._fin_donnees()
+        if data.upper().startswith('CDATA['):
+            self._donnees.append(data[len('CDATA['):])
+            self._fin_donnees(cdata=True)
+
+    def handle_comment(self, data):
+        self._fin_donnees()
+
+    def handle_decl(self, decl):
+        self._fin_donnees()
+
+    def handle_pi(self, data):
+        self._fin_donnees()
+
+    def texte(self, separateur: str = '\n') -> str:
+        self._fin_donnees()
+        return separateur.join(self.morceaux)
+
+
+def html_vers_texte(html: str, separateur: str = '\n') -> str:
+    """Équivalent de BeautifulSoup(html, 'html.parser').get_text(separator=separateur)."""
+    if '<' not in html and '&' not in html:
+        # Aucun balisage: un seul morceau de texte
+        if not html:
+            return ''
+        if all(c in _ESPACES_ASCII for c in html):
+            return '\n' if '\n' in html else ' '
+        return html
+    extracteur = _ExtracteurTexte()
+    extracteur.feed(html)
+    extracteur.close()
+    return extracteur.texte(separateur)
+
+
+def _compiler_recherche(mots_cles):
+    """Renvoie une fonction texte_minuscule → position du premier mot-clé (ou -1)."""
+    if ahocorasick is not None:
+        automate = ahocorasick.Automaton()
+        for mot in mots_cles:
+            automate.add_word(mot, len(mot))
+        automate.make_automaton()
+
+        def chercher(texte):
+            # Les correspondances sortent par position de fin croissante;
+            # les mots-clés ne contenant pas de '\n', la première est sur la
+            # première ligne qui en contient un.
+            for fin, longueur in automate.iter(texte):
+                return fin - longueur + 1
+            return -1
+        return chercher
+
+    motif = re.compile('|'.join(re.escape(m) for m in sorted(mots_cles, key=len, reverse=True)))
+
+    def chercher(texte):
+        match = motif.search(texte)
+        return match.start() if match else -1
+    return chercher
+
+
+_chercher_section = _compiler_recherche(MOTS_CLES_SECTION)
+
+
+def extraire_section(texte: str, max_lignes: int = MAX_LIGNES_SECTION) -> str:
+    """Garde `max_lignes` lignes à partir de la première ligne contenant un mot-clé."""
+    position = _chercher_section(texte.lower())
+    if position == -1:
+        return texte
+    # lower() ne crée ni ne supprime de '\n': le numéro de ligne est le même
+    debut = texte.lower().count('\n', 0, position)
+    return '\n'.join(texte.split('\n')[debut:debut + max_lignes])
+
+
+def nettoyer_description(description: str) -> str:
+    """Nettoie la description (enlève HTML, garde uniquement les missions)."""
+    text = html_vers_texte(description)
+    text = _LIGNES_VIDES.sub('\n\n', text)
+    return extraire_section(text).strip()
+
+
+def nettoyer_lot(descriptions: Iterable[str],
+                 n_processus: Optional[int] = 1,
+                 chunksize: int = 256) -> List[str]:
+    """Nettoie un lot de descriptions, en parallèle au-delà de quelques chunks.
+
+    Args:
+        descriptions: Descriptions HTML brutes
+        n_processus: Taille du pool (1 = séquentiel, None = nombre de CPU).
+            Séquentiel par défaut: sur une machine à un cœur, le pool ne
+            fait que s'ajouter au coût (mesuré par `python scripts/html_cleaner.py`)
+        chunksize: Descriptions envoyées par tâche au pool
+
+    Returns:
+        Descriptions nettoyées, dans l'ordre
+    """
+    descriptions = list(descriptions)
+    if n_processus == 1 or len(descriptions) <= 2 * chunksize:
+        return [nettoyer_description(d) for d in descriptions]
+    with ProcessPoolExecutor(max_workers=n_processus) as pool:
+        return list(pool.map(nettoyer_description, descriptions, chunksize=chunksize))
+
+
+def nettoyer_description_bs4(description: str) -> str:
+    """Ancien nettoyeur (BeautifulSoup), gardé comme référence."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(description, 'html.parser')
+    text = soup.get_text(separator='\n')
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    lines = text.split('\n')
+    mission_start = -1
+    for i, line in enumerate(lines):
+        if any(kw in line.lower() for kw in MOTS_CLES_SECTION):
+            mission_start = i
+            break
+    if mission_start > -1:
+        text = '\n'.join(lines[mission_start:mission_start + MAX_LIGNES_SECTION])
+    return text.strip()
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        fixtures = [json.loads(ligne) for ligne in f if ligne.strip()]
+
+    ecarts = [fx['id'] for fx in fixtures if nettoyer_description(fx['html']) != fx['attendu']]
+    print(f"{'✅' if not ecarts else '❌'} {len(fixtures) - len(ecarts)}/{len(fixtures)} descriptions identiques à l'ancien nettoyeur")
+    for id_ in ecarts:
+        print(f"   Écart: {id_}")
+
+    # Débit sur le corpus de référence répété
+    lot = [fx['html'] for fx in fixtures] * 200
+    debut = time.time()
+    nettoyer_lot(lot, n_processus=1)
+    duree = time.time() - debut
+    print(f"   html_cleaner: {len(lot) / duree:,.0f} descriptions/s (1 processus)")
+    n_cpu = os.cpu_count() or 1
+    if n_cpu > 1:
+        debut = time.time()
+        nettoyer_lot(lot, n_processus=n_cpu)
+        print(f"   html_cleaner: {len(lot) / (time.time() - debut):,.0f} descriptions/s ({n_cpu} processus)")
+    try:
+        import warnings
+        warnings.simplefilter('ignore')  # avertissements bs4 (XML, nom de fichier…)
+        debut = time.time()
+        for d in lot:
+            nettoyer_description_bs4(d)
+        print(f"   BeautifulSoup: {len(lot) / (time.time() - debut):,.0f} descriptions/s")
+    except ImportError:
+        pass
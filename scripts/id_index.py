@@ -0,0 +1,58 @@
+"""
+scripts/id_index.py
+
+Persistent set of job ids (SQLite), shared by the corpus store (dedup on
+append) and by the collector (early stop on already-known pages).
+Thread-safe: one connection guarded by a lock.
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Set
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+
+class IdIndex:
+    """Persistent id set with batched membership queries."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY, added REAL)")
+        self._conn.commit()
+
+    def known(self, ids: Iterable[str]) -> Set[str]:
+        """Return the subset of `ids` already in the index."""
+        ids = list(dict.fromkeys(str(i) for i in ids))
+        found = set()
+        with self._lock:
+            for k in range(0, len(ids), _CHUNK):
+                chunk = ids[k:k + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT id FROM ids WHERE id IN ({placeholders})", chunk)
+                found.update(r[0] for r in rows)
+        return found
+
+    def add(self, ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO ids VALUES (?, ?)", ((str(i), now) for i in ids))
+            self._conn.commit()
+
+    def __contains__(self, id_: str) -> bool:
+        return bool(self.known([id_]))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,184 @@
+"""Détection de quasi-doublons (MinHash + LSH) avant le calcul des embeddings.
+
+Google Jobs renvoie souvent la même offre via plusieurs agrégateurs, avec
+un habillage légèrement différent. Chaque texte est réduit à l'ensemble de
+ses k-grammes de caractères (adapté au japonais, sans espaces), résumé par
+une signature MinHash; le LSH par bandes ne compare que les textes qui
+partagent au moins une bande, ce qui évite les N² comparaisons. Les paires
+candidates dont la similarité de Jaccard estimée dépasse le seuil sont
+regroupées en clusters (union-find) et un représentant canonique (le texte
+le plus long) est conservé par cluster.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_PREMIER = np.uint64((1 << 61) - 1)
+_MASQUE32 = np.uint64(0xFFFFFFFF)
+_ESPACES = re.compile(r'\s+')
+
+
+def _normaliser(texte: str) -> str:
+    return _ESPACES.sub(' ', str(texte).lower()).strip()
+
+
+def _shingles(texte: str, k: int) -> np.ndarray:
+    """Hashs 32 bits (uniques) des k-grammes de caractères d'un texte."""
+    codes = np.frombuffer(_normaliser(texte).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < k:
+        codes = np.pad(codes, (0, k - len(codes)))
+    # Hash polynomial des k-grammes, calculé par décalages (arithmétique modulo 2^64)
+    n = len(codes) - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(k):
+            h = h * np.uint64(1000003) + codes[j:j + n]
+        h = (h * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return np.unique(h)
+
+
+def signatures_minhash(textes: List[str], num_perm: int = 128, k: int = 5,
+                       graine: int = 42) -> np.ndarray:
+    """Signatures MinHash (n_textes × num_perm, uint32)."""
+    rng = np.random.default_rng(graine)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    signatures = np.empty((len(textes), num_perm), dtype=np.uint32)
+    for i, texte in enumerate(textes):
+        h = _shingles(texte, k)[None, :]
+        # (a·h + b) mod (2^61 - 1) ne déborde pas: a, h, b < 2^32
+        signatures[i] = (((a * h + b) % _PREMIER).min(axis=1) & _MASQUE32).astype(np.uint32)
+    return signatures
+
+
+def parametres_lsh(seuil: float, num_perm: int) -> Tuple[int, int]:
+    """(bandes, lignes) minimisant faux positifs + faux négatifs autour du seuil."""
+    s = np.linspace(0, 1, 201)
+    pas = s[1] - s[0]
+    meilleur, erreur_min = (1, num_perm), np.inf
+    for bandes in range(1, num_perm + 1):
+        lignes = num_perm // bandes
+        if lignes == 0:
+            break
+        proba = 1 - (1 - s ** lignes) ** bandes
+        faux_pos = np.where(s < seuil, proba, 0).sum() * pas
+        faux_neg = np.where(s >= seuil, 1 - proba, 0).sum() * pas
+        if faux_pos + faux_neg < erreur_min:
+            meilleur, erreur_min = (bandes, lignes), faux_pos + faux_neg
+    return meilleur
+
+
+def _trouver(parents: np.ndarray, i: int) -> int:
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def detecter_quasi_doublons(textes: List[str],
+                            seuil: float = 0.85,
+                            num_perm: int = 128,
+                            k: int = 5,
+                            taille_max_bucket: int = 200,
+                            graine: int = 42) -> pd.DataFrame:
+    """Regroupe les quasi-doublons d'une liste de textes.
+
+    Args:
+        textes: Textes à comparer
+        seuil: Similarité de Jaccard (k-grammes) à partir de laquelle deux
+            textes sont considérés comme des doublons
+        num_perm: Nombre de permutations MinHash
+        k: Taille des k-grammes de caractères
+        taille_max_bucket: Au-delà, un bucket LSH n'est vérifié que par
+            paires consécutives (évite le quadratique sur les textes vides
+            ou génériques)
+
+    Returns:
+        DataFrame (une ligne par texte, même ordre) avec les colonnes
+        cluster, taille_cluster et canonique
+    """
+    n = len(textes)
+    signatures = signatures_minhash(textes, num_perm, k, graine)
+    bandes, lignes = parametres_lsh(seuil, num_perm)
+    parents = np.arange(n)
+
+    for bande in range(bandes):
+        bloc = np.ascontiguousarray(signatures[:, bande * lignes:(bande + 1) * lignes])
+        cles = bloc.view(np.dtype((np.void, bloc.dtype.itemsize * lignes))).ravel()
+        _, inverse, effectifs = np.unique(cles, return_inverse=True, return_counts=True)
+        ordre = np.argsort(inverse, kind='stable')
+        bornes = np.concatenate([[0], np.cumsum(effectifs)])
+        for g in np.flatnonzero(effectifs > 1):
+            membres = ordre[bornes[g]:bornes[g + 1]]
+            if len(membres) <= taille_max_bucket:
+                paires = [(membres[x], membres[y]) for x in range(len(membres))
+                          for y in range(x + 1, len(membres))]
+            else:
+                paires = list(zip(membres[:-1], membres[1:]))
+            for i, j in paires:
+                ri, rj = _trouver(parents, i), _trouver(parents, j)
+                if ri == rj:
+                    continue
+                if np.mean(signatures[i] == signatures[j]) >= seuil:
+                    parents[max(ri, rj)] = min(ri, rj)
+
+    racines = np.array([_trouver(parents, i) for i in range(n)])
+    _, cluster = np.unique(racines, return_inverse=True)
+    longueurs = np.array([len(str(t)) for t in textes])
+
+    resultat = pd.DataFrame({'cluster': cluster, 'longueur': longueurs})
+    resultat['taille_cluster'] = resultat.groupby('cluster')['cluster'].transform('size')
+    # Représentant canonique: le texte le plus long (le premier en cas d'égalité)
+    canon = resultat.sort_values(['cluster', 'longueur'], ascending=[True, False], kind='stable') \
+        .drop_duplicates('cluster').index
+    resultat['canonique'] = False
+    resultat.loc[canon, 'canonique'] = True
+    return resultat.drop(columns='longueur')
+
+
+def dedoublonner(df: pd.DataFrame,
+                 colonne: str = 'texte_brut',
+                 seuil: float = 0.85,
+                 masque: pd.Series = None,
+                 par: Optional[str] = None,
+                 **kwargs) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Ne garde qu'un représentant par cluster de quasi-doublons.
+
+    Args:
+        df: Corpus (colonne texte `colonne`, par ex. texte_brut ou description)
+        masque: Lignes soumises au dédoublonnage (par défaut toutes); les
+            autres sont toujours conservées
+        par: Colonne de regroupement (par ex. 'pays'): les clusters ne
+            mélangent jamais deux valeurs de cette colonne
+        **kwargs: Paramètres de detecter_quasi_doublons
+
+    Returns:
+        (corpus dédoublonné, table des clusters alignée sur df)
+    """
+    if masque is None:
+        masque = pd.Series(True, index=df.index)
+    cibles = df.index[masque.values]
+
+    clusters = pd.DataFrame({'cluster': -1, 'taille_cluster': 1, 'canonique': True}, index=df.index)
+    if par is None:
+        lots = [cibles] if len(cibles) > 0 else []
+    else:
+        lots = [lot.index for _, lot in df.loc[cibles].groupby(par, sort=True, dropna=False)]
+    decalage = 0
+    for lot in lots:
+        res = detecter_quasi_doublons(df.loc[lot, colonne].fillna('').tolist(), seuil=seuil, **kwargs)
+        res.index = lot
+        # Numéros de cluster uniques sur l'ensemble des lots
+        res['cluster'] += decalage
+        decalage = int(res['cluster'].max()) + 1
+        clusters.loc[lot, ['cluster', 'taille_cluster', 'canonique']] = res[['cluster', 'taille_cluster', 'canonique']]
+
+    n_retires = int((~clusters['canonique'].astype(bool)).sum())
+    n_clusters = clusters.loc[clusters['taille_cluster'] > 1, 'cluster'].nunique()
+    print(f"🔍 Quasi-doublons (Jaccard ≥ {seuil}): {n_retires} textes retirés, {n_clusters} clusters")
+
+    return df[clusters['canonique'].astype(bool).values].reset_index(drop=True), clusters
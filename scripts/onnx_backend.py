@@ -0,0 +1,248 @@
+"""Backend ONNX Runtime (optionnellement quantifié int8) pour les workers CPU.
+
+Le modèle sentence-transformers est exporté une fois en ONNX dans
+embeddings/onnx/<modèle>@<révision>/, puis quantifié dynamiquement en int8
+(poids int8, activations quantifiées à la volée) pour le jeu d'instructions
+du CPU (avx512_vnni, avx512, avx2 ou arm64). Les exécutions suivantes
+rechargent directement l'artefact. Le modèle renvoyé reste un
+SentenceTransformer (même tokenizer, même pooling, même `encode`): le
+batching par budget et le découpage en fenêtres fonctionnent à l'identique.
+
+Dépendances (onnxruntime, optimum, sentence-transformers ≥ 3.2):
+    pip install -r requirements-onnx.txt
+
+Rapport de précision (vecteurs ONNX vs PyTorch sur le corpus, et effet sur
+le classement des pays de `analyser_distance_scrum_guide`):
+    python scripts/onnx_backend.py --backend onnx-int8 --echantillon 2000
+"""
+
+import argparse
+import contextlib
+import os
+import platform
+import runpy
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ONNX_DIR = 'embeddings/onnx'
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def config_quantification() -> str:
+    """Configuration de quantification adaptée au CPU courant."""
+    if platform.machine().lower() in ('arm64', 'aarch64'):
+        return 'arm64'
+    try:
+        drapeaux = Path('/proc/cpuinfo').read_text().split()
+    except OSError:
+        return 'avx2'
+    if 'avx512_vnni' in drapeaux:
+        return 'avx512_vnni'
+    if 'avx512f' in drapeaux:
+        return 'avx512'
+    return 'avx2'
+
+
+def dossier_export(model_name: str,
+                   revision: Optional[str] = None,
+                   onnx_dir: str = DEFAULT_ONNX_DIR) -> Path:
+    return Path(onnx_dir) / f"{model_name.replace('/', '--')}@{revision or 'main'}"
+
+
+def _fichier_onnx(dossier: Path, nom: str) -> Optional[str]:
+    """Chemin (relatif au dossier) d'un fichier ONNX exporté, ou None."""
+    trouves = sorted(dossier.glob(f'**/{nom}'))
+    return str(trouves[0].relative_to(dossier)) if trouves else None
+
+
+def preparer_export(model_name: str,
+                    revision: Optional[str] = None,
+                    quantifier: bool = True,
+                    onnx_dir: str = DEFAULT_ONNX_DIR) -> Tuple[Path, str]:
+    """Exporte (une seule fois) le modèle en ONNX, puis en int8 si demandé.
+
+    Returns:
+        (dossier du modèle exporté, fichier ONNX à charger relatif au dossier)
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError(
+            "sentence-transformers non installé. "
+            "Exécutez: pip install -r requirements-onnx.txt"
+        )
+
+    dossier = dossier_export(model_name, revision, onnx_dir)
+    modele = None
+    if _fichier_onnx(dossier, 'model.onnx') is None:
+        print(f"🔄 Export ONNX de {model_name} → {dossier}")
+        tmp = dossier.with_name(dossier.name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        modele = SentenceTransformer(model_name, revision=revision, backend='onnx', device='cpu')
+        modele.save_pretrained(str(tmp))
+        shutil.rmtree(dossier, ignore_errors=True)
+        os.replace(tmp, dossier)
+    fichier = _fichier_onnx(dossier, 'model.onnx')
+
+    if quantifier:
+        config = config_quantification()
+        nom_int8 = f'model_qint8_{config}.onnx'
+        if _fichier_onnx(dossier, nom_int8) is None:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"🔄 Quantification int8 dynamique ({config})...")
+            if modele is None:
+                modele = SentenceTransformer(str(dossier), backend='onnx', device='cpu',
+                                             model_kwargs={'file_name': fichier})
+            export_dynamic_quantized_onnx_model(modele, config, str(dossier))
+        fichier = _fichier_onnx(dossier, nom_int8)
+    return dossier, fichier
+
+
+def options_session(threads: Optional[int] = None):
+    """Options ONNX Runtime: threads intra-op fixés, graphe optimisé."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads or os.cpu_count() or 1
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def charger_modele_onnx(model_name: str,
+                        revision: Optional[str] = None,
+                        quantifier: bool = True,
+                        onnx_dir: str = DEFAULT_ONNX_DIR,
+                        threads: Optional[int] = None):
+    """SentenceTransformer servi par ONNX Runtime sur CPU (export au premier appel)."""
+    from sentence_transformers import SentenceTransformer
+
+    dossier, fichier = preparer_export(model_name, revision, quantifier, onnx_dir)
+    print(f"🔄 Chargement ONNX {dossier / fichier}")
+    return SentenceTransformer(
+        str(dossier), backend='onnx', device='cpu',
+        model_kwargs={'file_name': fichier,
+                      'provider': 'CPUExecutionProvider',
+                      'session_options': options_session(threads)}
+    )
+
+
+# ============================================================================
+# RAPPORT DE PRÉCISION
+# ============================================================================
+
+def accord_cosinus(reference: np.ndarray, candidat: np.ndarray) -> np.ndarray:
+    """Cosinus, texte par texte, entre deux jeux de vecteurs alignés."""
+    produits = np.einsum('ij,ij->i', reference, candidat)
+    normes = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidat, axis=1)
+    return produits / np.maximum(normes, 1e-12)
+
+
+@contextlib.contextmanager
+def repertoire_temporaire():
+    """Exécute dans un dossier jetable (analyser_distance_scrum_guide écrit dans results/)."""
+    origine = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, 'results').mkdir()
+        os.chdir(tmp)
+        try:
+            yield
+        finally:
+            os.chdir(origine)
+
+
+def comparer_classements(reference: np.ndarray,
+                         candidat: np.ndarray,
+                         metadata: pd.DataFrame) -> pd.DataFrame:
+    """Distances au Scrum Guide par pays avec chaque jeu de vecteurs.
+
+    Returns:
+        DataFrame pays, similarite_reference, similarite_candidat, ecart,
+        rang_reference, rang_candidat (rang 1 = le plus proche)
+    """
+    module = runpy.run_path(str(Path(__file__).with_name('03_analyze.py')), run_name='03_analyze')
+    resultats = {}
+    with repertoire_temporaire():
+        for nom, embeddings in (('reference', reference), ('candidat', candidat)):
+            analyseur = module['AnalyseurSemantique']()
+            analyseur.embeddings = embeddings
+            analyseur.metadata = metadata.reset_index(drop=True)
+            distances = analyseur.analyser_distance_scrum_guide()
+            if distances is None:
+                return pd.DataFrame()
+            resultats[nom] = distances.set_index('pays')['similarite_moyenne']
+
+    table = pd.DataFrame({'similarite_reference': resultats['reference'],
+                          'similarite_candidat': resultats['candidat']})
+    table['ecart'] = table['similarite_candidat'] - table['similarite_reference']
+    table['rang_reference'] = table['similarite_reference'].rank(ascending=False, method='min').astype(int)
+    table['rang_candidat'] = table['similarite_candidat'].rank(ascending=False, method='min').astype(int)
+    return table.reset_index()
+
+
+def rapport_precision(reference: np.ndarray,
+                      candidat: np.ndarray,
+                      metadata: pd.DataFrame,
+                      output_path: str = 'results/precision_onnx.csv') -> pd.DataFrame:
+    """Affiche l'accord cosinus et les changements de classement, écrit le tableau par pays."""
+    accord = accord_cosinus(reference, candidat)
+    print("\n📏 Accord cosinus ONNX vs PyTorch (par texte):")
+    print(f"   moyenne {accord.mean():.5f}, min {accord.min():.5f}, "
+          f"p1 {np.percentile(accord, 1):.5f}, p50 {np.median(accord):.5f}")
+    print(f"   {(accord < 0.99).sum()}/{len(accord)} textes sous 0.99")
+
+    table = comparer_classements(reference, candidat, metadata)
+    if table.empty:
+        return table
+    par_pays = pd.Series(accord, index=metadata.index).groupby(metadata['pays']).mean()
+    table['accord_cosinus_moyen'] = table['pays'].map(par_pays)
+
+    changes = int((table['rang_reference'] != table['rang_candidat']).sum())
+    print("\n🏁 Classement des pays (distance au Scrum Guide):")
+    print(table.round(4).to_string(index=False))
+    print(f"   {changes} pays changent de rang, écart max {table['ecart'].abs().max():.4f}")
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output_path, index=False)
+    print(f"✅ Rapport sauvegardé: {output_path}")
+    return table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare les embeddings ONNX Runtime et PyTorch sur le corpus.")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx-int8", help="Backend évalué (défaut: onnx-int8).")
+    parser.add_argument("--corpus", default="data/corpus.csv", help="Corpus consolidé.")
+    parser.add_argument("--echantillon", type=int, default=None, help="Nombre de textes tirés au hasard (défaut: tout le corpus).")
+    parser.add_argument("--output", default="results/precision_onnx.csv", help="Tableau par pays.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    module = runpy.run_path(str(Path(__file__).with_name('02_embed.py')), run_name='02_embed')
+    EmbeddingCalculator = module['EmbeddingCalculator']
+
+    df = pd.read_csv(args.corpus)
+    if args.echantillon and args.echantillon < len(df):
+        # Le Scrum Guide (référence des distances) est toujours gardé
+        scrum_guide = df['source'].str.contains('Scrum Guide', na=False)
+        df = pd.concat([df[scrum_guide],
+                        df[~scrum_guide].sample(args.echantillon, random_state=0)])
+    df = df.reset_index(drop=True)
+    texts = df['texte_brut'].fillna('').astype(str).tolist()
+
+    # Même cache pour les deux backends: la référence PyTorch est souvent déjà calculée
+    reference = EmbeddingCalculator(backend='torch').calculer_embeddings_local(texts)
+    candidat = EmbeddingCalculator(backend=args.backend).calculer_embeddings_local(texts)
+    rapport_precision(reference, candidat, df[['id', 'pays', 'source']], args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Orchestrateur incrémental: collecte → consolidation → embeddings → analyse.
+
+Chaque étape déclare ses entrées (données et code) et ses sorties. Avant
+d'exécuter une étape, ses entrées sont résumées par une empreinte de contenu
+(blake2b des fichiers, répertoires parcourus récursivement); l'étape n'est
+relancée que si cette empreinte diffère de celle de sa dernière exécution
+réussie, ou si une sortie manque ou a été modifiée depuis. Les dépendances
+se déduisent des chemins: une étape dépend de celles qui produisent ses
+entrées. Les étapes indépendantes (matrice, distances, tests, UMAP)
+tournent en parallèle dans un pool de processus, sauf les étapes
+exclusives (rééchantillonnage sur tous les cœurs), lancées seules.
+
+L'état est conservé dans results/.pipeline_state.json (empreintes par
+étape et hashs de fichiers, réutilisés tant que taille et mtime sont
+inchangés).
+
+Usage:
+    python scripts/pipeline.py                # toutes les étapes périmées
+    python scripts/pipeline.py --liste        # état de chaque étape
+    python scripts/pipeline.py umap rapport   # ces étapes (et leurs dépendances)
+    python scripts/pipeline.py collecte       # la collecte (réseau, quota) ne tourne que si demandée, et toujours alors
+    python scripts/pipeline.py --force tests  # relancer même si à jour
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import runpy
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+RACINE = Path(__file__).resolve().parent.parent
+CHEMIN_ETAT = 'results/.pipeline_state.json'
+
+# Fichiers transitoires ignorés dans les répertoires (écritures atomiques, WAL SQLite)
+_SUFFIXES_IGNORES = ('-wal', '-shm', '.tmp')
+
+
+# ============================================================================
+# FONCTIONS D'ÉTAPES (exécutées dans les processus du pool)
+# ============================================================================
+
+def lancer_script(script: str, *args: str):
+    """Exécute un script du dépôt comme `python script args`."""
+    sys.argv = [script, *args]
+    runpy.run_path(script, run_name='__main__')
+
+
+def lancer_analyse(methode: str, options: Optional[Dict] = None):
+    """Exécute une méthode de AnalyseurSemantique sur les embeddings courants.
+
+    Args:
+        options: Arguments nommés de la méthode (font partie de l'empreinte)
+    """
+    module = runpy.run_path('scripts/03_analyze.py', run_name='pipeline')
+    analyseur = module['AnalyseurSemantique']()
+    analyseur.charger_donnees(
+        emb_path='embeddings/embeddings_bge_m3.npy',
+        meta_path='embeddings/metadata.csv'
+    )
+    getattr(analyseur, methode)(**(options or {}))
+
+
+def _executer(fonction: Callable, args: Tuple) -> float:
+    debut = time.time()
+    fonction(*args)
+    return time.time() - debut
+
+
+# ============================================================================
+# EMPREINTES
+# ============================================================================
+
+def _hash_contenu(chemin: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+class Etape:
+    """Une étape du pipeline: une fonction, ses entrées et ses sorties."""
+
+    def __init__(self,
+                 nom: str,
+                 fonction: Callable,
+                 args: Sequence = (),
+                 entrees: Sequence[str] = (),
+                 sorties: Sequence[str] = (),
+                 manuelle: bool = False,
+                 exclusive: bool = False,
+                 description: str = ''):
+        """
+        Args:
+            nom: Nom utilisé en ligne de commande
+            fonction: Fonction de niveau module (picklable), appelée avec *args
+            entrees: Fichiers ou répertoires lus (données et code)
+            sorties: Fichiers ou répertoires écrits
+            manuelle: Ne tourne que si demandée explicitement (ex: collecte réseau),
+                et alors à chaque fois: ses sources externes ne sont pas empreintables
+            exclusive: Ne tourne qu'avec aucune autre étape en cours (elle
+                ouvre son propre pool sur tous les cœurs)
+        """
+        self.nom = nom
+        self.fonction = fonction
+        self.args = tuple(args)
+        self.entrees = list(entrees)
+        self.sorties = list(sorties)
+        self.manuelle = manuelle
+        self.exclusive = exclusive
+        self.description = description
+
+
+class Pipeline:
+    """Graphe d'étapes avec exécution incrémentale et parallèle."""
+
+    def __init__(self, chemin_etat: str = CHEMIN_ETAT):
+        self.etapes: Dict[str, Etape] = {}
+        self.chemin_etat = Path(chemin_etat)
+        self.etat = {'etapes': {}, 'fichiers': {}}
+        if self.chemin_etat.exists():
+            self.etat = json.loads(self.chemin_etat.read_text(encoding='utf-8'))
+
+    def ajouter(self, etape: Etape) -> 'Pipeline':
+        if etape.nom in self.etapes:
+            raise ValueError(f"Étape déjà définie: {etape.nom}")
+        self.etapes[etape.nom] = etape
+        return self
+
+    def dependances(self, nom: str) -> List[str]:
+        """Étapes dont une sortie est, contient ou est contenue dans une entrée de `nom`."""
+        entrees = [Path(e) for e in self.etapes[nom].entrees]
+        deps = []
+        for autre in self.etapes.values():
+            if autre.nom == nom:
+                continue
+            sorties = [Path(s) for s in autre.sorties]
+            if any(e == s or s in e.parents or e in s.parents for e in entrees for s in sorties):
+                deps.append(autre.nom)
+        return deps
+
+    def ordre_topologique(self) -> List[str]:
+        ordre, visites, en_cours = [], set(), set()
+
+        def visiter(nom):
+            if nom in visites:
+                return
+            if nom in en_cours:
+                raise ValueError(f"Cycle dans le pipeline autour de {nom}")
+            en_cours.add(nom)
+            for dep in self.dependances(nom):
+                visiter(dep)
+            en_cours.discard(nom)
+            visites.add(nom)
+            ordre.append(nom)
+
+        for nom in self.etapes:
+            visiter(nom)
+        return ordre
+
+    def _hash_fichier(self, chemin: Path) -> str:
+        """Hash de contenu, réutilisé tant que taille et mtime sont inchangés."""
+        st = chemin.stat()
+        cle = str(chemin)
+        connu = self.etat['fichiers'].get(cle)
+        if connu and connu[0] == st.st_size and connu[1] == st.st_mtime_ns:
+            return connu[2]
+        h = _hash_contenu(chemin)
+        self.etat['fichiers'][cle] = [st.st_size, st.st_mtime_ns, h]
+        return h
+
+    def hash_chemin(self, chemin: str) -> Optional[str]:
+        """Hash d'un fichier, ou d'un répertoire (chemins relatifs + contenus); None si absent."""
+        p = Path(chemin)
+        if p.is_file():
+            return self._hash_fichier(p)
+        if not p.is_dir():
+            return None
+        h = hashlib.blake2b(digest_size=16)
+        for racine, dossiers, fichiers in os.walk(p):
+            dossiers[:] = sorted(d for d in dossiers if not d.startswith('.'))
+            for nom in sorted(fichiers):
+                if nom.startswith('.') or nom.endswith(_SUFFIXES_IGNORES):
+                    continue
+                f = Path(racine) / nom
+                h.update(f"{f.relative_to(p).as_posix()}\0{self._hash_fichier(f)}\n".encode('utf-8'))
+        return h.hexdigest()
+
+    def empreinte(self, nom: str) -> str:
+        etape = self.etapes[nom]
+        contenu = {
+            'fonction': etape.fonction.__name__,
+            'args': [str(a) for a in etape.args],
+            'entrees': {e: self.hash_chemin(e) for e in etape.entrees},
+        }
+        return hashlib.blake2b(json.dumps(contenu, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+    def est_a_jour(self, nom: str, empreinte: Optional[str] = None) -> bool:
+        """Même empreinte d'entrées que la dernière exécution et sorties intactes."""
+        precedent = self.etat['etapes'].get(nom)
+        if not precedent:
+            return False
+        if (empreinte or self.empreinte(nom)) != precedent['empreinte']:
+            return False
+        return all(self.hash_chemin(s) == h for s, h in precedent['sorties'].items())
+
+    def _enregistrer(self, nom: str, empreinte: str, duree: float):
+        etape = self.etapes[nom]
+        manquantes = [s for s in etape.sorties if self.hash_chemin(s) is None]
+        if manquantes:
+            raise RuntimeError(f"{nom}: sorties non produites: {', '.join(manquantes)}")
+        self.etat['etapes'][nom] = {
+            'empreinte': empreinte,
+            'sorties': {s: self.hash_chemin(s) for s in etape.sorties},
+            'duree_s': round(duree, 2),
+            'termine': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        self.sauvegarder_etat()
+
+    def sauvegarder_etat(self):
+        """Écrit l'état de façon atomique."""
+        self.chemin_etat.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.chemin_etat.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.etat, indent=1), encoding='utf-8')
+        os.replace(tmp, self.chemin_etat)
+
+    def selection(self, cibles: Optional[Sequence[str]] = None) -> List[str]:
+        """Étapes à considérer: les cibles et leurs ancêtres, en ordre topologique.
+
+        Sans cible, toutes les étapes non manuelles. Une étape manuelle
+        n'est incluse que si elle est nommée explicitement.
+        """
+        inconnues = [c for c in (cibles or []) if c not in self.etapes]
+        if inconnues:
+            raise ValueError(f"Étapes inconnues: {', '.join(inconnues)} (disponibles: {', '.join(self.etapes)})")
+        if not cibles:
+            retenues = {n for n, e in self.etapes.items() if not e.manuelle}
+        else:
+            retenues, pile = set(), list(cibles)
+            while pile:
+                nom = pile.pop()
+                if nom in retenues:
+                    continue
+                retenues.add(nom)
+                pile.extend(self.dependances(nom))
+        return [n for n in self.ordre_topologique()
+                if n in retenues and (not self.etapes[n].manuelle or n in (cibles or []))]
+
+    def executer(self,
+                 cibles: Optional[Sequence[str]] = None,
+                 force: bool = False,
+                 jobs: Optional[int] = None) -> bool:
+        """Exécute les étapes périmées, en parallèle dès que leurs dépendances sont prêtes.
+
+        Returns:
+            True si toutes les étapes sélectionnées sont à jour à la fin
+        """
+        selection = self.selection(cibles)
+        en_attente = list(selection)
+        terminees, echouees = set(), set()
+        en_cours = {}
+
+        print(f"🧩 Pipeline: {len(selection)} étapes ({', '.join(selection)})")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            while en_attente or en_cours:
+                progres = True
+                while progres:
+                    progres = False
+                    for nom in list(en_attente):
+                        deps = [d for d in self.dependances(nom) if d in selection]
+                        if any(d in echouees for d in deps):
+                            print(f"⛔ {nom}: dépendance en échec")
+                            en_attente.remove(nom)
+                            echouees.add(nom)
+                            progres = True
+                        elif all(d in terminees for d in deps):
+                            if en_cours and (self.etapes[nom].exclusive or
+                                             any(self.etapes[n].exclusive for n, _ in en_cours.values())):
+                                continue  # attend que le pool soit libre
+                            en_attente.remove(nom)
+                            progres = True
+                            empreinte = self.empreinte(nom)
+                            # Étape manuelle nommée: toujours relancée (données externes)
+                            demandee = self.etapes[nom].manuelle and nom in (cibles or [])
+                            if not (force or demandee) and self.est_a_jour(nom, empreinte):
+                                print(f"⏭️  {nom}: à jour")
+                                terminees.add(nom)
+                                continue
+                            print(f"▶️  {nom}: lancement")
+                            etape = self.etapes[nom]
+                            en_cours[pool.submit(_executer, etape.fonction, etape.args)] = (nom, empreinte)
+                if not en_cours:
+                    continue
+
+                finies, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in finies:
+                    nom, empreinte = en_cours.pop(future)
+                    try:
+                        duree = future.result()
+                        self._enregistrer(nom, empreinte, duree)
+                        terminees.add(nom)
+                        print(f"✅ {nom}: terminé en {duree:.1f}s")
+                    except BaseException as e:
+                        echouees.add(nom)
+                        print(f"❌ {nom}: {e!r}")
+                        traceback.print_exception(type(e), e, e.__traceback__)
+
+        self.sauvegarder_etat()
+        if echouees:
+            print(f"❌ Étapes en échec: {', '.join(sorted(echouees))}")
+        return not echouees
+
+    def afficher(self):
+        """Affiche l'état de chaque étape (à jour / périmée / jamais exécutée)."""
+        for nom in self.ordre_topologique():
+            etape = self.etapes[nom]
+            if nom not in self.etat['etapes']:
+                statut = "jamais exécutée"
+            else:
+                statut = "à jour" if self.est_a_jour(nom) else "périmée"
+            deps = ', '.join(self.dependances(nom)) or '-'
+            marque = (" (manuelle)" if etape.manuelle else "") + (" (exclusive)" if etape.exclusive else "")
+            print(f"{nom:<14} {statut:<16} ← {deps:<30} {etape.description}{marque}")
+        self.sauvegarder_etat()
+
+
+# ============================================================================
+# DÉFINITION DU PIPELINE
+# ============================================================================
+
+CODE_EMBED = [
+    'scripts/02_embed.py', 'scripts/batch_encoding.py', 'scripts/boilerplate.py',
+    'scripts/compact_embeddings.py', 'scripts/embed_daemon.py', 'scripts/embedding_cache.py',
+    'scripts/hf_client.py', 'scripts/near_duplicates.py', 'scripts/onnx_backend.py',
+    'scripts/rate_limiter.py',
+]
+CODE_COLLECTE = [
+    'scripts/01c_serp_collect.py', 'scripts/blob_store.py', 'scripts/compression.py',
+    'scripts/corpus_store.py', 'scripts/id_index.py', 'scripts/rate_limiter.py', 'scripts/serp_cache.py',
+]
+CODE_CONSOLIDATION = [
+    'scripts/01d_consolidate.py', 'scripts/corpus_store.py', 'scripts/html_cleaner.py', 'scripts/id_index.py',
+]
+CODE_ANALYSE = [
+    'scripts/03_analyze.py', 'scripts/compact_embeddings.py', 'scripts/facet_index.py', 'scripts/resampling.py',
+]
+EMBEDDINGS = ['embeddings/embeddings_bge_m3.npy', 'embeddings/metadata.csv']
+
+
+def construire_pipeline(chemin_etat: str = CHEMIN_ETAT) -> Pipeline:
+    from corpus_store import DEFAULT_STORE_DIR
+
+    pipeline = Pipeline(chemin_etat)
+    pipeline.ajouter(Etape(
+        'collecte', lancer_script, ['scripts/01c_serp_collect.py'],
+        entrees=CODE_COLLECTE, sorties=[DEFAULT_STORE_DIR], manuelle=True,
+        description="Collecte SerpApi → store Parquet"))
+    pipeline.ajouter(Etape(
+        'consolidation', lancer_script, ['scripts/01d_consolidate.py'],
+        entrees=['data/raw', 'data/scrum_guide_reference.csv'] + CODE_CONSOLIDATION,
+        sorties=['data/corpus.csv'],
+        description="Sorties brutes → data/corpus.csv"))
+    pipeline.ajouter(Etape(
+        'embed', lancer_script, ['scripts/02_embed.py'],
+        entrees=['data/corpus.csv'] + CODE_EMBED, sorties=EMBEDDINGS,
+        description="Embeddings BGE-M3"))
+
+    # Les étapes de rééchantillonnage ouvrent un pool sur tous les cœurs: exclusives
+    analyses = [
+        ('matrice', 'calculer_matrice_similarite', 'results/matrice_similarite.csv', "Matrice inter/intra-pays (IC bootstrap)",
+         {'n_bootstrap': 2000}, True),
+        ('cube', 'calculer_cube_similarite', 'results/cube_similarite.csv', "Similarités pays × rôle × type", {}, False),
+        ('distances', 'analyser_distance_scrum_guide', 'results/distances_scrum_guide.csv', "Distance au Scrum Guide (IC bootstrap)",
+         {'n_bootstrap': 2000}, True),
+        ('tests', 'test_statistique_significativite', 'results/tests_statistiques.csv', "Kruskal-Wallis, Mann-Whitney", {}, False),
+        ('permutations', 'test_permutations', 'results/tests_permutations.csv', "Tests par permutation (pays)", {}, True),
+        ('umap', 'visualiser_umap', 'results/clusters_umap.png', "Projection UMAP", {}, False),
+    ]
+    for nom, methode, sortie, description, options, exclusive in analyses:
+        pipeline.ajouter(Etape(
+            nom, lancer_analyse, [methode, options],
+            entrees=EMBEDDINGS + CODE_ANALYSE, sorties=[sortie],
+            exclusive=exclusive, description=description))
+    pipeline.ajouter(Etape(
+        'rapport', lancer_analyse, ['generer_rapport'],
+        entrees=EMBEDDINGS + CODE_ANALYSE + ['results/matrice_similarite.csv',
+                                             'results/distances_scrum_guide.csv', 'results/clusters_umap.png'],
+        sorties=['results/analyse.md'],
+        description="Rapport markdown"))
+    return pipeline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exécute les étapes périmées du pipeline (collecte → consolidation → embeddings → analyse).")
+    parser.add_argument("etapes", nargs="*", help="Étapes cibles (défaut: toutes sauf les manuelles).")
+    parser.add_argument("--force", action="store_true", help="Relancer les étapes sélectionnées même si elles sont à jour.")
+    parser.add_argument("--jobs", type=int, default=None, help="Nombre max d'étapes en parallèle (défaut: nombre de CPU).")
+    parser.add_argument("--liste", action="store_true", help="Afficher l'état des étapes sans rien exécuter.")
+    parser.add_argument("--etat", type=str, default=CHEMIN_ETAT, help=f"Fichier d'état (défaut: {CHEMIN_ETAT}).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Les scripts utilisent des chemins relatifs à la racine du dépôt
+    os.chdir(RACINE)
+    pipeline = construire_pipeline(args.etat)
+    if args.liste:
+        pipeline.afficher()
+        return
+    try:
+        ok = pipeline.executer(args.etapes, force=args.force, jobs=args.jobs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
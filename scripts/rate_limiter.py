@@ -0,0 +1,51 @@
+"""Limiteur de débit (seau à jetons) partagé entre threads et tâches asyncio.
+
+Chaque appel réserve un jeton sous verrou et obtient le délai à attendre;
+l'attente se fait hors verrou (time.sleep ou asyncio.sleep). Les demandes
+sont donc servies dans l'ordre d'arrivée au débit configuré.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class LimiteurDebit:
+    """Seau à jetons: `taux` requêtes/s en régime établi, rafales de `capacite`."""
+
+    def __init__(self, taux: float, capacite: Optional[float] = None):
+        if taux <= 0:
+            raise ValueError(f"Taux invalide: {taux}")
+        self.taux = taux
+        self.capacite = capacite if capacite is not None else max(1.0, taux)
+        self._jetons = self.capacite
+        self._dernier = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def _reserver(self, n: float = 1.0) -> float:
+        """Réserve n jetons et renvoie le délai d'attente (s) avant usage."""
+        with self._verrou:
+            maintenant = time.monotonic()
+            self._jetons = min(self.capacite,
+                               self._jetons + (maintenant - self._dernier) * self.taux)
+            self._dernier = maintenant
+            self._jetons -= n
+            return max(0.0, -self._jetons / self.taux)
+
+    def acquerir(self, n: float = 1.0):
+        """Bloque le thread courant jusqu'à disponibilité de n jetons."""
+        attente = self._reserver(n)
+        if attente > 0:
+            time.sleep(attente)
+
+    async def acquerir_async(self, n: float = 1.0):
+        """Attend (sans bloquer la boucle) la disponibilité de n jetons."""
+        attente = self._reserver(n)
+        if attente > 0:
+            await asyncio.sleep(attente)
+
+    def penaliser(self, secondes: float):
+        """Suspend toutes les réservations pendant `secondes` (ex: Retry-After)."""
+        with self._verrou:
+            self._jetons = min(self._jetons, -secondes * self.taux)
@@ -0,0 +1,417 @@
+"""Rééchantillonnage vectorisé: tests par permutation et intervalles bootstrap par groupe.
+
+Tests par permutation. Sous l'hypothèse nulle, les étiquettes de groupe
+sont échangeables: on les permute au hasard et on recalcule les
+statistiques. Pour un bloc de B permutations, chaque couple (permutation,
+groupe) est une rangée d'une matrice d'appartenance creuse (B·G × N, B·N
+entrées); les sommes par groupe des rangs, des valeurs et des vecteurs
+unitaires en découlent en O(N) / O(N·d) par permutation:
+    - H de Kruskal-Wallis (rangs moyens, correction des ex aequo comme scipy)
+    - différences de moyennes entre paires de groupes
+    - matrice des similarités cosinus moyennes intra/inter-groupes
+p-valeurs: (1 + nb de permutations au moins aussi extrêmes) / (1 + nb de
+permutations); bilatérales pour les différences et la matrice (écart à la
+moyenne sous H0), unilatérale pour H.
+
+Bootstrap. Les textes sont rééchantillonnés avec remise à l'intérieur de
+chaque groupe; un tirage est un vecteur de poids (multiplicités). La
+similarité moyenne entre deux groupes ne dépend que des sommes pondérées
+de vecteurs unitaires, et la moyenne/l'écart-type d'une valeur par texte
+que de ses sommes pondérées (et sommes de carrés): chaque tirage coûte
+O(N·d) au lieu de recalculer O(N²) similarités par paires. Intervalles
+par percentiles.
+
+Les embeddings (float32 ou compacts, voir compact_embeddings.py) ne sont
+ni copiés ni normalisés: la normalisation est portée par les poids 1/||x||
+de la matrice d'appartenance et les formes compactes sont déquantifiées
+bloc par bloc. Les workers lisent les codes dans un segment de mémoire
+partagée. Chaque bloc a son propre générateur, dérivé de la graine par
+np.random.SeedSequence: les résultats ne dépendent pas du nombre de
+processus. Les poids bootstrap ne dépendent que des groupes et de la
+graine: matrice et distances sont calculées sur les mêmes tirages.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+from scipy import sparse
+from scipy.stats import rankdata
+
+from compact_embeddings import EmbeddingsCompacts, normes_carrees, produit_creux
+
+Vecteurs = Union[np.ndarray, EmbeddingsCompacts]
+
+_DONNEES_WORKER = None
+
+
+def _donnees_vecteurs(donnees: Dict, embeddings: Optional[Vecteurs]):
+    """Ajoute les embeddings (tels quels, compacts ou non) et les poids 1/||x|| des lignes."""
+    donnees['vecteurs'] = embeddings
+    donnees['n'] = len(embeddings) if embeddings is not None else 0
+    if embeddings is not None:
+        normes = np.sqrt(normes_carrees(embeddings))[donnees['lignes']]
+        donnees['poids'] = np.divide(1.0, normes, out=np.zeros_like(normes), where=normes > 0)
+        donnees['non_nuls'] = (normes > 0).astype(np.float64)
+
+
+def _sommes_unitaires(donnees: Dict, rangees: np.ndarray, positions: np.ndarray,
+                      multiplicites, n_rangees: int) -> np.ndarray:
+    """Sommes de vecteurs unitaires (n_rangees × d) via une matrice d'appartenance creuse.
+
+    La rangée `rangees[k]` reçoit `multiplicites[k]` fois le vecteur de la
+    ligne `donnees['lignes'][positions[k]]`; la normalisation est portée par
+    les poids 1/||x||, les vecteurs (compacts ou non) ne sont jamais copiés.
+    """
+    appartenance = sparse.csr_matrix(
+        (multiplicites * donnees['poids'][positions], (rangees, donnees['lignes'][positions])),
+        shape=(n_rangees, donnees['n'])
+    )
+    return produit_creux(appartenance, donnees['vecteurs'])
+
+
+def _moyennes_paires(sommes: np.ndarray, diagonale_exclue: np.ndarray, n_paires: np.ndarray) -> np.ndarray:
+    """Similarités moyennes (B, G, G) à partir des sommes par groupe (B, G, d)."""
+    produits = np.einsum('bgd,bhd->bgh', sommes, sommes)
+    diagonale = np.arange(sommes.shape[1])
+    produits[:, diagonale, diagonale] -= diagonale_exclue
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n_paires > 0, produits / n_paires, np.nan)
+
+
+def preparer_donnees(valeurs: np.ndarray,
+                     groupes: np.ndarray,
+                     n_groupes: int,
+                     embeddings: Optional[Vecteurs] = None) -> Dict:
+    """Données permutées: lignes des groupes 0..n_groupes-1 uniquement (-1 = exclue)."""
+    groupes = np.asarray(groupes)
+    lignes = np.flatnonzero(groupes >= 0)
+    valeurs = np.asarray(valeurs, dtype=np.float64)[lignes]
+    n = len(lignes)
+    _, effectifs_ex_aequo = np.unique(valeurs, return_counts=True)
+    donnees = {
+        'lignes': lignes,
+        'groupes': groupes[lignes],
+        'n_groupes': n_groupes,
+        'effectifs': np.bincount(groupes[lignes], minlength=n_groupes),
+        # Sommées par groupe pour chaque permutation: rangs, valeurs
+        'colonnes': np.stack([rankdata(valeurs), valeurs], axis=1),
+        'correction_ex_aequo': 1.0 - (effectifs_ex_aequo ** 3 - effectifs_ex_aequo).sum() / max(n ** 3 - n, 1),
+    }
+    _donnees_vecteurs(donnees, embeddings)
+    return donnees
+
+
+def statistiques(donnees: Dict, etiquettes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Statistiques pour un bloc d'étiquetages (B, n), à partir des sommes par groupe.
+
+    Chaque (permutation, groupe) est une rangée d'une appartenance creuse à
+    B·n entrées: O(n) par permutation pour les rangs et les valeurs, O(n·d)
+    pour les sommes de vecteurs.
+
+    Returns:
+        {'H': (B,), 'differences': (B, nb paires), 'matrice': (B, G, G)}
+    """
+    G = donnees['n_groupes']
+    B, N = etiquettes.shape
+    rangees = (np.arange(B)[:, None] * G + etiquettes).ravel()
+    positions = np.tile(np.arange(N), B)
+    effectifs = donnees['effectifs'].astype(np.float64)
+
+    rangs, totaux = (np.bincount(rangees, weights=donnees['colonnes'][positions, c], minlength=B * G).reshape(B, G)
+                     for c in (0, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        H = (12.0 / (N * (N + 1)) * (rangs ** 2 / effectifs).sum(axis=1) - 3 * (N + 1))
+        H /= donnees['correction_ex_aequo']
+        moyennes = totaux / effectifs
+    paires = list(combinations(range(G), 2))
+    i, j = (np.array(p, dtype=np.int64) for p in zip(*paires)) if paires else (np.empty(0, int),) * 2
+    resultat = {'H': H, 'differences': moyennes[:, i] - moyennes[:, j]}
+
+    if donnees['vecteurs'] is not None:
+        sommes = _sommes_unitaires(donnees, rangees, positions, 1.0, B * G).reshape(B, G, -1)
+        unitaires = np.bincount(rangees, weights=donnees['non_nuls'][positions], minlength=B * G).reshape(B, G)
+        n_paires = np.broadcast_to(np.outer(effectifs, effectifs), (B, G, G)).copy()
+        n_paires[:, np.arange(G), np.arange(G)] = effectifs * (effectifs - 1.0)
+        resultat['matrice'] = _moyennes_paires(sommes, unitaires, n_paires)
+    return resultat
+
+
+# ============================================================================
+# EXÉCUTION PAR BLOCS
+# ============================================================================
+
+def _partager(vecteurs: Vecteurs):
+    """Copie les codes (float32 ou compacts) dans un segment de mémoire partagée.
+
+    Returns:
+        (descripteur picklable, segment à fermer/libérer par l'appelant)
+    """
+    tableau = vecteurs.codes if isinstance(vecteurs, EmbeddingsCompacts) else np.asarray(vecteurs)
+    segment = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+    np.ndarray(tableau.shape, dtype=tableau.dtype, buffer=segment.buf)[:] = tableau
+    descripteur = {
+        'segment': segment.name,
+        'dtype': tableau.dtype.str,
+        'shape': tableau.shape,
+        'meta': vecteurs.meta if isinstance(vecteurs, EmbeddingsCompacts) else None,
+    }
+    return descripteur, segment
+
+
+def _ouvrir(descripteur: Dict):
+    """Vue (sans copie) sur les vecteurs partagés; le segment doit rester référencé."""
+    segment = shared_memory.SharedMemory(name=descripteur['segment'])
+    tableau = np.ndarray(descripteur['shape'], dtype=np.dtype(descripteur['dtype']), buffer=segment.buf)
+    if descripteur['meta'] is not None:
+        return EmbeddingsCompacts(tableau, descripteur['meta']), segment
+    return tableau, segment
+
+
+def _initialiser_worker(donnees: Dict):
+    global _DONNEES_WORKER
+    if donnees.get('vecteurs') is not None:
+        vecteurs, segment = _ouvrir(donnees['vecteurs'])
+        donnees = dict(donnees, vecteurs=vecteurs, _segment=segment)
+    _DONNEES_WORKER = donnees
+
+
+def _bloc_permutations(graine: np.random.SeedSequence, taille: int, donnees: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """Statistiques de `taille` permutations tirées avec le générateur du bloc."""
+    donnees = donnees if donnees is not None else _DONNEES_WORKER
+    rng = np.random.default_rng(graine)
+    etiquettes = rng.permuted(np.broadcast_to(donnees['groupes'], (taille, len(donnees['groupes']))), axis=1)
+    return statistiques(donnees, etiquettes)
+
+
+def _executer_blocs(fonction_bloc: Callable,
+                    donnees: Dict,
+                    n_tirages: int,
+                    octets_par_tirage: int,
+                    taille_bloc: Optional[int] = None,
+                    n_processus: Optional[int] = None,
+                    graine: int = 0) -> Dict[str, np.ndarray]:
+    """Exécute `fonction_bloc(graine du bloc, taille)` par blocs, en parallèle.
+
+    Les workers reçoivent les petits tableaux par pickle et lisent les
+    vecteurs dans un segment de mémoire partagée (une seule copie, quel que
+    soit le nombre de processus).
+
+    Args:
+        octets_par_tirage: Mémoire de travail d'un tirage (taille de bloc
+            par défaut: ~64 Mo par bloc)
+        n_processus: Processus (None = nombre de cœurs, 1 = sans pool)
+
+    Returns:
+        Résultats des blocs concaténés, dans l'ordre des tirages
+    """
+    if taille_bloc is None:
+        taille_bloc = max(1, min(1024, (64 << 20) // max(octets_par_tirage, 1)))
+    tailles = [min(taille_bloc, n_tirages - d) for d in range(0, n_tirages, taille_bloc)]
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+
+    if n_processus is None:
+        n_processus = min(os.cpu_count() or 1, len(tailles))
+    if n_processus <= 1:
+        blocs = [fonction_bloc(g, t, donnees) for g, t in zip(graines, tailles)]
+    else:
+        segment = None
+        donnees_worker = donnees
+        if donnees.get('vecteurs') is not None:
+            descripteur, segment = _partager(donnees['vecteurs'])
+            donnees_worker = dict(donnees, vecteurs=descripteur)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n_processus,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_initialiser_worker,
+                initargs=(donnees_worker,)
+            ) as executor:
+                blocs = list(executor.map(fonction_bloc, graines, tailles,
+                                          chunksize=max(1, math.ceil(len(tailles) / (4 * n_processus)))))
+        finally:
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+    return {cle: np.concatenate([b[cle] for b in blocs]) for cle in blocs[0]}
+
+
+def _p_valeurs(observe: np.ndarray, nulles: np.ndarray, bilateral: bool) -> np.ndarray:
+    """p-valeurs par permutation (Phipson & Smyth: jamais nulles)."""
+    if bilateral:
+        centre = np.nanmean(nulles, axis=0)
+        extremes = np.abs(nulles - centre) >= np.abs(observe - centre) - 1e-12
+    else:
+        extremes = nulles >= observe - 1e-12
+    return (1.0 + extremes.sum(axis=0)) / (1.0 + len(nulles))
+
+
+def _dimension(embeddings: Optional[Vecteurs]) -> int:
+    return embeddings.shape[1] if embeddings is not None else 0
+
+
+def tester_permutations(valeurs: np.ndarray,
+                        groupes: np.ndarray,
+                        n_groupes: int,
+                        embeddings: Optional[Vecteurs] = None,
+                        n_permutations: int = 10_000,
+                        taille_bloc: Optional[int] = None,
+                        n_processus: Optional[int] = None,
+                        graine: int = 0) -> Dict:
+    """Tests par permutation des différences entre groupes.
+
+    Args:
+        valeurs: Valeur par texte (ex. similarité au Scrum Guide)
+        groupes: Groupe de chaque texte (0..n_groupes-1, -1 = exclu)
+        n_groupes: Nombre de groupes
+        embeddings: Si fourni (float32 ou EmbeddingsCompacts), teste aussi
+            la matrice de similarité
+        n_permutations: Nombre de permutations
+        taille_bloc: Permutations par bloc (défaut: ~64 Mo de travail)
+        n_processus: Processus (None = nombre de cœurs, 1 = sans pool)
+        graine: Graine (résultats identiques quel que soit n_processus)
+
+    Returns:
+        {'H', 'p_H', 'differences', 'p_differences', 'paires', 'matrice',
+        'p_matrice' (si embeddings), 'n_permutations'}
+    """
+    donnees = preparer_donnees(valeurs, groupes, n_groupes, embeddings)
+    nulles = _executer_blocs(_bloc_permutations, donnees, n_permutations,
+                             octets_par_tirage=48 * len(donnees['lignes']) + 8 * n_groupes * _dimension(embeddings),
+                             taille_bloc=taille_bloc, n_processus=n_processus, graine=graine)
+
+    observe = statistiques(donnees, donnees['groupes'][None, :])
+    resultat = {
+        'n_permutations': n_permutations,
+        'paires': list(combinations(range(n_groupes), 2)),
+        'H': float(observe['H'][0]),
+        'p_H': float(_p_valeurs(observe['H'][0], nulles['H'], bilateral=False)),
+        'differences': observe['differences'][0],
+        'p_differences': _p_valeurs(observe['differences'][0], nulles['differences'], bilateral=True),
+    }
+    if 'matrice' in observe:
+        resultat['matrice'] = observe['matrice'][0]
+        resultat['p_matrice'] = _p_valeurs(observe['matrice'][0], nulles['matrice'], bilateral=True)
+    return resultat
+
+
+# ============================================================================
+# BOOTSTRAP
+# ============================================================================
+
+def preparer_bootstrap(groupes: np.ndarray,
+                       n_groupes: int,
+                       embeddings: Optional[Vecteurs] = None,
+                       valeurs: Optional[np.ndarray] = None) -> Dict:
+    """Lignes regroupées par groupe (tranches contiguës) pour le bootstrap stratifié."""
+    groupes = np.asarray(groupes)
+    lignes = np.flatnonzero(groupes >= 0)
+    ordre = lignes[np.argsort(groupes[lignes], kind='stable')]
+    effectifs = np.bincount(groupes[ordre], minlength=n_groupes)
+    donnees = {
+        'lignes': ordre,
+        'groupes': groupes[ordre],
+        'n_groupes': n_groupes,
+        'effectifs': effectifs,
+        'offsets': np.concatenate([[0], np.cumsum(effectifs)]),
+        'valeurs': None,
+    }
+    _donnees_vecteurs(donnees, embeddings)
+    if valeurs is not None:
+        valeurs = np.asarray(valeurs, dtype=np.float64)[ordre]
+        donnees['valeurs'] = np.stack([valeurs, valeurs ** 2], axis=1)
+    return donnees
+
+
+def poids_bootstrap(rng: np.random.Generator, effectifs: np.ndarray, taille: int) -> np.ndarray:
+    """Multiplicités (taille × N) d'un tirage avec remise dans chaque groupe."""
+    return np.concatenate([
+        rng.multinomial(n, np.full(n, 1.0 / n), size=taille) if n > 0 else np.empty((taille, 0), dtype=np.int64)
+        for n in effectifs.tolist()
+    ], axis=1).astype(np.float64)
+
+
+def statistiques_bootstrap(donnees: Dict, poids: np.ndarray) -> Dict[str, np.ndarray]:
+    """Statistiques de groupes pour un bloc de poids (B, n), à partir de sommes pondérées.
+
+    Returns:
+        {'matrice': (B, G, G)} si embeddings, {'moyennes', 'ecarts': (B, G)} si valeurs
+    """
+    G = donnees['n_groupes']
+    B = len(poids)
+    effectifs = donnees['effectifs'].astype(np.float64)
+    tranches = [slice(a, b) for a, b in zip(donnees['offsets'][:-1], donnees['offsets'][1:])]
+    resultat = {}
+
+    if donnees['vecteurs'] is not None:
+        tirages, positions = np.nonzero(poids)  # ~63 % des lignes par tirage
+        rangees = tirages * G + donnees['groupes'][positions]
+        multiplicites = poids[tirages, positions]
+        sommes = _sommes_unitaires(donnees, rangees, positions, multiplicites, B * G).reshape(B, G, -1)
+        # Intra-groupe: un texte tiré k fois forme k² paires avec lui-même (cosinus 1),
+        # toutes exclues comme la paire identique de l'échantillon d'origine
+        carres = multiplicites ** 2
+        exclues = np.bincount(rangees, weights=carres * donnees['non_nuls'][positions], minlength=B * G)
+        n_paires = np.broadcast_to(np.outer(effectifs, effectifs), (B, G, G)).copy()
+        n_paires[:, np.arange(G), np.arange(G)] -= np.bincount(rangees, weights=carres, minlength=B * G).reshape(B, G)
+        resultat['matrice'] = _moyennes_paires(sommes, exclues.reshape(B, G), n_paires)
+
+    if donnees['valeurs'] is not None:
+        sommes = np.stack([poids[:, t] @ donnees['valeurs'][t] for t in tranches], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyennes = sommes[..., 0] / effectifs
+            resultat['moyennes'] = moyennes
+            resultat['ecarts'] = np.sqrt(np.maximum(sommes[..., 1] / effectifs - moyennes ** 2, 0.0))
+    return resultat
+
+
+def _bloc_bootstrap(graine: np.random.SeedSequence, taille: int, donnees: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """Statistiques de `taille` tirages bootstrap avec le générateur du bloc."""
+    donnees = donnees if donnees is not None else _DONNEES_WORKER
+    rng = np.random.default_rng(graine)
+    return statistiques_bootstrap(donnees, poids_bootstrap(rng, donnees['effectifs'], taille))
+
+
+def intervalles_bootstrap(groupes: np.ndarray,
+                          n_groupes: int,
+                          embeddings: Optional[Vecteurs] = None,
+                          valeurs: Optional[np.ndarray] = None,
+                          n_bootstrap: int = 2000,
+                          niveau: float = 0.95,
+                          taille_bloc: Optional[int] = None,
+                          n_processus: Optional[int] = None,
+                          graine: int = 0) -> Dict[str, np.ndarray]:
+    """Intervalles de confiance bootstrap (percentiles) des statistiques de groupes.
+
+    Args:
+        groupes: Groupe de chaque texte (0..n_groupes-1, -1 = exclu)
+        n_groupes: Nombre de groupes
+        embeddings: Si fourni (float32 ou EmbeddingsCompacts), IC de la
+            matrice de similarité cosinus moyenne
+        valeurs: Si fourni, IC de la moyenne et de l'écart-type par groupe
+        n_bootstrap: Nombre de tirages
+        niveau: Niveau de confiance
+        n_processus: Processus (None = nombre de cœurs, 1 = sans pool)
+        graine: Graine (résultats identiques quel que soit n_processus)
+
+    Returns:
+        {'<statistique>_bas', '<statistique>_haut'} pour 'matrice' (G × G)
+        et/ou 'moyennes', 'ecarts' (G,)
+    """
+    donnees = preparer_bootstrap(groupes, n_groupes, embeddings, valeurs)
+    tirages = _executer_blocs(_bloc_bootstrap, donnees, n_bootstrap,
+                              octets_par_tirage=48 * len(donnees['lignes']) + 8 * n_groupes * _dimension(embeddings),
+                              taille_bloc=taille_bloc, n_processus=n_processus, graine=graine)
+
+    alpha = 100.0 * (1.0 - niveau) / 2.0
+    intervalles = {}
+    for cle, valeurs_tirees in tirages.items():
+        bas, haut = np.nanpercentile(valeurs_tirees, [alpha, 100.0 - alpha], axis=0)
+        intervalles[f'{cle}_bas'] = bas
+        intervalles[f'{cle}_haut'] = haut
+    return intervalles
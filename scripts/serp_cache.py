@@ -0,0 +1,138 @@
+"""
+scripts/serp_cache.py
+
+Disk-backed cache of SerpApi responses, keyed by a canonical hash of the
+request parameters (api_key excluded).
+
+Entries live in a single SQLite file: compressed JSON payload, expiry
+timestamp (per-entry TTL), last access time and size. When the total
+payload size exceeds max_bytes, least recently used entries are evicted.
+Payloads are zstd-compressed when `zstandard` is installed, zlib otherwise
+(see compression.py; the codec is stored per entry so both can be read back).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from compression import compress, decompress
+
+# Kept out of data/raw: reads update `accessed`, which would change the
+# fingerprint of the consolidation stage (pipeline.py) without any new data.
+DEFAULT_CACHE_PATH = "data/cache/serp_cache.sqlite"
+LEGACY_CACHE_PATH = "data/raw/serp_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+EXCLUDED_PARAMS = {"api_key"}
+
+
+def canonical_key(params: Dict) -> str:
+    """sha256 of the sorted request parameters, api_key excluded."""
+    canonical = {k: v for k, v in params.items() if k not in EXCLUDED_PARAMS and v is not None}
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _migrate_legacy(path: str) -> None:
+    """Move a cache left at the former default location to the new one."""
+    if path != DEFAULT_CACHE_PATH or os.path.exists(path) or not os.path.exists(LEGACY_CACHE_PATH):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(LEGACY_CACHE_PATH + suffix):
+            os.replace(LEGACY_CACHE_PATH + suffix, path + suffix)
+
+
+class ResponseCache:
+    """Thread-safe SQLite response cache with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, default_ttl: Optional[float] = DEFAULT_TTL,
+                 max_bytes: Optional[int] = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        _migrate_legacy(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, params TEXT, codec TEXT, payload BLOB,"
+            " size INTEGER, created REAL, expires REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+        self._conn.commit()
+
+    def get(self, params: Dict, ignore_ttl: bool = False) -> Optional[Dict]:
+        """Cached response, or None on miss/expiry.
+
+        Expired entries are reported as misses but never deleted here (only
+        _evict removes rows); with ignore_ttl=True (replay) they are served.
+        """
+        key = canonical_key(params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, payload, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            codec, payload, expires = row
+            if not ignore_ttl and expires is not None and expires < now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(decompress(codec, payload))
+
+    def put(self, params: Dict, response: Dict, ttl: Optional[float] = None):
+        key = canonical_key(params)
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        codec, payload = compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        public_params = {k: v for k, v in params.items() if k not in EXCLUDED_PARAMS}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(public_params, ensure_ascii=False, default=str), codec, payload,
+                 len(payload), now, now + ttl if ttl else None, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired entries, then LRU entries until under max_bytes (lock held)."""
+        self._conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+            to_delete.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": n, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
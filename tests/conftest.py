@@ -0,0 +1,7 @@
+"""Les scripts s'importent entre eux par nom simple (exécutés depuis scripts/)."""
+
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS))
@@ -0,0 +1,129 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_embeddings import EmbeddingsCompacts, dequantifier, quantifier
+
+analyse = importlib.import_module('03_analyze')
+
+PAYS = ['France', 'USA', 'Allemagne', 'Japon']
+
+
+@pytest.fixture
+def analyseur(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # results/ écrit dans un dossier temporaire
+    rng = np.random.default_rng(0)
+    n = 120
+    pays = rng.choice(PAYS + ['Neutral'], n)
+    # Vecteurs non normalisés, normes variables, un vecteur nul
+    embeddings = (rng.normal(size=(n, 16)) * rng.uniform(0.5, 3.0, size=(n, 1))).astype(np.float32)
+    embeddings[pays == 'France'] += 0.8
+    embeddings[3] = 0.0
+    a = analyse.AnalyseurSemantique()
+    a.embeddings = embeddings
+    a.metadata = pd.DataFrame({'pays': pays, 'source': 'Google Jobs', 'type': 'offre'})
+    return a
+
+
+def test_matrice_par_sommes_egale_matrice_par_paires(analyseur):
+    paires = analyseur.calculer_matrice_similarite(methode='paires')
+    sommes = analyseur.calculer_matrice_similarite(methode='sommes')
+    auto = analyseur.calculer_matrice_similarite()
+    pd.testing.assert_frame_equal(sommes, paires, atol=1e-6)
+    pd.testing.assert_frame_equal(auto, sommes)
+
+
+def test_matrice_par_sommes_sur_embeddings_compacts(analyseur):
+    codes, meta = quantifier(analyseur.embeddings, 'int8')
+    analyseur.embeddings = dequantifier(codes, meta)
+    reference = analyseur.calculer_matrice_similarite(methode='paires')
+    analyseur.embeddings = EmbeddingsCompacts(codes, meta)
+    compacte = analyseur.calculer_matrice_similarite(methode='sommes')
+    pd.testing.assert_frame_equal(compacte, reference, atol=1e-6)
+
+
+def _unitaires(embeddings):
+    normes = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, normes, out=np.zeros_like(embeddings), where=normes > 0)
+
+
+def test_cube_egal_moyennes_par_paires(analyseur):
+    rng = np.random.default_rng(1)
+    metadata = analyseur.metadata.copy()
+    metadata['role'] = rng.choice(['PO', 'SM'], len(metadata))
+    metadata.loc[5, 'type'] = 'guide'  # cellule d'un seul texte
+    analyseur.metadata = metadata
+
+    cube = analyseur.calculer_cube_similarite(colonnes=('pays', 'role', 'type'))
+
+    u = _unitaires(analyseur.embeddings.astype(np.float64))
+    cellules = {libelle: np.flatnonzero((metadata[['pays', 'role', 'type']] == libelle).all(axis=1))
+                for libelle in cube.index}
+    seule = tuple(metadata.loc[5, ['pays', 'role', 'type']])
+    assert len(cellules[seule]) == 1
+    for a, ia in cellules.items():
+        assert cube.attrs['effectifs'][a] == len(ia)
+        for b, ib in cellules.items():
+            sims = u[ia] @ u[ib].T
+            if a == b:
+                attendu = ((sims.sum() - np.trace(sims)) / (len(ia) * (len(ia) - 1))
+                           if len(ia) > 1 else np.nan)
+            else:
+                attendu = sims.mean()
+            np.testing.assert_allclose(cube.loc[a, b], attendu, atol=1e-6)
+    assert np.isnan(cube.loc[seule, seule])
+    assert set(cube.index.get_level_values('pays')) <= set(analyse.AnalyseurSemantique().pays_list)
+
+
+@pytest.fixture
+def avec_scrum_guide(analyseur, monkeypatch):
+    analyseur.metadata.loc[[0, 1, 2], 'source'] = 'Scrum Guide'
+    appels = []
+    cosinus = analyse.cosinus_vecteur
+    monkeypatch.setattr(analyse, 'cosinus_vecteur',
+                        lambda *a: appels.append(1) or cosinus(*a))
+    return analyseur, appels
+
+
+def _similarites_attendues(analyseur):
+    u = _unitaires(analyseur.embeddings.astype(np.float64))
+    sg = analyseur.embeddings[analyseur.metadata['source'] == 'Scrum Guide'].mean(axis=0)
+    return u @ (sg / np.linalg.norm(sg))
+
+
+def test_similarites_scrum_guide_memorisees(avec_scrum_guide):
+    analyseur, appels = avec_scrum_guide
+    premieres = analyseur.similarites_scrum_guide()
+    assert analyseur.similarites_scrum_guide() is premieres
+    assert len(appels) == 1
+    np.testing.assert_allclose(premieres, _similarites_attendues(analyseur), atol=1e-5)
+
+    # Même contenu dans de nouveaux objets: résultat toujours valable
+    analyseur.embeddings = analyseur.embeddings.copy()
+    analyseur.metadata = analyseur.metadata.copy()
+    assert analyseur.similarites_scrum_guide() is premieres
+
+
+@pytest.mark.parametrize('modification', [
+    'remplacer_embeddings', 'modifier_embeddings', 'remplacer_metadata', 'modifier_metadata',
+])
+def test_similarites_scrum_guide_invalidees(avec_scrum_guide, modification):
+    analyseur, appels = avec_scrum_guide
+    premieres = analyseur.similarites_scrum_guide().copy()
+
+    if modification == 'remplacer_embeddings':
+        analyseur.embeddings = analyseur.embeddings[::-1].copy()
+    elif modification == 'modifier_embeddings':
+        analyseur.embeddings[0] += 1.0
+    elif modification == 'remplacer_metadata':
+        analyseur.metadata = analyseur.metadata.assign(source='Google Jobs')
+        analyseur.metadata.loc[[4, 5], 'source'] = 'Scrum Guide'
+    else:
+        analyseur.metadata.loc[2, 'source'] = 'Google Jobs'
+
+    nouvelles = analyseur.similarites_scrum_guide()
+    assert len(appels) == 2
+    assert not np.allclose(nouvelles, premieres)
+    np.testing.assert_allclose(nouvelles, _similarites_attendues(analyseur), atol=1e-5)
@@ -0,0 +1,215 @@
+import re
+import sys
+
+import numpy as np
+import pytest
+
+from batch_encoding import (agreger_fenetres, batches_fixes, decouper_fenetres,
+                            efficacite_padding, encoder_multiprocess, encoder_par_fenetres,
+                            planifier_batches)
+
+LONGUEURS = np.array([12, 3, 40, 7, 7, 25, 2, 90, 18, 5, 33, 7])
+DIM = 6
+MOTS = [f"m{i}" for i in range(23)]
+
+
+@pytest.mark.parametrize('budget, batch_max', [(64, None), (100, None), (100, 3), (1, None)])
+def test_batches_couvrent_chaque_indice_une_fois(budget, batch_max):
+    batches = planifier_batches(LONGUEURS, budget, batch_max)
+
+    ordre = np.concatenate(batches)
+    assert sorted(ordre) == list(range(len(LONGUEURS)))
+    # Réassemblage comme dans encoder_par_budget: chaque vecteur revient à sa place
+    vecteurs = np.empty(len(LONGUEURS))
+    for batch in batches:
+        vecteurs[batch] = LONGUEURS[batch] * 10
+    np.testing.assert_array_equal(vecteurs, LONGUEURS * 10)
+
+
+@pytest.mark.parametrize('budget', [1, 32, 64, 100, 1000])
+def test_batches_sous_budget_sauf_texte_trop_long_seul(budget):
+    for batch in planifier_batches(LONGUEURS, budget):
+        cout = len(batch) * LONGUEURS[batch].max()
+        if cout > budget:
+            assert len(batch) == 1 and LONGUEURS[batch[0]] > budget
+
+
+def test_batch_max_borne_la_taille():
+    batches = planifier_batches(LONGUEURS, 10_000, batch_max=5)
+    assert [len(b) for b in batches] == [5, 5, 2]
+
+
+def test_batches_tries_par_longueur_decroissante():
+    batches = planifier_batches(LONGUEURS, 100)
+    longueurs = LONGUEURS[np.concatenate(batches)]
+    assert list(longueurs) == sorted(LONGUEURS, reverse=True)
+
+
+def test_efficacite_padding():
+    longueurs = np.array([4, 2, 4, 1])
+    assert efficacite_padding(longueurs, [np.array([0, 2])]) == 1.0
+    assert efficacite_padding(longueurs, batches_fixes(4, 2)) == pytest.approx(11 / 16)
+    assert efficacite_padding(longueurs, []) == 1.0
+
+
+def test_planification_ameliore_le_padding():
+    reference = efficacite_padding(LONGUEURS, batches_fixes(len(LONGUEURS), 4))
+    assert efficacite_padding(LONGUEURS, planifier_batches(LONGUEURS, 120)) > reference
+
+
+# ============================================================================
+# FENÊTRES
+# ============================================================================
+
+class TokenizerMots:
+    """Un token par mot, offsets de caractères comme un tokenizer rapide."""
+
+    def __call__(self, texts, add_special_tokens=True, return_offsets_mapping=False, **kwargs):
+        offsets = [[m.span() for m in re.finditer(r'\S+', t)] for t in texts]
+        encodage = {'input_ids': [list(range(len(o))) for o in offsets]}
+        if return_offsets_mapping:
+            encodage['offset_mapping'] = offsets
+        return encodage
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+class ModeleMots:
+    max_seq_length = 8  # 5 tokens de contenu par fenêtre
+    tokenizer = TokenizerMots()
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        vecteurs = np.stack([
+            np.random.default_rng(sum(t.encode())).normal(size=DIM) for t in texts
+        ]).astype(np.float32)
+        if normalize_embeddings:
+            vecteurs /= np.linalg.norm(vecteurs, axis=1, keepdims=True)
+        return vecteurs
+
+
+@pytest.mark.parametrize('chevauchement', [0, 1, 3])
+def test_fenetres_chevauchent_et_couvrent_chaque_token(chevauchement):
+    taille = 5
+    fenetres, documents, tokens = decouper_fenetres(
+        TokenizerMots(), [" ".join(MOTS)], taille, chevauchement)
+
+    pas = taille - chevauchement
+    couverts = []
+    for k, fenetre in enumerate(fenetres):
+        debut = k * pas
+        assert fenetre.split() == MOTS[debut:debut + taille]
+        assert tokens[k] == len(fenetre.split())
+        couverts.extend(range(debut, debut + tokens[k]))
+    assert set(couverts) == set(range(len(MOTS)))
+    assert fenetres[-1].split()[-1] == MOTS[-1]
+    assert list(documents) == [0] * len(fenetres)
+
+
+def test_chevauchement_hors_bornes_refuse():
+    with pytest.raises(ValueError):
+        decouper_fenetres(TokenizerMots(), ["a b"], 4, 4)
+
+
+def test_texte_court_garde_le_vecteur_de_l_encodage_simple():
+    modele = ModeleMots()
+    textes = ["une offre courte", " ".join(MOTS), "autre texte"]
+
+    emb, stats = encoder_par_fenetres(modele, textes, chevauchement=2, show_progress_bar=False)
+
+    reference = modele.encode(textes)
+    np.testing.assert_array_equal(emb[[0, 2]], reference[[0, 2]])
+    assert stats['n_documents_decoupes'] == 1
+    assert not np.allclose(emb[1], reference[1])
+
+
+@pytest.mark.parametrize('pooling', ['moyenne', 'ponderee'])
+def test_agregation_par_document(pooling):
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(6, DIM)).astype(np.float32)
+    documents = np.array([0, 0, 0, 1, 2, 2])
+    tokens = np.array([5, 5, 2, 4, 5, 1])
+
+    resultat = agreger_fenetres(embeddings, documents, tokens, pooling, normalize=False)
+
+    poids = np.ones(6) if pooling == 'moyenne' else tokens
+    for doc in range(3):
+        masque = documents == doc
+        attendu = np.average(embeddings[masque], axis=0, weights=poids[masque])
+        np.testing.assert_allclose(resultat[doc], attendu, rtol=1e-5)
+    np.testing.assert_array_equal(resultat[1], embeddings[3])
+
+
+def test_agregation_normalise_les_documents_decoupes():
+    embeddings = np.random.default_rng(1).normal(size=(3, DIM)).astype(np.float32)
+    resultat = agreger_fenetres(embeddings, np.array([0, 0, 1]), np.array([5, 3, 2]))
+    assert np.linalg.norm(resultat[0]) == pytest.approx(1.0)
+    np.testing.assert_array_equal(resultat[1], embeddings[2])
+
+
+def test_pooling_inconnu_refuse():
+    with pytest.raises(ValueError):
+        agreger_fenetres(np.zeros((1, DIM)), np.array([0]), np.array([1]), pooling='max')
+
+
+# ============================================================================
+# POOL MULTI-PROCESSUS
+# ============================================================================
+
+# Modules factices importés par les workers spawn (qui reçoivent le sys.path du parent)
+TORCH_FACTICE = """
+def set_num_threads(n):
+    pass
+
+
+def set_num_interop_threads(n):
+    pass
+"""
+
+SENTENCE_TRANSFORMERS_FACTICE = """
+import zlib
+
+import numpy as np
+
+
+class SentenceTransformer:
+    def __init__(self, model_name, revision=None, device=None):
+        self.dim = int(model_name.split('-')[-1])
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        vecteurs = np.stack([
+            np.random.default_rng(zlib.crc32(t.encode())).normal(size=self.dim)
+            for t in texts
+        ]).astype(np.float32)
+        if normalize_embeddings:
+            vecteurs /= np.linalg.norm(vecteurs, axis=1, keepdims=True)
+        return vecteurs
+"""
+
+
+@pytest.fixture
+def modele_factice(tmp_path, monkeypatch):
+    (tmp_path / 'torch.py').write_text(TORCH_FACTICE)
+    (tmp_path / 'sentence_transformers.py').write_text(SENTENCE_TRANSFORMERS_FACTICE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for module in ('torch', 'sentence_transformers'):
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(f'factice-{DIM}')
+
+
+def test_pool_restitue_l_ordre_du_mono_processus(modele_factice):
+    textes = [f"offre numéro {i}" for i in range(11)]
+
+    emb = encoder_multiprocess(textes, f'factice-{DIM}', n_workers=2, taille_shard=3)
+
+    assert emb.dtype == np.float32
+    np.testing.assert_allclose(emb, modele_factice.encode(textes), atol=1e-6)
+
+
+def test_pool_sans_texte_renvoie_un_array_vide(modele_factice):
+    emb = encoder_multiprocess([], f'factice-{DIM}', n_workers=2)
+    assert emb.shape == (0, DIM) and emb.dtype == np.float32
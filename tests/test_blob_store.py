@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from blob_store import BlobStore
+
+
+def test_lectures_concurrentes_une_seule_fd_par_shard(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), max_shard_bytes=2048)
+    records = {f"id{i}": {"title": f"Scrum Master {i}", "description": "x" * 200} for i in range(60)}
+    for k in range(0, 60, 10):
+        store.put_many(list(records.items())[k:k + 10])
+    n_shards = store.stats()["shards"]
+    assert n_shards > 1
+
+    with ThreadPoolExecutor(8) as pool:
+        lus = list(pool.map(store.get, list(records) * 4))
+    assert lus == list(records.values()) * 4
+    assert len(store._fds) == n_shards
+    store.close()
+    assert store._fds == {}
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from boilerplate import FiltreBoilerplate, filtrer_boilerplate, normaliser_ligne
+
+COURTE = "Avantages :"  # < longueur_min, présente partout
+REPETEE = "Cette phrase est répétée dans une seule et même offre"
+
+
+def _ligne(nom):
+    return f"Ligne {nom} suffisamment longue pour être candidate"
+
+
+def _corpus(n_docs, seuil):
+    """Offres sans entreprise + offres des entreprises A (4), B (6) et C (10).
+
+    'global_seuil' est présente dans `seuil` offres sans entreprise,
+    'global_sous' dans seuil - 1; 'a', 'b', 'c' dans 2/4, 3/6 et 4/10 offres
+    de leur entreprise.
+    """
+    lignes = []
+    entreprises = {'A': 4, 'B': 6, 'C': 10}
+    repetitions = {'A': 2, 'B': 3, 'C': 4}
+    for nom, n in entreprises.items():
+        for k in range(n):
+            texte = [COURTE, f"Offre {nom}{k}: description propre à cette annonce"]
+            if k < repetitions[nom]:
+                texte.append(_ligne(nom.lower()))
+            lignes.append((nom, texte))
+    for k in range(n_docs - len(lignes)):
+        texte = [COURTE, f"Offre sans entreprise {k}: description propre à cette annonce"]
+        if k < seuil:
+            texte.append(_ligne('global_seuil'))
+        if k < seuil - 1:
+            texte.append(_ligne('global_sous'))
+        if k == 0:
+            texte += [REPETEE] * 10
+        lignes.append((None, texte))
+    return pd.DataFrame({'entreprise': [e for e, _ in lignes],
+                         'texte_brut': ['\n'.join(t) for _, t in lignes]})
+
+
+@pytest.mark.parametrize('n_docs, seuil', [(100, 5), (400, 8)])
+def test_seuils_global_et_par_entreprise(n_docs, seuil):
+    df = _corpus(n_docs, seuil)
+    assert FiltreBoilerplate().compter(df['texte_brut'], df['entreprise']).seuil_global() == seuil
+
+    resultat, table = filtrer_boilerplate(df)
+
+    portees = dict(zip(table['ligne'], table['portee']))
+    assert portees == {_ligne('global_seuil'): 'global', _ligne('b'): 'entreprise'}
+    n_retraits = dict(zip(table['ligne'], table['n_retraits']))
+    assert n_retraits == {_ligne('global_seuil'): seuil, _ligne('b'): 3}
+
+    textes = '\n'.join(resultat['texte_brut'])
+    for gardee in ('global_sous', 'a', 'c'):
+        assert textes.count(_ligne(gardee)) == '\n'.join(df['texte_brut']).count(_ligne(gardee))
+    assert textes.count(COURTE) == n_docs
+    assert textes.count(REPETEE) == 10
+
+
+def test_seuil_par_entreprise_limite_a_son_entreprise():
+    # 3 offres de B sur 4 et 1 de D: 4 offres en tout, sous le seuil global (5)
+    avec = [True, True, True, False, True]
+    df = pd.DataFrame({
+        'entreprise': ['B'] * 4 + ['D'],
+        'texte_brut': [(_ligne('b') + "\n" if a else "") + f"Offre {k} avec sa propre description"
+                       for k, a in enumerate(avec)],
+    })
+    resultat, table = filtrer_boilerplate(df)
+    assert table['portee'].tolist() == ['entreprise']
+    assert [_ligne('b') in t for t in resultat['texte_brut']] == [False] * 4 + [True]
+
+
+def test_longueur_min_configurable():
+    df = pd.DataFrame({'texte_brut': ["Ligne courte\nOffre unique numéro %d" % k for k in range(6)]})
+    assert filtrer_boilerplate(df)[1].empty
+    resultat, table = filtrer_boilerplate(df, longueur_min=5)
+    assert table['ligne'].tolist() == ['Ligne courte']
+    assert not resultat['texte_brut'].str.contains('Ligne courte').any()
+
+
+def test_normalisation_des_lignes():
+    assert normaliser_ligne("  • Nous RECRUTONS   partout !") == normaliser_ligne("nous recrutons partout")
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from compact_embeddings import (EmbeddingsCompacts, charger_embeddings, dequantifier, normes_carrees,
+                                produit_creux, quantifier, sauvegarder_compact)
+
+
+@pytest.fixture
+def embeddings():
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(50, 24)).astype(np.float32)
+    emb[:, 5] = 0.0  # dimension constante nulle: échelle int8 neutre
+    return emb
+
+
+def test_int8_erreur_bornee_par_demi_pas(embeddings):
+    codes, meta = quantifier(embeddings, 'int8')
+    assert codes.dtype == np.int8 and not meta['normalise']
+    echelles = np.asarray(meta['echelles'])
+    erreur = np.abs(dequantifier(codes, meta) - embeddings)
+    assert np.all(erreur <= echelles / 2 + 1e-6)
+    assert np.all(dequantifier(codes, meta)[:, 5] == 0)
+
+
+def test_float16_et_binaire(embeddings):
+    codes, meta = quantifier(embeddings, 'float16')
+    np.testing.assert_allclose(dequantifier(codes, meta), embeddings, rtol=1e-3, atol=1e-3)
+
+    codes, meta = quantifier(embeddings, 'binaire')
+    assert codes.shape == (50, 3)
+    vecteurs = dequantifier(codes, meta)
+    np.testing.assert_array_equal(vecteurs > 0, embeddings > 0)
+    np.testing.assert_allclose(np.linalg.norm(vecteurs, axis=1), 1.0, rtol=1e-6)
+
+
+def test_vecteurs_normalises_renormalises(embeddings):
+    unitaires = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    codes, meta = quantifier(unitaires, 'int8')
+    assert meta['normalise']
+    vecteurs = dequantifier(codes, meta)
+    np.testing.assert_allclose(np.linalg.norm(vecteurs, axis=1), 1.0, rtol=1e-6)
+    assert np.all(np.einsum('ij,ij->i', vecteurs, unitaires) > 0.999)
+
+
+@pytest.mark.parametrize('precision', ['float16', 'int8', 'binaire'])
+def test_aller_retour_fichier(embeddings, tmp_path, precision):
+    emb_path = tmp_path / 'emb.npy'
+    np.save(emb_path, embeddings)
+    chemin = sauvegarder_compact(embeddings, str(emb_path), precision)
+
+    compacts = charger_embeddings(str(chemin))
+    codes, meta = quantifier(embeddings, precision)
+    attendu = dequantifier(codes, meta)
+    assert isinstance(compacts, EmbeddingsCompacts) and compacts.shape == embeddings.shape
+    np.testing.assert_array_equal(compacts[[3, 7]], attendu[[3, 7]])
+    np.testing.assert_array_equal(np.asarray(compacts), attendu)
+
+    # Agrégats par blocs égaux aux calculs sur les vecteurs déquantifiés
+    appartenance = sparse.csr_matrix((np.ones(50), (np.arange(50) % 3, np.arange(50))), shape=(3, 50))
+    np.testing.assert_allclose(produit_creux(appartenance, compacts), appartenance @ attendu.astype(np.float64),
+                               rtol=1e-6)
+    np.testing.assert_allclose(normes_carrees(compacts), normes_carrees(attendu), rtol=1e-5)
+
+    # Rescoring: lignes relues en float32 depuis le fichier d'origine
+    rescore = charger_embeddings(str(chemin), rescorer=True)
+    np.testing.assert_array_equal(rescore[[3, 7]], embeddings[[3, 7]])
@@ -0,0 +1,101 @@
+import importlib
+import json
+
+import pandas as pd
+import pytest
+
+consolidation = importlib.import_module('01d_consolidate')
+IdRegistry = consolidation.IdRegistry
+
+SERP = {"id": "abc", "title": "PO", "company": "ACME", "description": "Missions:\nGérer le backlog",
+        "country": "France", "role_query": "Product Owner", "language": "fr",
+        "apply_link": "https://x/1", "retrieved_at": "2026-01-02T10:00:00Z"}
+CORPUS = {"id": "FR_PO_001", "pays": "France", "role": "Product Owner", "source": "WTTJ",
+          "entreprise": "ACME", "url": "https://y/1", "date_collecte": "2026-01-03",
+          "texte_brut": "Vous gérez le backlog", "langue": "fr", "type": ""}
+
+
+def _chunk(*lignes):
+    return pd.DataFrame(list(lignes), dtype=str)
+
+
+def test_ids_stables_entre_executions(tmp_path):
+    chemin = str(tmp_path / "ids.sqlite")
+    registre = IdRegistry(chemin)
+    ids = registre.assign(pd.Series(["a", "b", "c", "a"]), pd.Series(["FR_PO", "FR_PO", "US_SM", "FR_PO"]))
+    assert ids.tolist() == ["FR_PO_001", "FR_PO_002", "US_SM_001", "FR_PO_001"]
+    registre.close()
+
+    registre = IdRegistry(chemin)
+    ids = registre.assign(pd.Series(["d", "b", "e"]), pd.Series(["FR_PO", "FR_PO", "US_SM"]))
+    # Clés connues: même id; nouvelles: numéro suivant de leur préfixe
+    assert ids.tolist() == ["FR_PO_003", "FR_PO_002", "US_SM_002"]
+    assert len(registre) == 5
+    registre.close()
+
+
+def test_schema_01c_csv():
+    out = consolidation.to_corpus_schema(_chunk(SERP))
+    ligne = out.iloc[0]
+    assert (ligne["pays"], ligne["role"], ligne["source"], ligne["entreprise"]) == \
+        ("France", "Product Owner", "Google Jobs", "ACME")
+    assert (ligne["date_collecte"], ligne["type"], ligne["key"]) == ("2026-01-02", "offre", "abc")
+    assert ligne["texte_brut"] == "Missions:\nGérer le backlog"
+
+
+def test_schema_01c_store_date_de_partition_et_cle_sans_id():
+    ligne = dict(SERP, id="", retrieved_at="", collected="2026-01-05")
+    out = consolidation.to_corpus_schema(_chunk(ligne), clean=False)
+    assert out.loc[0, "date_collecte"] == "2026-01-05"
+    assert out.loc[0, "texte_brut"] == SERP["description"]
+    assert len(out.loc[0, "key"]) == 40  # sha1 url + entreprise + texte
+
+
+def test_schema_corpus():
+    tronquee = dict(CORPUS, url="https://y/...", texte_brut="Autre texte")
+    out = consolidation.to_corpus_schema(_chunk(CORPUS, tronquee))
+    assert out["type"].tolist() == ["offre", "offre"]
+    assert out["id"].tolist() == ["FR_PO_001", "FR_PO_001"]
+    # Même entreprise et id local réutilisé: l'URL (ou le texte si l'URL est tronquée) distingue les offres
+    assert out.loc[0, "key"] != out.loc[1, "key"]
+    assert set(consolidation.CORPUS_COLUMNS) - {"id"} <= set(out.columns)
+
+
+def test_schema_inconnu():
+    with pytest.raises(ValueError):
+        consolidation.to_corpus_schema(_chunk({"foo": "bar"}))
+
+
+def _sources(raw):
+    raw.mkdir()
+    serp = [dict(SERP, id=f"s{i}", apply_link=f"https://x/{i}", description=f"Missions {i}") for i in range(5)]
+    pd.DataFrame(serp + serp[:2]).to_csv(raw / "offres_google_jobs.csv", index=False)
+    with open(raw / "offres_wttj.jsonl", "w", encoding="utf-8") as f:
+        for i in range(4):
+            f.write(json.dumps(dict(CORPUS, url=f"https://y/{i}", texte_brut=f"Texte {i}")) + "\n")
+    pd.DataFrame([dict(SERP, description="ignoré")]).to_csv(raw / "offres_sample.csv", index=False)
+    (raw / "serp_cache.sqlite").write_bytes(b"")
+
+
+def test_sortie_par_chunks_identique(tmp_path):
+    _sources(tmp_path / "raw")
+    corpus = {}
+    for taille in (2, 1000):
+        sortie = tmp_path / f"corpus_{taille}.csv"
+        n = consolidation.consolidate(raw_dir=str(tmp_path / "raw"), references=[], output=str(sortie),
+                                      id_map=str(tmp_path / f"ids_{taille}.sqlite"), chunk_size=taille)
+        assert n == 9
+        corpus[taille] = pd.read_csv(sortie, dtype=str, keep_default_na=False)
+        assert not list(tmp_path.glob(f"corpus_{taille}.csv.*"))
+    pd.testing.assert_frame_equal(corpus[2], corpus[1000])
+    assert corpus[2]["id"].is_unique
+    assert list(corpus[2].columns) == consolidation.CORPUS_COLUMNS
+
+
+def test_reexecution_memes_ids(tmp_path):
+    _sources(tmp_path / "raw")
+    options = dict(raw_dir=str(tmp_path / "raw"), references=[], id_map=str(tmp_path / "ids.sqlite"))
+    consolidation.consolidate(output=str(tmp_path / "a.csv"), **options)
+    consolidation.consolidate(output=str(tmp_path / "b.csv"), chunk_size=3, **options)
+    a, b = (pd.read_csv(tmp_path / f, dtype=str) for f in ("a.csv", "b.csv"))
+    pd.testing.assert_frame_equal(a, b)
@@ -0,0 +1,104 @@
+import importlib
+import json
+
+import numpy as np
+import pytest
+
+from embedding_cache import CacheEmbeddings
+
+embed = importlib.import_module('02_embed')
+
+SHA = 'a' * 40
+DIM = 4
+
+
+def _vecteur(texte):
+    return np.random.default_rng(sum(texte.encode())).normal(size=DIM).astype(np.float32)
+
+
+class ModeleFactice:
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+
+@pytest.fixture
+def calc():
+    calc = embed.EmbeddingCalculator(model_revision=SHA, cache_dir=None, daemon_url=None)
+    calc.model = ModeleFactice()
+    return calc
+
+
+def _encodeur(appels, panne_apres=None):
+    def encoder(textes):
+        if panne_apres is not None and len(appels) == panne_apres:
+            raise RuntimeError("panne simulée")
+        appels.append(list(textes))
+        return np.stack([_vecteur(t) for t in textes])
+    return encoder
+
+
+def test_reprise_au_premier_bloc_non_termine(calc, tmp_path, monkeypatch):
+    textes = [f"offre {i}" for i in range(10)]
+    emb_path = tmp_path / 'emb.npy'
+    journal = emb_path.with_suffix('.progress.json')
+
+    appels = []
+    monkeypatch.setattr(calc, '_encodeur_local', lambda *a, **k: _encodeur(appels, panne_apres=2))
+    with pytest.raises(RuntimeError):
+        calc.calculer_embeddings_streaming(textes, str(emb_path), taille_bloc=4)
+    assert json.loads(journal.read_text())['blocs_termines'] == 2
+
+    appels = []
+    monkeypatch.setattr(calc, '_encodeur_local', lambda *a, **k: _encodeur(appels))
+    emb = calc.calculer_embeddings_streaming(textes, str(emb_path), taille_bloc=4)
+    assert appels == [textes[8:]]
+    np.testing.assert_array_equal(emb, np.stack([_vecteur(t) for t in textes]))
+    assert not journal.exists()
+
+
+def test_journal_ignore_si_le_corpus_change(calc, tmp_path, monkeypatch):
+    emb_path = tmp_path / 'emb.npy'
+    appels = []
+    monkeypatch.setattr(calc, '_encodeur_local', lambda *a, **k: _encodeur(appels, panne_apres=1))
+    with pytest.raises(RuntimeError):
+        calc.calculer_embeddings_streaming(['a', 'b', 'c'], str(emb_path), taille_bloc=2)
+
+    appels = []
+    monkeypatch.setattr(calc, '_encodeur_local', lambda *a, **k: _encodeur(appels))
+    calc.calculer_embeddings_streaming(['a', 'B', 'c'], str(emb_path), taille_bloc=2)
+    assert appels == [['a', 'B'], ['c']]
+
+
+def test_corpus_vide(calc, tmp_path):
+    emb = calc.calculer_embeddings_streaming([], str(tmp_path / 'emb.npy'))
+    assert emb.shape == (0, DIM) and emb.dtype == np.float32
+
+
+def test_index_du_cache_ecrit_tous_les_n_blocs(tmp_path, monkeypatch):
+    calc = embed.EmbeddingCalculator(model_revision=SHA, cache_dir=str(tmp_path / 'cache'),
+                                     daemon_url=None)
+    ecritures = []
+    savez = np.savez
+    monkeypatch.setattr(np, 'savez', lambda *a, **k: ecritures.append(1) or savez(*a, **k))
+    textes = [f"offre {i}" for i in range(10)]
+
+    appels = []
+    monkeypatch.setattr(calc, '_encodeur_local', lambda *a, **k: _encodeur(appels, panne_apres=3))
+    with pytest.raises(RuntimeError):
+        calc.calculer_embeddings_streaming(textes, str(tmp_path / 'emb.npy'), taille_bloc=2,
+                                           sauvegarde_cache_blocs=2)
+    # Après le bloc 2, puis à l'arrêt: les 3 blocs terminés restent en cache
+    assert len(ecritures) == 2
+    relu = CacheEmbeddings(str(tmp_path / 'cache'))
+    cles = relu.cles(textes, calc.model_name, SHA, True, None, calc._variante())
+    assert relu.chercher(cles)[0].tolist() == [True] * 6 + [False] * 4
+
+
+@pytest.mark.parametrize('avec_cache', [False, True])
+def test_encodage_avec_cache_sans_texte(calc, tmp_path, avec_cache):
+    if avec_cache:
+        calc.cache = CacheEmbeddings(str(tmp_path / 'cache'))
+    appels = []
+    emb = calc._encoder_avec_cache([], True, _encodeur(appels))
+    assert emb.shape == (0, DIM) and emb.dtype == np.float32
+    assert appels == []
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+import embedding_cache
+from embedding_cache import CacheEmbeddings, resoudre_revision
+
+SHA = 'a' * 40
+
+
+@pytest.fixture(autouse=True)
+def hors_ligne(monkeypatch, tmp_path):
+    """Pas d'appel au Hub; cache huggingface_hub local vide."""
+    monkeypatch.setattr(embedding_cache, '_sha_hub', lambda model_name, revision: None)
+    monkeypatch.setenv('HF_HUB_CACHE', str(tmp_path / 'hub'))
+    resoudre_revision.cache_clear()
+    yield
+    resoudre_revision.cache_clear()
+
+
+def _vecteurs(n, dim=8, graine=0):
+    return np.random.default_rng(graine).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_cles_dependent_du_texte_et_des_parametres():
+    cles = CacheEmbeddings.cles(['a', 'b', 'a'], 'org/modele', SHA)
+    assert cles[0] == cles[2] and cles[0] != cles[1]
+    for variante in (dict(revision='b' * 40), dict(normalize=False), dict(max_seq_length=512),
+                     dict(variante='onnx')):
+        parametres = dict(revision=SHA, normalize=True, max_seq_length=None, variante='')
+        parametres.update(variante)
+        assert CacheEmbeddings.cles(['a'], 'org/modele', **parametres)[0] != cles[0], variante
+
+
+def test_branche_resolue_en_sha(monkeypatch, tmp_path):
+    ref = tmp_path / 'hub' / 'models--org--modele' / 'refs' / 'main'
+    ref.parent.mkdir(parents=True)
+    ref.write_text(SHA)
+    assert resoudre_revision('org/modele') == SHA
+    assert CacheEmbeddings.cles(['a'], 'org/modele')[0] == CacheEmbeddings.cles(['a'], 'org/modele', SHA)[0]
+
+    # 'main' avance: nouvelles clés
+    monkeypatch.setattr(embedding_cache, '_sha_hub', lambda model_name, revision: 'b' * 40)
+    resoudre_revision.cache_clear()
+    assert CacheEmbeddings.cles(['a'], 'org/modele')[0] != CacheEmbeddings.cles(['a'], 'org/modele', SHA)[0]
+
+
+def test_vecteurs_relus_apres_reouverture(tmp_path):
+    cache = CacheEmbeddings(str(tmp_path / 'cache'))
+    cles = CacheEmbeddings.cles(['a', 'b', 'c'], 'org/modele', SHA)
+    vecteurs = _vecteurs(3)
+    cache.ajouter(cles[:2], vecteurs[:2])
+
+    relu = CacheEmbeddings(str(tmp_path / 'cache'))
+    trouves, lus = relu.chercher(cles)
+    assert trouves.tolist() == [True, True, False]
+    np.testing.assert_array_equal(lus[:2], vecteurs[:2])
+
+
+def test_index_non_reecrit_quand_tout_est_en_cache(tmp_path):
+    cache = CacheEmbeddings(str(tmp_path / 'cache'))
+    cles = CacheEmbeddings.cles(['a', 'b'], 'org/modele', SHA)
+    cache.ajouter(cles, _vecteurs(2))
+    index = tmp_path / 'cache' / CacheEmbeddings.INDEX
+    avant = index.stat().st_mtime_ns
+
+    cache.chercher(cles)
+    cache.sauvegarder()
+    assert index.stat().st_mtime_ns == avant
+
+    cache.sauvegarder(forcer=True)
+    assert index.stat().st_mtime_ns != avant
+
+
+def test_eviction_lru_garde_les_entrees_recemment_lues(tmp_path):
+    cache = CacheEmbeddings(str(tmp_path / 'cache'), max_entrees=3)
+    cles = CacheEmbeddings.cles(list('abcd'), 'org/modele', SHA)
+    vecteurs = _vecteurs(4)
+    cache.ajouter(cles[:3], vecteurs[:3])
+    cache._acces[:] = [1.0, 2.0, 3.0]
+    cache.chercher(cles[:1])
+
+    cache.ajouter(cles[3:], vecteurs[3:])
+    trouves, lus = cache.chercher(cles)
+    assert trouves.tolist() == [True, False, True, True]
+    np.testing.assert_array_equal(lus[trouves], vecteurs[trouves])
+
+
+def test_petits_segments_fusionnes(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheEmbeddings, 'MAX_PETITS_SEGMENTS', 4)
+    cache = CacheEmbeddings(str(tmp_path / 'cache'))
+    textes = [f't{i}' for i in range(12)]
+    cles = CacheEmbeddings.cles(textes, 'org/modele', SHA)
+    vecteurs = _vecteurs(12)
+    for i in range(0, 12, 2):
+        cache.ajouter(cles[i:i + 2], vecteurs[i:i + 2])
+
+    assert len(list((tmp_path / 'cache').glob('seg_*.npy'))) <= 4
+    trouves, lus = CacheEmbeddings(str(tmp_path / 'cache')).chercher(cles)
+    assert trouves.all()
+    np.testing.assert_array_equal(lus, vecteurs)
+
+
+def test_sauvegarde_differee(tmp_path):
+    cache = CacheEmbeddings(str(tmp_path / 'cache'))
+    cles = CacheEmbeddings.cles(list('abcd'), 'org/modele', SHA)
+    vecteurs = _vecteurs(4)
+    cache.ajouter(cles[:2], vecteurs[:2], sauvegarder=False)
+    cache.ajouter(cles[2:], vecteurs[2:], sauvegarder=False)
+    assert not (tmp_path / 'cache' / CacheEmbeddings.INDEX).exists()
+    assert cache.chercher(cles)[0].all()
+
+    cache.sauvegarder()
+    trouves, lus = CacheEmbeddings(str(tmp_path / 'cache')).chercher(cles)
+    assert trouves.all()
+    np.testing.assert_array_equal(lus, vecteurs)
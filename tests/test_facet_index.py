@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from facet_index import IndexFacettes
+
+
+@pytest.fixture
+def metadata():
+    return pd.DataFrame({
+        'pays': ['FR', 'DE', 'FR', None, 'US', 'DE', 'FR', np.nan, 'US', 'FR'],
+        'role': ['PO', 'SM', 'SM', 'PO', None, 'PO', 'PO', 'SM', 'SM', 'Agile Coach'],
+        'type': ['offre', 'offre', 'guide', 'offre', 'offre', 'guide', 'offre', 'offre', 'offre', 'offre'],
+    })
+
+
+@pytest.fixture
+def index(metadata):
+    return IndexFacettes(metadata)
+
+
+@pytest.mark.parametrize('colonne, valeur', [
+    ('pays', 'FR'), ('pays', 'US'), ('role', 'PO'), ('type', 'guide'),
+    ('pays', 'IT'), ('role', 'Dev'),  # valeurs absentes
+])
+def test_positions_egales_au_masque(index, metadata, colonne, valeur):
+    np.testing.assert_array_equal(index.positions(colonne, valeur),
+                                  np.flatnonzero(metadata[colonne] == valeur))
+
+
+@pytest.mark.parametrize('colonne, motif', [('role', 'S'), ('role', 'Coach'), ('pays', 'X')])
+def test_contient_egal_au_masque(index, metadata, colonne, motif):
+    attendu = np.flatnonzero(metadata[colonne].str.contains(motif, regex=False, na=False))
+    np.testing.assert_array_equal(index.contient(colonne, motif), attendu)
+    assert index.contient(colonne, motif) is index.contient(colonne, motif)
+
+
+def test_groupes_suivent_l_ordre_des_valeurs(index, metadata):
+    valeurs = ['US', 'IT', 'FR']  # IT absente du corpus
+    attendu = [valeurs.index(v) if v in valeurs else -1 for v in metadata['pays']]
+    np.testing.assert_array_equal(index.groupes('pays', valeurs), attendu)
+
+
+@pytest.mark.parametrize('valeurs', [
+    None,
+    {'pays': ['US', 'FR', 'IT'], 'role': ['SM', 'PO']},
+    {'role': ['PO']},
+])
+def test_cellules_egales_aux_masques(index, metadata, valeurs):
+    colonnes = ('pays', 'role')
+    cellules, libelles = index.cellules(colonnes, valeurs)
+
+    retenues = {c: (valeurs or {}).get(c, sorted(metadata[c].dropna().unique()))
+                for c in colonnes}
+    for i, ligne in enumerate(metadata[list(colonnes)].itertuples(index=False)):
+        if all(v in retenues[c] for c, v in zip(colonnes, ligne)):
+            assert libelles[cellules[i]] == tuple(ligne)
+        else:
+            assert cellules[i] == -1
+
+    # Libellés présents, dans l'ordre des colonnes puis des valeurs retenues
+    rangs = [tuple(retenues[c].index(v) for c, v in zip(colonnes, libelle)) for libelle in libelles]
+    assert rangs == sorted(rangs)
+    assert len(set(libelles)) == len(libelles) == len(set(cellules[cellules >= 0]))
+
+
+def test_cellules_indexent_une_colonne_a_la_demande(metadata):
+    metadata = metadata.assign(niveau=['senior', 'junior'] * 5)
+    index = IndexFacettes(metadata)
+    cellules, libelles = index.cellules(('niveau',))
+    assert libelles == [('junior',), ('senior',)]
+    np.testing.assert_array_equal(cellules, [1, 0] * 5)
+
+
+def test_cellules_facette_absente(index):
+    with pytest.raises(ValueError):
+        index.cellules(('pays', 'langue'))
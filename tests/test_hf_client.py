@@ -0,0 +1,24 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from hf_client import ClientEmbeddingsHF, lancer_serveur_factice
+
+
+def test_encoder_synchrone_depuis_une_boucle_active():
+    serveur, url = lancer_serveur_factice(dim=4, taux_429=0.0)
+    textes = [f"offre {i}" for i in range(20)]
+    client = ClientEmbeddingsHF(url, requetes_par_seconde=1000.0)
+
+    async def cellule_notebook():
+        return client.encoder(textes, batch_size=3)
+
+    try:
+        emb = asyncio.run(cellule_notebook())
+    finally:
+        serveur.shutdown()
+    attendu = np.array([serveur.vecteur_factice(t, 4) for t in textes], dtype=np.float32)
+    np.testing.assert_allclose(emb, attendu)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import html_cleaner
+from html_cleaner import FIXTURE_PATH, html_vers_texte, nettoyer_description, nettoyer_lot
+
+with open(FIXTURE_PATH, encoding='utf-8') as f:
+    FIXTURES = [json.loads(ligne) for ligne in f if ligne.strip()]
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=[fx['id'] for fx in FIXTURES])
+def test_nettoyage_identique_a_l_ancien_nettoyeur(fixture):
+    assert nettoyer_description(fixture['html']) == fixture['attendu']
+
+
+def test_recherche_de_section_sans_pyahocorasick(monkeypatch):
+    monkeypatch.setattr(html_cleaner, 'ahocorasick', None)
+    monkeypatch.setattr(html_cleaner, '_chercher_section',
+                        html_cleaner._compiler_recherche(html_cleaner.MOTS_CLES_SECTION))
+    assert [nettoyer_description(fx['html']) for fx in FIXTURES] == [fx['attendu'] for fx in FIXTURES]
+
+
+def test_html_vers_texte_egal_a_beautifulsoup():
+    bs4 = pytest.importorskip('bs4')
+    for fx in FIXTURES:
+        attendu = bs4.BeautifulSoup(fx['html'], 'html.parser').get_text(separator='\n')
+        assert html_vers_texte(fx['html']) == attendu, fx['id']
+
+
+def test_lot_en_pool_garde_l_ordre():
+    lot = [fx['html'] for fx in FIXTURES] * 8
+    assert nettoyer_lot(lot, n_processus=2, chunksize=16) == nettoyer_lot(lot)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from near_duplicates import dedoublonner, detecter_quasi_doublons
+
+OFFRE = ("Scrum Master H/F. Vous accompagnez deux équipes produit, animez les cérémonies "
+         "et aidez le Product Owner à ordonner le backlog. Expérience de trois ans exigée.")
+AUTRE = ("Agile coach for a fintech scale-up: coaching leadership, running large-scale planning "
+         "events, and growing internal facilitators across twelve teams in Berlin.")
+
+
+def _corpus():
+    return pd.DataFrame({
+        'id': ['a', 'b', 'c', 'd', 'r'],
+        'pays': ['FR', 'FR', 'BE', 'DE', 'FR'],
+        'type': ['offre', 'offre', 'offre', 'offre', 'reference'],
+        'texte_brut': [OFFRE, OFFRE + " Postulez via notre site.", OFFRE, AUTRE, OFFRE],
+    })
+
+
+def test_quasi_doublons_regroupes_et_texte_le_plus_long_garde():
+    res = detecter_quasi_doublons(_corpus()['texte_brut'].tolist(), seuil=0.8)
+    # Les trois variantes de l'offre (et le référentiel identique) forment un cluster
+    assert res['cluster'].nunique() == 2
+    assert res.loc[[0, 1, 2, 4], 'cluster'].nunique() == 1
+    assert res['canonique'].tolist() == [False, True, False, True, False]
+
+
+def test_dedoublonner_ne_melange_pas_les_pays_ni_les_references():
+    df = _corpus()
+    garde, clusters = dedoublonner(df, seuil=0.8, masque=df['type'] == 'offre', par='pays')
+
+    assert garde['id'].tolist() == ['b', 'c', 'd', 'r']
+    assert clusters.loc[0, 'cluster'] == clusters.loc[1, 'cluster']
+    # Même texte en Belgique: cluster distinct, numéro unique
+    assert clusters.loc[2, 'cluster'] != clusters.loc[0, 'cluster']
+    assert clusters.loc[[0, 2, 3], 'cluster'].nunique() == 3
+    assert clusters.loc[4, 'cluster'] == -1
+    np.testing.assert_array_equal(clusters['taille_cluster'], [2, 2, 1, 1, 1])
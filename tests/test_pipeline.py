@@ -0,0 +1,103 @@
+import ast
+import time
+from pathlib import Path
+
+import pytest
+
+import pipeline as module_pipeline
+from pipeline import Etape, Pipeline
+
+
+def ecrire_intervalle(sortie: str, entree: str = None):
+    """Étape factice: lit son entrée, dort, écrit ses instants de début et de fin."""
+    if entree:
+        Path(entree).read_text()
+    debut = time.time()
+    time.sleep(0.3)
+    Path(sortie).write_text(f"{debut} {time.time()}")
+
+
+def _intervalle(chemin: Path):
+    debut, fin = map(float, chemin.read_text().split())
+    return debut, fin
+
+
+def _pipeline(tmp_path: Path) -> Pipeline:
+    source = tmp_path / "source.txt"
+    if not source.exists():
+        source.write_text("v1")
+    pipeline = Pipeline(str(tmp_path / "etat.json"))
+    for nom, exclusive in (("a", False), ("b", True), ("c", False), ("d", True)):
+        sortie = str(tmp_path / f"{nom}.txt")
+        pipeline.ajouter(Etape(nom, ecrire_intervalle, [sortie, str(source)],
+                               entrees=[str(source)], sorties=[sortie], exclusive=exclusive))
+    return pipeline
+
+
+def test_etapes_exclusives_tournent_seules(tmp_path):
+    assert _pipeline(tmp_path).executer(jobs=4)
+
+    intervalles = {nom: _intervalle(tmp_path / f"{nom}.txt") for nom in "abcd"}
+    for exclusive in "bd":
+        debut, fin = intervalles[exclusive]
+        for autre, (autre_debut, autre_fin) in intervalles.items():
+            if autre != exclusive:
+                assert autre_fin <= debut or fin <= autre_debut, (exclusive, autre)
+    # Les étapes non exclusives restent parallèles
+    (a_debut, a_fin), (c_debut, c_fin) = intervalles["a"], intervalles["c"]
+    assert a_debut < c_fin and c_debut < a_fin
+
+
+def test_etapes_a_jour_ignorees_puis_relancees_si_entree_modifiee(tmp_path):
+    assert _pipeline(tmp_path).executer(jobs=2)
+    avant = (tmp_path / "a.txt").read_text()
+
+    assert _pipeline(tmp_path).executer(jobs=2)
+    assert (tmp_path / "a.txt").read_text() == avant
+
+    (tmp_path / "source.txt").write_text("v2")
+    assert _pipeline(tmp_path).executer(jobs=2)
+    assert (tmp_path / "a.txt").read_text() != avant
+
+
+def test_etape_manuelle_nommee_relancee_a_chaque_fois(tmp_path):
+    def construire():
+        pipeline = Pipeline(str(tmp_path / "etat.json"))
+        pipeline.ajouter(Etape("collecte", ecrire_intervalle, [str(tmp_path / "collecte.txt")],
+                               entrees=[], sorties=[str(tmp_path / "collecte.txt")], manuelle=True))
+        return pipeline
+
+    assert construire().executer(["collecte"], jobs=1)
+    avant = (tmp_path / "collecte.txt").read_text()
+    assert construire().executer(["collecte"], jobs=1)
+    assert (tmp_path / "collecte.txt").read_text() != avant
+    # Sans cible, l'étape manuelle n'est pas sélectionnée
+    assert construire().selection() == []
+
+
+def _imports_locaux(script: Path) -> set:
+    """Modules de scripts/ importés (au niveau module) par `script`, transitivement."""
+    dossier = script.parent
+    locaux = {p.stem for p in dossier.glob("*.py")}
+    vus, pile = set(), [script.stem]
+    while pile:
+        module = pile.pop()
+        if module in vus:
+            continue
+        vus.add(module)
+        for noeud in ast.parse((dossier / f"{module}.py").read_text(encoding="utf-8")).body:
+            if isinstance(noeud, ast.ImportFrom) and noeud.module in locaux:
+                pile.append(noeud.module)
+            elif isinstance(noeud, ast.Import):
+                pile.extend(a.name for a in noeud.names if a.name in locaux)
+    return {f"scripts/{m}.py" for m in vus}
+
+
+@pytest.mark.parametrize("code, script", [
+    (module_pipeline.CODE_COLLECTE, "01c_serp_collect.py"),
+    (module_pipeline.CODE_CONSOLIDATION, "01d_consolidate.py"),
+    (module_pipeline.CODE_EMBED, "02_embed.py"),
+    (module_pipeline.CODE_ANALYSE, "03_analyze.py"),
+])
+def test_code_des_etapes_couvre_leurs_imports(code, script):
+    assert _imports_locaux(module_pipeline.RACINE / "scripts" / script) <= set(code)
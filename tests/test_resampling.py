@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from scipy.stats import kruskal
+
+from compact_embeddings import EmbeddingsCompacts, dequantifier, quantifier
+import resampling
+from resampling import (intervalles_bootstrap, poids_bootstrap, preparer_bootstrap, preparer_donnees,
+                        statistiques, statistiques_bootstrap)
+
+G = 3
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    n, d = 240, 12
+    groupes = rng.integers(-1, G, n)
+    embeddings = rng.normal(size=(n, d)).astype(np.float32)
+    embeddings[groupes == 0] += 0.3
+    embeddings[5] = 0.0  # vecteur nul: ignoré par les sommes
+    valeurs = np.round(rng.normal(size=n), 1)  # ex aequo
+    valeurs[groupes == 1] += 0.5
+    return groupes, embeddings, valeurs
+
+
+def _unitaires(embeddings):
+    normes = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, normes, out=np.zeros_like(embeddings, dtype=np.float64), where=normes > 0)
+
+
+def _matrice_naive(unitaires, groupes, exclure):
+    """Moyenne des cosinus entre groupes, paires exclues par le masque `exclure` (n × n)."""
+    cosinus = unitaires @ unitaires.T
+    matrice = np.empty((G, G))
+    for a in range(G):
+        for b in range(G):
+            masque = np.outer(groupes == a, groupes == b) & ~exclure
+            matrice[a, b] = cosinus[masque].mean()
+    return matrice
+
+
+def test_statistiques_observees_egales_aux_calculs_directs(corpus):
+    groupes, embeddings, valeurs = corpus
+    donnees = preparer_donnees(valeurs, groupes, G, embeddings)
+    observe = statistiques(donnees, donnees['groupes'][None, :])
+
+    assert observe['H'][0] == pytest.approx(kruskal(*[valeurs[groupes == g] for g in range(G)]).statistic)
+    moyennes = [valeurs[groupes == g].mean() for g in range(G)]
+    assert observe['differences'][0] == pytest.approx([moyennes[0] - moyennes[1], moyennes[0] - moyennes[2],
+                                                       moyennes[1] - moyennes[2]])
+    lignes = groupes >= 0
+    naive = _matrice_naive(_unitaires(embeddings[lignes]), groupes[lignes], np.eye(lignes.sum(), dtype=bool))
+    np.testing.assert_allclose(observe['matrice'][0], naive, atol=1e-7)
+
+
+def test_statistiques_permutees_egales_au_recalcul_naif(corpus):
+    groupes, embeddings, valeurs = corpus
+    donnees = preparer_donnees(valeurs, groupes, G, embeddings)
+    rng = np.random.default_rng(1)
+    etiquettes = np.stack([rng.permutation(donnees['groupes']) for _ in range(4)])
+    bloc = statistiques(donnees, etiquettes)
+
+    lignes = groupes >= 0
+    unitaires = _unitaires(embeddings[lignes])
+    for b, permutees in enumerate(etiquettes):
+        assert bloc['H'][b] == pytest.approx(kruskal(*[valeurs[lignes][permutees == g] for g in range(G)]).statistic)
+        naive = _matrice_naive(unitaires, permutees, np.eye(len(permutees), dtype=bool))
+        np.testing.assert_allclose(bloc['matrice'][b], naive, atol=1e-7)
+
+
+def test_permutations_reproductibles_quel_que_soit_le_nombre_de_processus(corpus):
+    groupes, embeddings, valeurs = corpus
+    seul = resampling.tester_permutations(valeurs, groupes, G, embeddings, n_permutations=300,
+                                          taille_bloc=50, n_processus=1, graine=7)
+    pool = resampling.tester_permutations(valeurs, groupes, G, embeddings, n_permutations=300,
+                                          taille_bloc=50, n_processus=2, graine=7)
+    assert seul['p_H'] == pool['p_H']
+    np.testing.assert_array_equal(seul['p_differences'], pool['p_differences'])
+    np.testing.assert_array_equal(seul['p_matrice'], pool['p_matrice'])
+    assert 1 / 301 <= seul['p_H'] <= 1
+
+
+def test_permutations_sur_embeddings_compacts(corpus):
+    groupes, embeddings, valeurs = corpus
+    codes, meta = quantifier(embeddings, 'int8')
+    compacts = EmbeddingsCompacts(codes, meta)
+    reference = resampling.tester_permutations(valeurs, groupes, G, dequantifier(codes, meta),
+                                               n_permutations=100, taille_bloc=25, n_processus=1)
+    resultat = resampling.tester_permutations(valeurs, groupes, G, compacts,
+                                              n_permutations=100, taille_bloc=25, n_processus=2)
+    np.testing.assert_allclose(resultat['matrice'], reference['matrice'], atol=1e-7)
+    np.testing.assert_array_equal(resultat['p_matrice'], reference['p_matrice'])
+
+
+def test_statistiques_bootstrap_egales_au_reechantillon_explicite(corpus):
+    groupes, embeddings, valeurs = corpus
+    donnees = preparer_bootstrap(groupes, G, embeddings, valeurs)
+    poids = poids_bootstrap(np.random.default_rng(3), donnees['effectifs'], 3)
+    bloc = statistiques_bootstrap(donnees, poids)
+
+    unitaires = _unitaires(embeddings[donnees['lignes']])
+    valeurs_ordonnees = valeurs[donnees['lignes']]
+    for b in range(len(poids)):
+        tirage = np.repeat(np.arange(len(unitaires)), poids[b].astype(int))
+        groupes_tirage = donnees['groupes'][tirage]
+        # Paires formées de deux copies d'un même texte exclues
+        naive = _matrice_naive(unitaires[tirage], groupes_tirage, tirage[:, None] == tirage[None, :])
+        np.testing.assert_allclose(bloc['matrice'][b], naive, atol=1e-7)
+        for g in range(G):
+            echantillon = valeurs_ordonnees[tirage][groupes_tirage == g]
+            assert bloc['moyennes'][b, g] == pytest.approx(echantillon.mean())
+            assert bloc['ecarts'][b, g] == pytest.approx(echantillon.std())
+
+
+def test_intervalles_bootstrap_encadrent_les_estimations(corpus):
+    groupes, embeddings, valeurs = corpus
+    ic = intervalles_bootstrap(groupes, G, embeddings, valeurs, n_bootstrap=400, n_processus=1)
+    donnees = preparer_donnees(valeurs, groupes, G, embeddings)
+    observe = statistiques(donnees, donnees['groupes'][None, :])['matrice'][0]
+    assert np.all(ic['matrice_bas'] <= observe) and np.all(observe <= ic['matrice_haut'])
+    moyennes = np.array([valeurs[groupes == g].mean() for g in range(G)])
+    assert np.all(ic['moyennes_bas'] <= moyennes) and np.all(moyennes <= ic['moyennes_haut'])
+
+    pool = intervalles_bootstrap(groupes, G, embeddings, valeurs, n_bootstrap=400, n_processus=2)
+    for cle in ic:
+        np.testing.assert_allclose(pool[cle], ic[cle])
@@ -0,0 +1,61 @@
+import time
+
+from serp_cache import DEFAULT_CACHE_PATH, LEGACY_CACHE_PATH, ResponseCache, canonical_key
+
+PARAMS = {"engine": "google_jobs", "q": "scrum master", "start": 0, "api_key": "secret"}
+
+
+def _expire(cache, params):
+    with cache._lock:
+        cache._conn.execute("UPDATE responses SET expires = ? WHERE key = ?",
+                            (time.time() - 1, canonical_key(params)))
+        cache._conn.commit()
+
+
+def test_canonical_key_ignores_api_key_and_order():
+    autre = {"api_key": "other", "start": 0, "q": "scrum master", "engine": "google_jobs"}
+    assert canonical_key(PARAMS) == canonical_key(autre)
+
+
+def test_expired_entry_is_a_miss_but_not_deleted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), default_ttl=60)
+    cache.put(PARAMS, {"jobs_results": [{"title": "SM"}]})
+    _expire(cache, PARAMS)
+
+    assert cache.get(PARAMS) is None
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_replay_reads_expired_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), default_ttl=60)
+    reponse = {"jobs_results": [{"title": "SM"}]}
+    cache.put(PARAMS, reponse)
+    _expire(cache, PARAMS)
+
+    assert cache.get(PARAMS, ignore_ttl=True) == reponse
+    assert cache.get(PARAMS, ignore_ttl=True) == reponse
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_put_evicts_expired_then_lru(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), default_ttl=60, max_bytes=None)
+    cache.put(PARAMS, {"n": 1})
+    _expire(cache, PARAMS)
+    cache.put(dict(PARAMS, start=10), {"n": 2})
+    assert cache.stats()["entries"] == 1
+    assert cache.get(PARAMS, ignore_ttl=True) is None
+    cache.close()
+
+
+def test_cache_left_in_raw_dir_is_moved_out(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ancien = ResponseCache(LEGACY_CACHE_PATH)
+    ancien.put(PARAMS, {"jobs_results": []})
+    ancien.close()
+
+    cache = ResponseCache(DEFAULT_CACHE_PATH)
+    assert cache.get(PARAMS) == {"jobs_results": []}
+    assert not (tmp_path / LEGACY_CACHE_PATH).exists()
+    cache.close()
@@ -0,0 +1,90 @@
+import importlib
+import threading
+
+import pytest
+
+from id_index import IdIndex
+
+collecte = importlib.import_module('01c_serp_collect')
+
+PAGE = collecte.DEFAULT_PAGE_SIZE
+
+
+def _job(query, start, k):
+    return {"title": f"{query} {start + k}", "company_name": "ACME", "apply_link": f"https://x/{query}/{start + k}"}
+
+
+@pytest.fixture
+def serpapi(monkeypatch):
+    """Faux SerpApi: 10 offres par page, pages comptées par requête."""
+    appels = []
+    verrou = threading.Lock()
+
+    def call_serpapi(params, limiter=None, cache=None, replay=False):
+        with verrou:
+            appels.append((params["q"], params["start"]))
+        return {"jobs_results": [_job(params["q"], params["start"], k) for k in range(params["num"])]}
+
+    monkeypatch.setattr(collecte, "call_serpapi", call_serpapi)
+    return appels
+
+
+def test_page_is_known(tmp_path):
+    index = IdIndex(str(tmp_path / "ids.sqlite"))
+    jobs = [_job("q", 0, k) for k in range(3)]
+    assert not collecte.page_is_known(jobs, None)
+    assert not collecte.page_is_known([], index)
+
+    index.add(collecte.make_id(j) for j in jobs[:2])
+    assert not collecte.page_is_known(jobs, index)
+    index.add([collecte.make_id(jobs[2])])
+    assert collecte.page_is_known(jobs, index)
+    # Doublons dans la page: comptés une fois
+    assert collecte.page_is_known(jobs + jobs[:1], index)
+
+
+def test_arret_apres_n_pages_connues_consecutives(tmp_path, serpapi):
+    index = IdIndex(str(tmp_path / "ids.sqlite"))
+    # Pages 0, 2 et 3 déjà vues; la page 1 est nouvelle
+    index.add(collecte.make_id(_job("q", p * PAGE, k)) for p in (0, 2, 3) for k in range(PAGE))
+    tache = {"query": "q", "location_hint": {"location": "Paris"}}
+
+    (jobs,) = collecte.collect_concurrent([tache], max_results=10 * PAGE, rps=1e6, pages_in_flight=1,
+                                          concurrency=1, seen_index=index, known_pages_stop=2)
+    # Série remise à zéro par la page 1, arrêt après les pages 2 et 3
+    assert len(jobs) == 4 * PAGE
+    assert sorted(start for _, start in serpapi) == [p * PAGE for p in range(4)]
+
+
+def test_sans_index_toutes_les_pages_sont_chargees(serpapi):
+    tache = {"query": "q", "location_hint": {"location": "Paris"}}
+    (jobs,) = collecte.collect_concurrent([tache], max_results=4 * PAGE, rps=1e6, known_pages_stop=2)
+    assert len(jobs) == 4 * PAGE and len(serpapi) == 4
+
+
+def test_collecte_csv_alimente_un_index_par_defaut(tmp_path, serpapi, monkeypatch):
+    monkeypatch.setattr(collecte, "SERPAPI_KEY", "test")
+    monkeypatch.setattr(collecte, "QUERIES", {"France": {"Scrum Master": "scrum master"}})
+    sortie = str(tmp_path / "offres.csv")
+    options = dict(max_per_query=3 * PAGE, dry_run=False, sample_size=0, output=sortie, rps=1e6,
+                   cache_path=None, output_format="csv", blob_dir=str(tmp_path / "blobs"), known_pages_stop=2)
+
+    collecte.run_collection(**options)
+    index = IdIndex(collecte.default_seen_index_path(sortie))
+    assert len(index) == 3 * PAGE
+
+    # Deuxième passage: deux pages connues suffisent pour arrêter la requête
+    serpapi.clear()
+    collecte.run_collection(**options, pages_in_flight=1, concurrency=1)
+    assert len(serpapi) == 2
+
+
+def test_index_explicite_alimente_en_mode_store(tmp_path, serpapi, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(collecte, "SERPAPI_KEY", "test")
+    monkeypatch.setattr(collecte, "QUERIES", {"France": {"Scrum Master": "scrum master"}})
+    chemin = str(tmp_path / "vus.sqlite")
+    collecte.run_collection(max_per_query=PAGE, dry_run=False, sample_size=0, output=None, rps=1e6,
+                            cache_path=None, store_dir=str(tmp_path / "store"), blob_dir=str(tmp_path / "blobs"),
+                            seen_index_path=chemin)
+    assert len(IdIndex(chemin)) == PAGE